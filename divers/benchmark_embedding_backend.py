@@ -0,0 +1,104 @@
+# Standardbibliotheken
+import argparse
+import itertools
+import os
+import sys
+import time
+
+# Projektverzeichnis zum Suchpfad hinzufügen, damit das Skript aus divers/ gestartet werden kann
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Externe Bibliotheken
+from chromadb.utils import embedding_functions
+import numpy as np
+
+# Interne Module
+from functions.onnx_embedding import OnnxEmbeddingFunction
+from functions.settings_store import SettingsStore, terminal_path
+from functions.system_mapping import SystemMapping
+
+
+def sample_documents(root, limit):
+    """
+    Erstellt Dokumente im Format der Hauptsammlung aus den ersten Einträgen eines Verzeichnisses.
+
+    Returns:
+        list: Dokumente
+    """
+    return [
+        f"*Item: {meta['item']}, Item-Typ: {meta['filetype']}, Pfad: {path}*"
+        for path, meta in itertools.islice(SystemMapping.walk_os(root), limit)
+    ]
+
+
+def benchmark(embedding_function, documents):
+    """
+    Misst den Durchsatz einer Embedding-Funktion.
+
+    Returns:
+        tuple: Embeddings (np.ndarray) und Dokumente pro Sekunde
+    """
+    embedding_function(documents[:8])  # Aufwärmen (Graph-Optimierung, Speicherzuweisung)
+    start_time = time.perf_counter()
+    embeddings = np.array(embedding_function(documents), dtype=np.float32)
+    return embeddings, len(documents) / (time.perf_counter() - start_time)
+
+
+def main():
+    """
+    Vergleicht PyTorch mit dem ONNX-Backend (fp32 und int8): Durchsatz und Kosinus-Ähnlichkeit
+    der Embeddings zu PyTorch. Endet mit Exitcode 1, wenn eine Variante den Schwellwert unterschreitet.
+    """
+    chroma_settings = SettingsStore.get("chroma_settings")
+    onnx_settings = chroma_settings.get("onnx_embedding", {})
+
+    parser = argparse.ArgumentParser(description="Parität und Durchsatz der Embedding-Backends")
+    parser.add_argument("root", nargs="?", default="/usr", help="Verzeichnis für Beispieldokumente (Standard: /usr)")
+    parser.add_argument("--limit", type=int, default=2000, help="Anzahl Dokumente")
+    parser.add_argument("--threshold", type=float, default=onnx_settings.get("parity_threshold", 0.99),
+                        help="Minimale Kosinus-Ähnlichkeit zu PyTorch")
+    parser.add_argument("--threads", type=int, default=onnx_settings.get("threads", 0),
+                        help="Threads für ONNX Runtime (0 = verfügbare Kerne)")
+    parser.add_argument("--batch-size", type=int, default=onnx_settings.get("batch_size", 64),
+                        help="Dokumente pro Batch")
+    args = parser.parse_args()
+
+    model_name = chroma_settings.get("embedding_model", "intfloat/multilingual-e5-small")
+    cache_folder = terminal_path + SettingsStore.get()["model_cache_directory"]
+    documents = sample_documents(args.root, args.limit)
+
+    reference, reference_rate = benchmark(
+        embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name=model_name, cache_folder=cache_folder, device="cpu"
+        ),
+        documents
+    )
+
+    results = {"PyTorch fp32": (reference_rate, 1.0, 1.0)}
+    for quantize in (False, True):
+        embedding_function = OnnxEmbeddingFunction(model_name, cache_folder, {
+            "quantize_int8": quantize,
+            "threads": args.threads,
+            "batch_size": args.batch_size,
+            "parity_threshold": args.threshold,
+        })
+        embeddings, rate = benchmark(embedding_function, documents)
+        similarities = OnnxEmbeddingFunction.cosine_similarities(reference, embeddings)
+        results[f"ONNX {'int8' if quantize else 'fp32'}"] = (rate, float(similarities.min()), float(similarities.mean()))
+
+    print(f"\nEmbedding-Backends für {model_name} ({len(documents)} Dokumente aus {args.root}, "
+          f"{args.threads or OnnxEmbeddingFunction.available_cores()} Threads)")
+    print(f"{'Variante':<14}| {'Dok./s':>9} | {'Speedup':>7} | {'Kosinus min':>11} | {'Kosinus Mittel':>14}")
+    print("-" * 68)
+    passed = True
+    for name, (rate, minimum, mean) in results.items():
+        passed = passed and minimum >= args.threshold
+        print(f"{name:<14}| {rate:>9.1f} | {rate / reference_rate:>6.1f}x | {minimum:>11.4f} | {mean:>14.4f}")
+
+    if not passed:
+        print(f"\nParitätsprüfung nicht bestanden (Schwellwert {args.threshold}).")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
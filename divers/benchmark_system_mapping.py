@@ -0,0 +1,81 @@
+# Standardbibliotheken
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Projektverzeichnis zum Suchpfad hinzufügen, damit das Skript aus divers/ gestartet werden kann
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Interne Module
+from functions.system_mapping import SystemMapping
+
+
+def benchmark_tree(root):
+    """
+    Misst die bisherige Abbildung über den tree command (JSON-Ausgabe plus process_os_mapping).
+
+    Returns:
+        tuple: Anzahl Einträge und Dauer in Sekunden oder None, wenn tree nicht installiert ist
+    """
+    if not shutil.which("tree"):
+        return None
+
+    tree_command = list(SystemMapping.settings.get("os_mapping", {}).get("tree_command", []))
+    tree_command[1] = root
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tree_file_path = os.path.join(temp_dir, "system_tree.json")
+        start_time = time.perf_counter()
+        subprocess.run(tree_command + [tree_file_path], capture_output=True, check=True)
+        count = len(SystemMapping.process_os_mapping(tree_file_path))
+        return count, time.perf_counter() - start_time
+
+
+def benchmark_generator(generator):
+    """
+    Misst einen Generator der OS-Abbildung (Einträge werden nur gezählt).
+
+    Returns:
+        tuple: Anzahl Einträge und Dauer in Sekunden
+    """
+    start_time = time.perf_counter()
+    count = sum(1 for _ in generator)
+    return count, time.perf_counter() - start_time
+
+
+def main():
+    """
+    Vergleicht tree, den seriellen Walker und den parallelen Durchlauf auf demselben Verzeichnis.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark der Dateisystem-Abbildung")
+    parser.add_argument("root", nargs="?", default="/usr", help="Startverzeichnis (Standard: /usr)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Anzahl Prozesse")
+    parser.add_argument("--batch-size", type=int, default=20000, help="Einträge pro Auftrag")
+    args = parser.parse_args()
+
+    results = {
+        "tree": benchmark_tree(args.root),
+        "seriell": benchmark_generator(SystemMapping.walk_os(args.root)),
+        f"parallel ({args.workers} Prozesse)": benchmark_generator(
+            SystemMapping.crawl_os_parallel(args.root, workers=args.workers, batch_size=args.batch_size)
+        ),
+    }
+
+    baseline = results["tree"] or results["seriell"]
+    print(f"\nBenchmark der Dateisystem-Abbildung für {args.root}")
+    print(f"{'Variante':<28}| {'Einträge':>10} | {'Sekunden':>9} | {'Speedup':>7}")
+    print("-" * 64)
+    for name, result in results.items():
+        if result is None:
+            print(f"{name:<28}| {'tree nicht installiert':>31}")
+            continue
+        count, seconds = result
+        print(f"{name:<28}| {count:>10} | {seconds:>9.2f} | {baseline[1] / seconds:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
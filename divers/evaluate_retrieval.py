@@ -0,0 +1,118 @@
+# Standardbibliotheken
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+# Projektverzeichnis zum Suchpfad hinzufügen, damit das Skript aus divers/ gestartet werden kann
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Interne Module
+from functions.async_chromadb_retriever import AsyncChromaDBRetriever
+from functions.collection_generations import CollectionGenerations
+from functions.model_registry import ModelRegistry
+from functions.retrieval_cache import RetrievalCache
+
+
+def build_queries(samples):
+    """
+    Erstellt Testanfragen aus Einträgen der Hauptsammlung. Das Schlüsselwort ist der längste Bestandteil
+    des Elementnamens (trifft meist viele Einträge), der Anfragetext nennt zusätzlich den übergeordneten
+    Ordner. Relevant ist jeweils nur der Eintrag, aus dem die Anfrage erstellt wurde.
+
+    Returns:
+        list: Tupel aus Anfragetext, Schlüsselwörtern und ID des relevanten Eintrags
+    """
+    queries = []
+    for id_, item, path in samples:
+        tokens = [token for token in re.split(r"[^0-9A-Za-zÄÖÜäöüß]+", item) if len(token) >= 3]
+        if not tokens:
+            continue
+        keyword = max(tokens, key=len).lower()
+        parent = os.path.basename(os.path.dirname(path)) or "/"
+        queries.append((f"Wo liegt {item} im Ordner {parent}?", [keyword], id_))
+    return queries
+
+
+def evaluate(method, queries, k):
+    """
+    Führt alle Anfragen mit einer Methode aus.
+
+    Returns:
+        tuple: Recall@1, Recall@5, Recall@k und Latenzen in Millisekunden
+    """
+    ranks, latencies = [], []
+    for query, keywords, relevant_id in queries:
+        start_time = time.perf_counter()
+        ids = method(query, keywords)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        ranks.append(ids.index(relevant_id) if relevant_id in ids else None)
+
+    def recall(cutoff):
+        return sum(1 for rank in ranks if rank is not None and rank < cutoff) / max(len(ranks), 1)
+
+    return recall(1), recall(5), recall(k), latencies
+
+
+def main():
+    """
+    Vergleicht Recall@k und Latenz der Schlüsselwortsuche, der zweistufigen Suche (Kandidaten aus dem
+    Schlüsselwort-Index, Sortierung nach Embedding-Ähnlichkeit) und der vollständigen Vektorabfrage
+    auf der aktuellen Generation der Hauptsammlung.
+    """
+    parser = argparse.ArgumentParser(description="Recall und Latenz der Suchverfahren")
+    parser.add_argument("--queries", type=int, default=200, help="Anzahl Testanfragen")
+    parser.add_argument("--k", type=int, default=10, help="Anzahl Ergebnisse pro Anfrage")
+    parser.add_argument("--tool", choices=["bash", "sql"], default="bash", help="Werkzeug der Testeinträge")
+    parser.add_argument("--no-vector", action="store_true", help="Vollständige Vektorabfrage auslassen")
+    args = parser.parse_args()
+
+    retriever = AsyncChromaDBRetriever()
+    # Caches deaktivieren, damit jede Methode die volle Latenz misst
+    retriever.result_cache = RetrievalCache(0)
+    retriever.query_embedding_cache = RetrievalCache(0)
+    client = ModelRegistry.client(retriever.chromadb_path)
+    try:
+        with CollectionGenerations.reader(client) as collection_name:
+            generation = CollectionGenerations.generation_of(collection_name)
+            if generation is None or not retriever.keyword_index.has_generation(generation):
+                print("Keine Hauptsammlung mit Schlüsselwort-Index gefunden. Zuerst ein Update durchführen.")
+                sys.exit(1)
+
+            queries = build_queries(retriever.keyword_index.sample(generation, args.queries, args.tool))
+            if not queries:
+                print("Keine geeigneten Einträge für Testanfragen gefunden.")
+                sys.exit(1)
+            collection = retriever._get_collection(collection_name)
+
+            methods = {
+                "Schlüsselwort": lambda query, keywords: retriever.ranked_candidates(
+                    collection_name, query, keywords, args.k, args.tool, rerank=False)["ids"][0],
+                "Zweistufig": lambda query, keywords: retriever.ranked_candidates(
+                    collection_name, query, keywords, args.k, args.tool)["ids"][0],
+            }
+            if not args.no_vector:
+                methods["Vektor (voll)"] = lambda query, keywords: collection.query(
+                    query_texts=[query], n_results=args.k, include=[])["ids"][0]
+
+            # Modell und Verbindungen aufwärmen
+            for method in methods.values():
+                method(*queries[0][:2])
+
+            print(f"\n{len(queries)} Anfragen auf {collection_name} ({collection.count()} Einträge), "
+                  f"{retriever.retrieval_settings.get('candidates', 200)} Kandidaten")
+            print(f"{'Verfahren':<15}| {'R@1':>5} | {'R@5':>5} | {f'R@{args.k}':>5} | {'p50 ms':>7} | {'p95 ms':>7}")
+            print("-" * 60)
+            for name, method in methods.items():
+                recall_1, recall_5, recall_k, latencies = evaluate(method, queries, args.k)
+                p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+                print(f"{name:<15}| {recall_1:>5.2f} | {recall_5:>5.2f} | {recall_k:>5.2f} | "
+                      f"{statistics.median(latencies):>7.1f} | {p95:>7.1f}")
+    finally:
+        retriever.close()
+
+
+if __name__ == "__main__":
+    main()
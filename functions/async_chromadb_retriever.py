@@ -1,17 +1,23 @@
 # Standardbibliotheken
-import ast
-import json
+import asyncio
 import os
+import re
+import sqlite3
 from typing import List, Union
 
 # Externe Bibliotheken
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
 from icecream import ic
+import numpy as np
 import torch
 
+# Interne Module
+from functions.collection_generations import CollectionGenerations
+from functions.keyword_index import KeywordIndex
+from functions.model_registry import ModelRegistry
+from functions.retrieval_cache import RetrievalCache
+from functions.settings_store import SettingsStore
+
 # Lade Umgebungsvariablen aus der .env-Datei
 load_dotenv("./.env")
 terminal_path = os.getenv("TERMINAL_PATH")
@@ -21,38 +27,81 @@ class AsyncChromaDBRetriever:
     """
     Eine Klasse zur asynchronen Abfrage einer ChromaDB-Datenbank mit semantischen Embeddings.
     Ermöglicht semantische Suche und Volltextsuche in gespeicherten Dokumenten.
+
+    Abfragen mit Anfragetext laufen zweistufig: Der Schlüsselwort-Index liefert einige hundert Kandidaten
+    (Schlüsselwörter bzw. Pfadbestandteile, optional nach Werkzeug gefiltert), danach werden nur diese
+    Kandidaten anhand ihrer gespeicherten Embeddings nach Ähnlichkeit zur Anfrage sortiert. Die Laufzeit
+    hängt damit von der Anzahl Kandidaten statt von der Größe der Sammlung ab.
     """
 
+    # Maximale Anzahl Suchbegriffe, die aus einem Anfragetext abgeleitet werden
+    max_query_terms = 8
+
     def __init__(self):
         """
         Initialisiert den Retriever mit Einstellungen aus der Konfigurationsdatei.
         Richtet die Embedding-Funktion mit einem multilingualen Modell ein.
         """
-        # Lade Einstellungen aus der Konfigurationsdatei
-        self.settings = json.load(open(terminal_path + "settings/settings.json"))
-        self.chroma_settings = self.settings.get("chroma_settings", {})
+        # Gemeinsame Einstellungen aller Komponenten
+        self.settings = SettingsStore.get()
+        self.chroma_settings = SettingsStore.get("chroma_settings")
 
         # Stelle das Gerät ein (CUDA wenn verfügbar, sonst CPU)
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
 
-        # Erstelle die Embedding-Funktion mit einem multilingualen Modell
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=self.chroma_settings.get("model_name", "intfloat/multilingual-e5-small"),
-            cache_folder=terminal_path + self.settings["model_cache_directory"],
-            device=self.device,
+        # Gemeinsame Embedding-Funktion (dasselbe Modell wie im Updater, wird nur einmal geladen)
+        self.embedding_function = ModelRegistry.acquire_embedding_function(
+            self.chroma_settings.get("embedding_model", "intfloat/multilingual-e5-small"),
+            terminal_path + self.settings["model_cache_directory"],
+            self.device,
+            backend=self.chroma_settings.get("embedding_backend", "torch"),
+            onnx_settings=self.chroma_settings.get("onnx_embedding", {}),
+        )
+
+        # Langlebiger ChromaDB-Client aus der Registry (wird beim Veröffentlichen einer Generation erneuert)
+        self.chromadb_path = terminal_path + self.chroma_settings["chromadb_path"]
+
+        # Schlüsselwort-Index des Updaters (nur lesend) für die Volltextsuche
+        self.keyword_index = KeywordIndex(
+            os.path.join(terminal_path, self.chroma_settings.get("keyword_index_path", "./database/keyword_index.sqlite3")),
+            read_only=True
+        )
+
+        # Zweistufige Suche: Anzahl Kandidaten und maximale Anzahl Kandidaten ohne gespeichertes Embedding,
+        # die bei der Abfrage eingebettet werden (Modus "deferred")
+        self.retrieval_settings = self.chroma_settings.get("retrieval", {})
+
+        # Caches für Suchergebnisse (pro Generation und Stand des Schlüsselwort-Index) und Anfrage-Embeddings
+        cache_settings = self.chroma_settings.get("retrieval_cache", {})
+        self.result_cache = RetrievalCache(
+            cache_settings.get("max_entries", 512), cache_settings.get("ttl_seconds", 300)
         )
+        self.query_embedding_cache = RetrievalCache(
+            cache_settings.get("embedding_max_entries", 256), cache_settings.get("ttl_seconds", 300)
+        )
+        self.cached_generation = None  # Generation, zu der die Einträge des Ergebnis-Caches gehören
 
-        # Hinweis: ChromaDB-Client wird in den Methoden erstellt, nicht hier in __init__,
-        # um immer den aktuellen Client zu erhalten
+    def close(self):
+        """
+        Gibt die gemeinsame Embedding-Funktion frei.
+        """
+        if self.embedding_function is not None:
+            ModelRegistry.release_embedding_function(self.embedding_function)
+            self.embedding_function = None
+        self.keyword_index.close()
 
-    async def retrieve(self, user_input: str, top_k=2, threshold=0.3):
+    async def retrieve(self, user_input: str, top_k=2, threshold=0.3, keywords=None, tool=None):
         """
         Führt eine semantische Suche in der Datenbank durch, basierend auf der Benutzereingabe.
+        Die Kandidaten kommen aus dem Schlüsselwort-Index (Schlüsselwörter oder aus der Eingabe abgeleitete
+        Begriffe), nur Sammlungen ohne Index werden vollständig per Vektorabfrage durchsucht.
 
         Args:
             user_input: Der Eingabetext des Benutzers
             top_k: Anzahl der zurückzugebenden Ergebnisse
             threshold: Schwellenwert für die Relevanz (aktuell nicht verwendet)
+            keywords: Schlüsselwörter für die Kandidatensuche (Standard: aus der Eingabe abgeleitet)
+            tool: Nur Einträge dieses Werkzeugs ("bash" oder "sql")
 
         Returns:
             Formatierter Text mit den gefundenen Dokumenten oder eine Fehlermeldung
@@ -61,33 +110,173 @@ class AsyncChromaDBRetriever:
         des Retrievals des Embedding-Modells nicht verwendet. Größere Embedding-Modelle bringen für diesen
         Use Case etwas bessere Qualität, rechtfertigen aber die Systembelastung (VRAM) nicht. Es sollte ein
         Embedding-Modell für diesen Use Case finetuned werden, damit ausreichende Qualität mit vertretbarer
-        Systembelastung erreicht wird.
+        Systembelastung erreicht wird. Im Embedding-Modus "deferred" werden nur bereits eingebettete
+        Einträge gefunden.
         """
-        # Erstelle den ChromaDB-Client (nicht in __init__, da bei Updates der Client aktualisiert wird)
-        client = chromadb.PersistentClient(
-            path=terminal_path + self.chroma_settings["chromadb_path"],
-            settings=Settings(anonymized_telemetry=False)
-        )
+        client = ModelRegistry.client(self.chromadb_path)
+
+        # Aktuelle Generation der Hauptsammlung für die Dauer der Abfrage festhalten
+        # Suche und Embeddings laufen im Executor, damit der Event-Loop nicht blockiert
+        loop = asyncio.get_running_loop()
+        with CollectionGenerations.reader(client) as collection_name:
+            return await loop.run_in_executor(
+                None, self._retrieve_ranked, collection_name, user_input, top_k, keywords, tool
+            )
+
+    def _retrieve_ranked(self, collection_name, user_input, top_k, keywords=None, tool=None):
+        """
+        Semantische Suche in einer aufgelösten Generation der Hauptsammlung (siehe retrieve).
+        """
+        results = self.ranked_candidates(collection_name, user_input, keywords, top_k, tool)
+        if results is not None:
+            return self._format_context(results)
+        return self._retrieve(collection_name, user_input, top_k)
+
+    def ranked_candidates(self, collection_name, query, keywords=None, top_k=5, tool=None, rerank=True):
+        """
+        Zweistufige Suche in einer aufgelösten Generation der Hauptsammlung.
+
+        1. Kandidaten aus dem Schlüsselwort-Index ("retrieval.candidates", Standard 200).
+        2. Sortierung der Kandidaten nach Kosinus-Ähnlichkeit ihrer gespeicherten Embeddings zur Anfrage.
+
+        Ergebnisse werden pro Generation und Stand des Schlüsselwort-Index zwischengespeichert. Jede vom
+        Updater geschriebene Änderung (auch inkrementell) ändert den Stand, beim Veröffentlichen einer neuen
+        Generation wird der Cache geleert.
+
+        Args:
+            collection_name (str): Aufgelöste Generation der Hauptsammlung
+            query (str): Anfragetext
+            keywords (list, optional): Schlüsselwörter (Standard: aus dem Anfragetext abgeleitet)
+            top_k (int, optional): Anzahl der zurückzugebenden Ergebnisse
+            tool (str, optional): Nur Einträge dieses Werkzeugs ("bash" oder "sql")
+            rerank (bool, optional): False liefert die Reihenfolge des Schlüsselwort-Index (Vergleichswert)
+
+        Returns:
+            dict: Ergebnisse im Format einer ChromaDB-Abfrage oder None, wenn die Generation keinen
+                Schlüsselwort-Index hat
+        """
+        generation = CollectionGenerations.generation_of(collection_name)
+        if generation is None or not self.keyword_index.has_generation(generation):
+            return None
+
+        terms = sorted({keyword.strip().lower() for keyword in keywords or [] if keyword.strip()})
+        terms = terms or self.query_terms(query or "")
+        if not terms:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]]}
+
+        if generation != self.cached_generation:
+            # Neue Generation veröffentlicht: Ergebnisse der abgelösten Generation verwerfen
+            self.result_cache.clear()
+            self.cached_generation = generation
+
+        query = " ".join(query.split()) if rerank else None
+        # Nur geschriebene oder entfernte Einträge machen Ergebnisse ungültig, nicht das nachträgliche Einbetten
+        key = (generation, self.keyword_index.content_version(generation), tuple(terms), top_k, tool, query)
+
+        def compute():
+            candidate_count = max(self.retrieval_settings.get("candidates", 200), top_k) if rerank else top_k
+            results = self.keyword_index.search(generation, terms, candidate_count, tool=tool)
+            if rerank:
+                results = self._rerank(collection_name, query, results, top_k)
+            return results
+
+        return self.result_cache.get_or_compute(key, compute)
+
+    def query_terms(self, query):
+        """
+        Leitet Suchbegriffe für die Kandidatensuche aus einem Anfragetext ab: Wörter und Pfadbestandteile
+        ab drei Zeichen, die längsten (spezifischsten) zuerst.
+
+        Args:
+            query (str): Anfragetext
+
+        Returns:
+            list: Suchbegriffe in Kleinbuchstaben
+        """
+        terms = {term.strip(".-_") for term in re.split(r"[\s/\\,;:!?()\[\]{}<>\"'`]+", query.lower())}
+        terms = sorted((term for term in terms if len(term) >= 3), key=lambda term: (-len(term), term))
+        return terms[:self.max_query_terms]
+
+    def _rerank(self, collection_name, query, results, top_k):
+        """
+        Sortiert Kandidaten nach Kosinus-Ähnlichkeit zur Anfrage. Die Embeddings der Kandidaten werden per ID
+        aus der Sammlung gelesen, nicht neu berechnet. Kandidaten ohne Embedding (Modus "deferred") werden bis
+        "retrieval.embed_missing" direkt eingebettet und beim Updater zum Speichern vorgemerkt, weitere folgen
+        in der Reihenfolge des Schlüsselwort-Index hinter den bewerteten Kandidaten.
+
+        Args:
+            collection_name (str): Aufgelöste Generation der Hauptsammlung
+            query (str): Anfragetext
+            results (dict): Kandidaten im Format einer ChromaDB-Abfrage
+            top_k (int): Anzahl der zurückzugebenden Ergebnisse
+
+        Returns:
+            dict: Die besten top_k Kandidaten im Format einer ChromaDB-Abfrage
+        """
+        ids, documents, metadatas = results["ids"][0], results["documents"][0], results["metadatas"][0]
+        keyword_order = {"ids": [ids[:top_k]], "documents": [documents[:top_k]], "metadatas": [metadatas[:top_k]]}
+        collection = self._get_collection(collection_name)
+        if not ids or not collection:
+            return keyword_order
 
-        # Verbinde mit Main Collection
-        collection_name = "Main_Collection"
         try:
-            collection = client.get_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
+            stored = collection.get(ids=ids, include=["embeddings"])
+            vectors = dict(zip(stored["ids"], stored["embeddings"]))
+
+            missing = [i for i, id_ in enumerate(ids) if id_ not in vectors]
+            if missing:
+                KeywordIndex.request_embedding([ids[i] for i in missing])
+                embedded = missing[:self.retrieval_settings.get("embed_missing", 32)]
+                if embedded:
+                    vectors.update(zip(
+                        [ids[i] for i in embedded], self.embedding_function([documents[i] for i in embedded])
+                    ))
+
+            positions = [i for i, id_ in enumerate(ids) if id_ in vectors]
+            if not positions:
+                # Noch kein Kandidat eingebettet (z.B. frische Generation im Modus "deferred")
+                return keyword_order
+
+            matrix = np.asarray([vectors[ids[i]] for i in positions], dtype=np.float32)
+            query_vector = self._query_embedding(query)
+            similarities = matrix @ query_vector / np.maximum(
+                np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector), 1e-12
             )
         except Exception as e:
+            # Sammlung zwischenzeitlich gelöscht, Embedding fehlgeschlagen o.ä.: Reihenfolge des Schlüsselwort-Index
             ic()
-            ic(e)
-            collection = None
+            ic(f"Sortierung nach Ähnlichkeit fehlgeschlagen: {e}")
+            return keyword_order
+
+        order = [positions[i] for i in np.argsort(-similarities, kind="stable")]
+        order += [i for i in range(len(ids)) if ids[i] not in vectors]
+        order = order[:top_k]
+        return {
+            "ids": [[ids[i] for i in order]],
+            "documents": [[documents[i] for i in order]],
+            "metadatas": [[metadatas[i] for i in order]],
+        }
+
+    def _query_embedding(self, query):
+        """
+        Liefert das Embedding eines Anfragetexts (zwischengespeichert, unabhängig von der Generation).
+        """
+        return self.query_embedding_cache.get_or_compute(
+            query, lambda: np.asarray(self.embedding_function([query])[0], dtype=np.float32)
+        )
 
+    def _retrieve(self, collection_name, user_input, top_k):
+        """
+        Vektorabfrage über die gesamte Generation der Hauptsammlung (für Sammlungen ohne Schlüsselwort-Index).
+        """
+        collection = self._get_collection(collection_name)
         if not collection:
             return "Keine Verbindung zur Datenbank."
 
         try:
             # Abfrage der Sammlung mit dem semantischen Embedding des Benutzertexts
             results = collection.query(
-                query_texts=[user_input],
+                query_embeddings=[self._query_embedding(user_input)],
                 n_results=top_k,
                 include=["documents", "metadatas"],
             )
@@ -109,16 +298,21 @@ class AsyncChromaDBRetriever:
         except Exception as e:
             return f"Fehler bei der Abfrage der ChromaDB: {str(e)}"
 
-    async def fulltext_search(self, keywords: Union[str, List[str]], top_k: int = 5):
+    async def fulltext_search(self, keywords: Union[str, List[str]], top_k: int = 5, query: str = None,
+                              tool: str = None):
         """
         Führt eine Volltextsuche in der Datenbank durch, basierend auf Schlüsselwörtern.
+        Mit Anfragetext werden die Treffer anschließend nach Ähnlichkeit zur Anfrage sortiert
+        (siehe ranked_candidates).
 
         Args:
             keywords: Ein Schlüsselwort oder eine Liste von Schlüsselwörtern
             top_k: Anzahl der zurückzugebenden Ergebnisse
+            query: Anfragetext für die Sortierung nach Ähnlichkeit (optional)
+            tool: Nur Einträge dieses Werkzeugs ("bash" oder "sql")
 
         Returns:
-            Formatierter Text mit den gefundenen Dokumenten
+            list: Treffer nach Relevanz sortiert (siehe _entries), aufbereitet durch den ContextPacker
         """
 
         # Konvertiere einzelnes Schlüsselwort zu Liste, wenn nötig
@@ -129,28 +323,45 @@ class AsyncChromaDBRetriever:
         keywords = [kw.lower() for kw in keywords if kw.strip()]
 
         if not keywords:
-            return ""
+            return []
 
-        # Erstelle den ChromaDB-Client (nicht in __init__, da bei Updates der Client aktualisiert wird)
-        client = chromadb.PersistentClient(
-            path=terminal_path + self.chroma_settings["chromadb_path"],
-            settings=Settings(anonymized_telemetry=False)
-        )
+        client = ModelRegistry.client(self.chromadb_path)
 
-        # Verbinde mit der Hauptsammlung
-        collection_name = "Main_Collection"
-        try:
-            collection = client.get_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
+        # Aktuelle Generation der Hauptsammlung für die Dauer der Abfrage festhalten. Index-Abfrage,
+        # Embeddings und Sortierung laufen im Executor, damit der Event-Loop nicht blockiert
+        loop = asyncio.get_running_loop()
+        with CollectionGenerations.reader(client) as collection_name:
+            entries = await loop.run_in_executor(
+                None, self._fulltext_search, collection_name, keywords, top_k, query, tool
             )
-        except Exception as e:
-            ic()
-            ic(e)
-            collection = None
 
+        # Zeige Ergebnisse direkt an
+        self._print_entries(entries)
+        return entries
+
+    def _fulltext_search(self, collection_name, keywords, top_k, query=None, tool=None):
+        """
+        Volltextsuche in einer aufgelösten Generation der Hauptsammlung (siehe fulltext_search).
+        Gesucht wird im Schlüsselwort-Index der Generation, ältere Sammlungen ohne Index werden
+        wie bisher über ChromaDB durchsucht.
+        """
+        generation = CollectionGenerations.generation_of(collection_name)
+        if generation is not None and self.keyword_index.has_generation(generation):
+            try:
+                # Ohne Anfragetext in der Reihenfolge des Schlüsselwort-Index (ebenfalls zwischengespeichert)
+                results = self.ranked_candidates(collection_name, query, keywords, top_k, tool, rerank=bool(query))
+                # Getroffene, noch nicht eingebettete Einträge beim Updater vormerken (Modus "deferred")
+                KeywordIndex.request_embedding(results["ids"][0])
+                return self._entries(results)
+            except sqlite3.Error as e:
+                # Tabelle wurde zwischenzeitlich gelöscht o.ä., auf ChromaDB ausweichen
+                ic()
+                ic(f"Fehler bei der Suche im Schlüsselwort-Index: {e}")
+
+        collection = self._get_collection(collection_name)
         if not collection:
-            return "Keine Verbindung zur Datenbank."
+            print("Keine Verbindung zur Datenbank.")
+            return []
 
         try:
             # Je nach Anzahl der Keywords und Abfrageart unterschiedliche Bedingungen bauen
@@ -181,19 +392,29 @@ class AsyncChromaDBRetriever:
                     include=["documents", "metadatas"]
                 )
 
-            # Formatiere die Ergebnisse als Text
-            formatted_text = self._format_context(results)
+            return self._entries(results)
 
-            # Zeige formatierte Ergebnisse direkt an
-            self._format_search_results(formatted_text)
+        except Exception as e:
+            ic()
+            ic(f"Fehler bei der Volltextsuche: {e}")
+            return []
 
-            # Für die Verwendung durch das LLM (wenn Funktionsabruf über die Query-Funktion)
-            return formatted_text
+    def _get_collection(self, collection_name):
+        """
+        Öffnet die Sammlung einer Generation (zwischengespeichert in der Registry).
+
+        Returns:
+            Collection oder None, wenn keine Hauptsammlung existiert
+        """
+        if collection_name is None:
+            return None
 
+        try:
+            return ModelRegistry.collection(self.chromadb_path, collection_name, self.embedding_function)
         except Exception as e:
             ic()
             ic(e)
-            return f"Fehler bei der Volltextsuche: {str(e)}"
+            return None
 
     def _format_context(self, results):
         """
@@ -214,37 +435,39 @@ class AsyncChromaDBRetriever:
         return context_text if context_text else "Keine relevanten Informationen gefunden."
 
 
-    def _format_search_results(self, results_text: str):
+    def _entries(self, results):
+        """
+        Wandelt Abfrageergebnisse in eine Liste von Treffern um.
+
+        Args:
+            results: Die Abfrageergebnisse von ChromaDB bzw. dem Schlüsselwort-Index
+
+        Returns:
+            list: Dicts mit "id", "document", "metadata" und "path" (Pfad bei Einträgen der
+                OS-Abbildung, sonst None) in der Reihenfolge der Ergebnisse
         """
-        Verarbeitet und zeigt die Suchergebnisse aus ChromaDB an,
-        ohne die IDs anzuzeigen. Bei Listen werden die einzelnen Elemente separat angezeigt.
+        entries = []
+        if not results or not results.get("documents"):
+            return entries
+
+        metadata_lists = results.get("metadatas") or [None] * len(results["documents"])
+        for doc_list, id_list, meta_list in zip(results["documents"], results["ids"], metadata_lists):
+            for doc, id_, metadata in zip(doc_list, id_list, meta_list or [None] * len(doc_list)):
+                metadata = metadata or {}
+                path = None
+                if metadata.get("tool") == "bash" and ", Pfad: " in doc:
+                    # Dokument der OS-Abbildung: "*Item: <Name>, Item-Typ: <Typ>, Pfad: <Pfad>*"
+                    path = doc.rsplit(", Pfad: ", 1)[1].rstrip("*")
+                entries.append({"id": id_, "document": doc, "metadata": metadata, "path": path})
+        return entries
+
+    def _print_entries(self, entries):
+        """
+        Zeigt die Suchergebnisse ohne IDs an.
 
         Args:
-            results_text: Formatierter Text aus ChromaDB
-        """
-
-        for block in results_text.strip().split("\n\n"):
-            lines = block.splitlines()
-            content_line = None
-
-            # Extrahiere nur den Inhalt aus dem Block (ID wird ignoriert)
-            for line in lines:
-                if line.startswith("Inhalt: "):
-                    content_line = line.replace("Inhalt: ", "").strip()
-
-            if content_line:
-                # Versuche, den Inhalt zu parsen (für Listen)
-                try:
-                    parsed_content = ast.literal_eval(content_line)
-                    if isinstance(parsed_content, list):
-                        # Zeige Listenelemente einzeln an
-                        for item in parsed_content:
-                            print(f" - {item}")
-                    else:
-                        # Normaler Inhalt
-                        print(parsed_content)
-                except Exception:
-                    # Wenn Parsing fehlschlägt, zeige Rohtext an
-                    print(content_line)
-
-                print()  # Füge eine Leerzeile zur Trennung hinzu
\ No newline at end of file
+            entries (list): Treffer aus _entries
+        """
+        for entry in entries:
+            print(entry["document"])
+            print()  # Füge eine Leerzeile zur Trennung hinzu
@@ -1,22 +1,30 @@
 # Standard Bibliotheken - alphabetisch sortiert
 import asyncio
 import datetime
-import json
+import hashlib
+import itertools
 import os
 import shutil
 import sqlite3
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Externe Bibliotheken
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
 from icecream import ic
 import torch
 
 # Interne Module
+from functions.chroma_storage import ChromaStorageMaintenance
+from functions.collection_generations import CollectionGenerations
+from functions.embedding_cache import EmbeddingCache
+from functions.inotify_watcher import AsyncInotifyWatcher
+from functions.keyword_index import KeywordIndex
+from functions.mapping_snapshot import MappingSnapshot
+from functions.model_registry import ModelRegistry
+from functions.settings_store import SettingsStore
 from functions.system_mapping import SystemMapping
+from functions.update_progress import UpdateCancelled, UpdateProgress
 
 # Umgebungsvariablen laden
 load_dotenv("./.env")
@@ -35,9 +43,9 @@ class AsyncChromaDBUpdater:
         Initialisiert den AsyncChromaDBUpdater mit Konfigurationen, ChromaDB-Client
         und erforderlichen Einstellungen für das Embedding-Modell.
         """
-        # Einstellungen aus JSON-Datei laden
-        self.settings = json.load(open(terminal_path + "settings/settings.json"))
-        self.chroma_settings = self.settings.get("chroma_settings", {})
+        # Gemeinsame Einstellungen aller Komponenten
+        self.settings = SettingsStore.get()
+        self.chroma_settings = SettingsStore.get("chroma_settings")
 
         # Standardkonfigurationen aus den Einstellungen extrahieren oder Standardwerte verwenden
         self.update_interval = self.chroma_settings.get("chroma_update_interval", 600)  # Standard: 10 Minuten
@@ -51,6 +59,9 @@ class AsyncChromaDBUpdater:
         # Status-Variablen für den Update-Prozess
         self.is_updating = False  # Flag, ob gerade ein Update läuft
         self.update_lock = asyncio.Lock()  # Lock zur Vermeidung paralleler Updates
+        # Eigener Thread für Updates, damit der Event-Loop nicht blockiert wird, samt Fortschritt und Abbruch
+        self.update_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-update")
+        self.progress = UpdateProgress()
 
         if torch.cuda.is_available():
             self.device = "cuda"
@@ -63,194 +74,806 @@ class AsyncChromaDBUpdater:
             self.device_memory = "N/A"
 
 
-        # Embedding-Funktion mit mehrsprachigem Modell initialisieren
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="intfloat/multilingual-e5-small",
-            cache_folder=terminal_path + self.settings["model_cache_directory"],
-            device=self.device,
+        # Gemeinsame Embedding-Funktion mit mehrsprachigem Modell (wird mit dem Retriever geteilt).
+        # Ohne GPU kann statt PyTorch ein ONNX-Export des Modells verwendet werden ("embedding_backend")
+        self.embedding_model = self.chroma_settings.get("embedding_model", "intfloat/multilingual-e5-small")
+        self.embedding_function = ModelRegistry.acquire_embedding_function(
+            self.embedding_model,
+            terminal_path + self.settings["model_cache_directory"],
+            self.device,
+            backend=self.chroma_settings.get("embedding_backend", "torch"),
+            onnx_settings=self.chroma_settings.get("onnx_embedding", {}),
+        )
+
+        # Persistenter Cache, damit unveränderte Dokumente nicht erneut eingebettet werden
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(terminal_path, self.chroma_settings.get("embedding_cache_path", "./database/embedding_cache")),
+            # Quantisierte ONNX-Embeddings unter eigenem Schlüssel ablegen
+            getattr(self.embedding_function, "cache_key", self.embedding_model),
+            max_entries=self.chroma_settings.get("embedding_cache_max_entries", 500000),
         )
 
         # Name der ChromaDB-Collection aus den Einstellungen extrahieren
         self.chroma_collection = self.chroma_settings.get("chromadb_tree_collection")
 
+        # Abgleichsmodus ("incremental" oder "rebuild") und Pfad zum Schnappschuss des letzten Abgleichs
+        self.sync_mode = self.chroma_settings.get("chroma_sync_mode", "incremental")
+        self.snapshot_path = os.path.join(
+            terminal_path,
+            self.chroma_settings.get("mapping_snapshot_path", "./database/mapping_snapshot.sqlite3")
+        )
+        self.batch_size = 5000  # Große Datenmengen in Batches verarbeiten
+
+        # Schlüsselwort-Index (FTS5, Trigramme) pro Generation für \search und <Schlüsselwort>-Abfragen
+        self.keyword_index = KeywordIndex(os.path.join(
+            terminal_path,
+            self.chroma_settings.get("keyword_index_path", "./database/keyword_index.sqlite3")
+        ))
+
+        # Embedding-Modus: "eager" bettet alle Dokumente beim Abgleich ein, "deferred" schreibt Pfad-Dokumente
+        # zunächst nur in den Schlüsselwort-Index und bettet sie nachträglich im Hintergrund ein
+        self.embedding_mode = self.chroma_settings.get("embedding_mode", "eager")
+        self.backfill_settings = self.chroma_settings.get("embedding_backfill", {})
+        self.backfill_pending = True  # Beim Start einmal prüfen
+
+        # Aktualisierungsmodus ("interval" oder "watch") und inotify-Watcher für den Modus "watch"
+        self.update_mode = self.chroma_settings.get("chroma_update_mode", "interval")
+        self.watcher = None
+
+        # Speicherwartung von chroma.sqlite3, läuft nur in Leerlaufphasen
+        self.maintenance_settings = self.chroma_settings.get("storage_maintenance", {})
+        self.storage = ChromaStorageMaintenance(
+            os.path.join(self.full_db_path, "chroma.sqlite3"),
+            self.maintenance_settings
+        )
+        self.maintenance_pending = True  # Beim Start einmal prüfen
+        self.last_activity = time.monotonic()  # Letzte Benutzereingabe (siehe note_activity)
+        self.subscribers = []  # Callbacks nach jeder Änderung der Abbildung (siehe subscribe)
+
+        # Geänderte Einstellungen (z.B. durch \update on/off oder externe Änderungen) live übernehmen
+        SettingsStore.subscribe(self._apply_settings)
+
+    def _apply_settings(self, changed_sections):
+        """
+        Übernimmt geänderte "chroma_settings" ohne Neustart. Pfade und Embedding-Modell erfordern
+        weiterhin einen Neustart, da sie an bestehende Sammlungen gebunden sind.
+
+        Args:
+            changed_sections (set): Geänderte Abschnitte der Einstellungen
+        """
+        if "chroma_settings" not in changed_sections:
+            return
+
+        self.update_interval = self.chroma_settings.get("chroma_update_interval", 600)
+        self.auto_update = self.chroma_settings.get("chroma_auto_update", False)
+        self.chroma_latest_update = self.chroma_settings.get("chroma_latest_update", None)
+        self.sync_mode = self.chroma_settings.get("chroma_sync_mode", "incremental")
+        self.update_mode = self.chroma_settings.get("chroma_update_mode", "interval")
+        self.embedding_mode = self.chroma_settings.get("embedding_mode", "eager")
+        self.backfill_settings = self.chroma_settings.get("embedding_backfill", {})
+        self.maintenance_settings = self.chroma_settings.get("storage_maintenance", {})
+        self.storage = ChromaStorageMaintenance(self.storage.db_path, self.maintenance_settings)
+
     async def start_update_cycle(self):
         """
         Startet den periodischen Update-Zyklus als Hintergrundaufgabe.
         Führt Updates gemäß dem konfigurierten Intervall durch, wenn auto_update aktiviert ist.
+
+        Im Modus "watch" wird nach einem ersten Abgleich nur noch über inotify-Ereignisse aktualisiert.
+        Das Intervall dient dann nur noch dem Scan der Teilbäume, für die kein Watch mehr frei war.
+        Parallel dazu laufen die Speicherwartung in Leerlaufphasen und das nachträgliche Einbetten.
+        """
+        maintenance_task = asyncio.create_task(self._maintenance_loop())
+        backfill_task = asyncio.create_task(self._backfill_loop())
+        try:
+            while True:
+                # Nur updaten, wenn auto_update aktiviert ist
+                if self.auto_update:
+                    if self.update_mode == "watch" and AsyncInotifyWatcher.is_supported():
+                        await self._update_watch_mode()
+                    else:
+                        if self.watcher:
+                            # Modus wurde auf "interval" umgestellt
+                            self.watcher.stop()
+                            self.watcher = None
+                        await self.update_system_mapping()  # Führt das eigentliche Update durch
+                elif self.watcher:
+                    # Automatische Updates wurden deaktiviert
+                    self.watcher.stop()
+                    self.watcher = None
+
+                # Auf den nächsten Update-Zyklus warten (in Sekunden)
+                await asyncio.sleep(self.update_interval)
+        finally:
+            maintenance_task.cancel()
+            backfill_task.cancel()
+            if self.watcher:
+                self.watcher.stop()
+                self.watcher = None
+
+    def subscribe(self, callback):
+        """
+        Registriert einen Callback, der nach jedem Update bzw. jedem Batch des Watchers im Event-Loop
+        aufgerufen wird (z.B. für die Vervollständigung der Eingabezeile).
+
+        Args:
+            callback: Funktion ohne Argumente
+        """
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def _notify(self):
+        """
+        Ruft die registrierten Callbacks auf.
+        """
+        for callback in self.subscribers:
+            try:
+                callback()
+            except Exception as e:
+                ic()
+                ic(f"Fehler im Callback nach dem Update: {e}")
+
+    def note_activity(self):
+        """
+        Merkt sich eine Benutzeraktivität, damit die Speicherwartung nicht während der Bedienung läuft.
+        """
+        self.last_activity = time.monotonic()
+
+    async def _maintenance_loop(self):
+        """
+        Führt die Speicherwartung von chroma.sqlite3 aus, sobald nach einem Update eine Wartung ansteht,
+        seit idle_seconds keine Benutzereingabe erfolgt ist und kein Update läuft. Die Wartung läuft im
+        Update-Thread und damit nie gleichzeitig mit einem Update, jede Runde ist zeitlich begrenzt.
         """
         while True:
-            # Nur updaten, wenn auto_update aktiviert ist
-            if self.auto_update:
-                await self.update_system_mapping()  # Führt das eigentliche Update durch
+            # Bei jeder Runde neu lesen, damit geänderte Einstellungen sofort gelten
+            await asyncio.sleep(self.maintenance_settings.get("check_interval", 30))
 
-            # Auf den nächsten Update-Zyklus warten (in Sekunden)
-            await asyncio.sleep(self.update_interval)
+            idle = time.monotonic() - self.last_activity >= self.maintenance_settings.get("idle_seconds", 60)
+            if not self.maintenance_pending or not idle or self.update_lock.locked():
+                continue
 
-    async def update_system_mapping(self):
+            async with self.update_lock:
+                loop = asyncio.get_running_loop()
+                # Bleibt gesetzt, solange nach einer Runde noch genug freie Seiten übrig sind
+                self.maintenance_pending = await loop.run_in_executor(self.update_executor, self.storage.run)
+
+    async def _backfill_loop(self):
         """
-        Hauptfunktion zur Aktualisierung der Systemstruktur in ChromaDB.
-        Verwendet ein Lock, um Parallelausführungen zu verhindern.
-        Erstellt eine temporäre Sammlung, füllt sie mit Daten und benennt sie dann um.
-        Somit sollen Zugriffskonflikte verhindert werden, wenn während dem Update ChromaDB abgefragt wird.
+        Bettet Einträge, die im Modus "deferred" ohne Embedding gespeichert wurden, nachträglich ein.
+        Von Abfragen getroffene Einträge werden bei jeder Runde eingebettet, alle übrigen nur in
+        Leerlaufphasen. Eine Runde ist zeitlich begrenzt und läuft wie die Speicherwartung im Update-Thread,
+        damit sie nie gleichzeitig mit einem Update läuft.
         """
-        async with self.update_lock:  # Verhindert gleichzeitige Updates
-            # start_time = time.time()  # Startzeit für Zeitmessung
+        while True:
+            await asyncio.sleep(self.backfill_settings.get("check_interval", 5))
 
-            # Erstelle den ChromaDB-Client (nicht in __init__, damit der aktuelle Client geladen wird)
-            client = chromadb.PersistentClient(
-                path=self.full_db_path,
-                settings=Settings(anonymized_telemetry=False)
-            )
+            idle = time.monotonic() - self.last_activity >= self.backfill_settings.get("idle_seconds", 30)
+            requested = bool(KeywordIndex.requested_ids)
+            if (not requested and not (idle and self.backfill_pending)) or self.update_lock.locked():
+                continue
 
-            # Status auf 'aktualisierend' setzen
-            self.is_updating = True
+            async with self.update_lock:
+                loop = asyncio.get_running_loop()
+                try:
+                    self.backfill_pending = await loop.run_in_executor(
+                        self.update_executor, self.backfill_embeddings, not idle
+                    )
+                except Exception as e:
+                    ic()
+                    ic(f"Fehler beim nachträglichen Einbetten: {e}")
 
-            # Daten von SystemMapping holen (OS- und PostgreSQL-Informationen)
-            os_results, psql_results = SystemMapping().map_all()
+    def backfill_embeddings(self, requested_only=False):
+        """
+        Bettet noch nicht eingebettete Einträge der veröffentlichten Generation ein, bis keine mehr ausstehen
+        oder "max_seconds" erreicht ist. Blockierend, daher aus dem Event-Loop nur über einen Executor aufrufen.
 
-            # Temporäre Sammlung mit Zeitstempel erstellen
-            temp_coll_name = f"temp_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
-            batch_size = 5000  # Große Datenmengen in Batches verarbeiten
-            psql_result_len = len(psql_results)  # Anzahl der PostgreSQL-Ergebnisse
+        Args:
+            requested_only (bool, optional): Nur von Abfragen getroffene Einträge einbetten
 
-            # Set zum Speichern von UUIDs, die beim Aufräumen erhalten bleiben sollen
-            uuids_to_keep = set()
+        Returns:
+            bool: True, wenn noch Einträge ausstehen
+        """
+        client = ModelRegistry.client(self.full_db_path)
+        generation, collection_name = CollectionGenerations.current(client)
+        if generation is None or not self.keyword_index.has_generation(generation):
+            return False
+
+        collection = ModelRegistry.collection(self.full_db_path, collection_name, self.embedding_function)
+        batch_size = self.backfill_settings.get("batch_size", 256)
+        deadline = time.monotonic() + self.backfill_settings.get("max_seconds", 2.0)
+        # Vorgemerkte Einträge über mehrere Batches hinweg zuerst einbetten
+        requested_ids = KeywordIndex.take_requested()
+
+        while time.monotonic() < deadline:
+            ids, documents, metadatas = self.keyword_index.pending(generation, batch_size, requested_ids)
+            if requested_only:
+                positions = [i for i, id_ in enumerate(ids) if id_ in requested_ids]
+                ids, documents, metadatas = (
+                    [ids[i] for i in positions], [documents[i] for i in positions], [metadatas[i] for i in positions]
+                )
+            if not ids:
+                # Ohne Leerlauf wurden nur vorgemerkte Einträge geprüft, übrige können noch ausstehen
+                return requested_only
 
-            # Temporäre Sammlung erstellen und ihre UUID speichern
-            temp_collection = client.create_collection(
-                temp_coll_name,
-                embedding_function=self.embedding_function
-            )
-            uuids_to_keep.add(str(temp_collection.id))
+            collection.upsert(documents=documents, embeddings=self._embed(documents), metadatas=metadatas, ids=ids)
+            self.keyword_index.mark_embedded(generation, ids)
+            requested_ids.difference_update(ids)
+
+        # Nicht mehr geschaffte Vormerkungen für die nächste Runde erhalten
+        KeywordIndex.request_embedding(requested_ids)
+        return True
+
+    def pending_embeddings(self):
+        """
+        Liefert die Anzahl noch nicht eingebetteter Einträge der veröffentlichten Generation.
+        """
+        generation, _ = CollectionGenerations.current(ModelRegistry.client(self.full_db_path))
+        if generation is None or not self.keyword_index.has_generation(generation):
+            return 0
+        return self.keyword_index.pending_count(generation)
 
-            # Collection_metadata UUID der Liste zum Beibehalten hinzufügen
+    async def _update_watch_mode(self):
+        """
+        Ein Zyklus im Modus "watch": Startet den Watcher nach einem vollständigen Abgleich bzw.
+        scannt die Teilbäume, die nicht überwacht werden können.
+        """
+        if not self.watcher:
+            # Erst vollständig abgleichen, danach nur noch Ereignisse verarbeiten
+            await self.update_system_mapping()
+            root, _ = SystemMapping._tree_options()
+            self.watcher = AsyncInotifyWatcher(
+                roots=[root],
+                on_batch=self._apply_watch_batch,
+                max_watches=self.chroma_settings.get("watch_max_watches", 100000),
+                debounce_seconds=self.chroma_settings.get("watch_debounce_seconds", 2.0),
+            )
             try:
-                metadata_collection = client.get_collection("collection_metadata")
-                uuids_to_keep.add(str(metadata_collection.id))
-            except Exception:
-                # Collection_metadata existiert möglicherweise noch nicht - ignorieren
-                pass
-
-            # PostgreSQL-Ergebnisse zur temporären Sammlung hinzufügen
-            temp_collection.add(
-                documents=[str(psql_result) for psql_result in psql_results],  # Ergebnisse als Strings
-                metadatas=[{"tool": "sql"} for _ in range(len(psql_results))],  # Metadaten für jeden Eintrag
-                ids=[str(i) for i in range(len(psql_results))],  # Fortlaufende IDs
+                await self.watcher.start()
+            except OSError as e:
+                ic()
+                ic(f"inotify konnte nicht gestartet werden: {e}")
+                self.watcher = None
+            return
+
+        overflow_roots = await self.watcher.take_overflow_roots()
+        if overflow_roots:
+            await self._apply_watch_batch([], [], overflow_roots)
+
+    async def _apply_watch_batch(self, changed_paths, removed_paths, rescan_paths):
+        """
+        Wendet einen Batch von Dateisystem-Änderungen im Update-Thread an, damit der Event-Loop frei bleibt.
+        Ohne gültigen Schnappschuss wird stattdessen ein vollständiges Update durchgeführt.
+        """
+        async with self.update_lock:  # Verhindert Überschneidungen mit vollständigen Updates
+            loop = asyncio.get_running_loop()
+            applied = await loop.run_in_executor(
+                self.update_executor, self.apply_path_changes, changed_paths, removed_paths, rescan_paths
             )
 
-            # OS-Ergebnisse vorbereiten
-            documents = [f"*Item: {meta['item']}, Item-Typ: {meta["filetype"]}, Pfad: {path}*" for path, meta in
-                         os_results.items()]  # Formatierte Dokumente
-
-            # Metadaten für OS-Ergebnisse erstellen
-            metadatas = [
-                {
-                    "tool": "bash",
-                    "filetype": meta["filetype"],
-                    "item": meta["item"]
-                }
-                for meta in os_results.values()
-            ]
-
-            # IDs für OS-Ergebnisse fortlaufend nach den PostgreSQL-IDs nummerieren
-            ids = [str(i + psql_result_len) for i in range(len(documents))]
-
-            # OS-Ergebnisse in Batches zur temporären Sammlung hinzufügen
-            for doc_chunk, meta_chunk, id_chunk in zip(
-                    self._chunked(documents, batch_size),
-                    self._chunked(metadatas, batch_size),
-                    self._chunked(ids, batch_size)
-            ):
-                # Add the current batch data to the list
-                temp_collection.add(
-                    documents=doc_chunk,
-                    metadatas=meta_chunk,
-                    ids=id_chunk
-                )
+        if not applied:
+            await self.update_system_mapping()
+        else:
+            self._notify()
 
-            # Hauptsammlung löschen, falls vorhanden
+    async def update_system_mapping(self):
+        """
+        Hauptfunktion zur Aktualisierung der Systemstruktur in ChromaDB.
+        Verwendet ein Lock, um Parallelausführungen zu verhindern.
+
+        Das eigentliche Update (Abbildung, Embeddings, Aufräumen) läuft in einem eigenen Thread, damit der
+        Event-Loop und damit REPL, Guard und Ollama-Anfragen währenddessen nicht blockiert werden.
+        Der Fortschritt steht in self.progress, mit cancel() wird das Update zwischen zwei Batches abgebrochen.
+        Wird die aufrufende Task abgebrochen, wird auch das Update im Thread abgebrochen.
+        """
+        async with self.update_lock:  # Verhindert gleichzeitige Updates
+            # Status auf 'aktualisierend' setzen
+            self.is_updating = True
+            self.progress.start()
+
+            loop = asyncio.get_running_loop()
             try:
-                # Check if Main_Collection exists and delete it
-                collections = client.list_collections()
-                if "Main_Collection" in collections:
-                    client.delete_collection("Main_Collection")
+                await loop.run_in_executor(self.update_executor, self._run_update)
+            except asyncio.CancelledError:
+                self.progress.cancel()
+                raise
+            finally:
+                # Update-Status zurücksetzen
+                self.is_updating = False
 
-                # Debug verification - print temp collection stats
-                temp_collection = client.get_collection(name=temp_coll_name)
+        self._notify()
 
-                # Rename the temp collection to Main_Collection
-                temp_collection.modify(name="Main_Collection")
+    def cancel(self):
+        """
+        Bricht ein laufendes Update kooperativ ab (z.B. beim Beenden der Anwendung).
+        """
+        self.progress.cancel()
 
-            except Exception as e:
-                ic()
-                ic(f"Error replacing Main_Collection: {e}")
+    def close(self):
+        """
+        Wartet auf das Ende des Update-Threads und gibt Embedding-Funktion und Embedding-Cache frei.
+        Vorher cancel() aufrufen, damit ein laufendes Update nach dem aktuellen Batch abbricht.
+        """
+        self.update_executor.shutdown(wait=True)
+        if self.embedding_function is not None:
+            ModelRegistry.release_embedding_function(self.embedding_function)
+            self.embedding_function = None
+        self.embedding_cache.close()
+        self.keyword_index.close()
+
+    def _run_update(self):
+        """
+        Führt ein vollständiges Update im Update-Thread aus.
 
-                # Fallback method if modify doesn't work
-                try:
-                    ic()
-                    ic("Trying fallback method for collection rename")
-                    # Create a new collection with the target name
-                    main_collection = client.create_collection(
-                        name="Main_Collection",
-                        embedding_function=self.embedding_function
-                    )
+        Im Modus "incremental" werden anhand des Schnappschusses nur neue oder geänderte Einträge
+        in die Hauptsammlung geschrieben und verschwundene gelöscht. Fehlt ein gültiger Schnappschuss
+        oder ist der Modus "rebuild" gesetzt, wird die Sammlung vollständig neu aufgebaut.
+        """
+        try:
+            # Langlebiger ChromaDB-Client aus der Registry
+            client = ModelRegistry.client(self.full_db_path)
 
-                    # Get data from temporary collection
-                    temp_collection = client.get_collection(name=temp_coll_name)
-                    temp_data = temp_collection.get()
-
-                    # If temp collection has data, add it to the main collection
-                    if temp_data and temp_data.get('ids') and len(temp_data['ids']) > 0:
-                        main_collection.add(
-                            documents=temp_data.get('documents', []),
-                            metadatas=temp_data.get('metadatas', []),
-                            ids=temp_data.get('ids', [])
-                        )
-
-                        # Verify data transfer
-                        main_count = main_collection.count()
-                        ic()
-                        ic(f"Main_Collection count after fallback: {main_count}")
-                    else:
-                        ic()
-                        ic("Temporary collection appears empty, nothing to transfer")
+            # Abgelöste Generationen, die beim letzten Veröffentlichen noch gelesen wurden, jetzt löschen
+            CollectionGenerations.collect_garbage(client)
+            self.keyword_index.drop_unused(CollectionGenerations.existing_generations(client))
 
-                except Exception as e2:
-                    ic()
-                    ic(f"Fallback method also failed: {e2}")
+            snapshot = MappingSnapshot(self.snapshot_path)
+            try:
+                # Inkrementell nur, wenn Schnappschuss und Schlüsselwort-Index zur veröffentlichten Generation gehören
+                generation, _ = CollectionGenerations.current(client)
+                incremental = (
+                    self.sync_mode == "incremental" and snapshot.is_valid()
+                    and generation is not None and snapshot.generation() == generation
+                    and self.keyword_index.has_generation(generation)
+                )
+                # Umfang des letzten Abgleichs als Schätzung für die Restzeit
+                self.progress.entries_expected = snapshot.count()
+
+                # Daten von SystemMapping holen (OS- und PostgreSQL-Informationen). Im inkrementellen Abgleich
+                # werden Datenbanken mit unverändertem Katalog-Fingerabdruck nicht erneut abgebildet
+                self.progress.set_phase("postgres")
+                os_results, psql_results = SystemMapping().map_all(
+                    known_fingerprints=snapshot.fingerprints() if incremental else None
+                )
+                self.progress.check_cancelled()
+
+                if incremental:
+                    self.progress.set_phase("abgleich")
+                    self._sync_incremental(client, snapshot, os_results, psql_results)
+                else:
+                    self.progress.set_phase("neuaufbau")
+                    self._rebuild(client, snapshot, os_results, psql_results)
+            finally:
+                snapshot.close()
 
             # Alte Sammlungen aufräumen und nur die relevanten behalten
+            self.progress.set_phase("aufräumen")
             self._clean_up()
 
             # Zeitstempel der letzten Aktualisierung speichern
             self._update_update_time()
-            # Update-Status zurücksetzen
-            self.is_updating = False
+            self.progress.finish()
+        except UpdateCancelled:
+            self.progress.finish("abgebrochen")
+        except Exception as e:
+            self.progress.finish("fehler")
+            ic()
+            ic(f"Fehler beim Update von ChromaDB: {e}")
+
+    def _sync_incremental(self, client, snapshot, os_results, psql_results):
+        """
+        Gleicht die Hauptsammlung inkrementell mit der aktuellen Abbildung ab.
+        Nur neue oder geänderte Einträge werden eingebettet (upsert), verschwundene Einträge gelöscht.
+
+        Args:
+            client: ChromaDB-Client
+            snapshot (MappingSnapshot): Schnappschuss des letzten Abgleichs
+            os_results: Generator der OS-Abbildung
+            psql_results (dict): Ergebnisse der PostgreSQL-Abbildung
+        """
+        _, collection_name = CollectionGenerations.current(client)
+        collection = ModelRegistry.collection(self.full_db_path, collection_name, self.embedding_function)
+        snapshot.begin_cycle()
+
+        # Alle Einträge (PostgreSQL zuerst, dann OS) in Batches abgleichen
+        entry_batches = itertools.chain(
+            [self._psql_entries(psql_results)],
+            (self._os_entries(os_chunk) for os_chunk in self._chunked(os_results, self.batch_size))
+        )
+
+        for entries in entry_batches:
+            self.progress.check_cancelled()
+            embedded = self._upsert_changed(collection, snapshot, entries)
+            self.progress.advance(len(entries[0]), embedded)
+
+        # Einträge unveränderter oder nicht erreichbarer Datenbanken behalten statt sie als verschwunden zu löschen
+        for database, psql_result in psql_results.items():
+            if psql_result["tables"] is None:
+                snapshot.keep_under(self._database_path(database))
+
+        # Nicht mehr vorhandene Einträge löschen
+        self.progress.set_phase("löschen")
+        for vanished_ids in snapshot.vanished(self.batch_size):
+            self.progress.check_cancelled()
+            self._delete_entries(collection, snapshot, vanished_ids)
+
+        self._store_fingerprints(snapshot, psql_results)
+        snapshot.set_valid(True)
+
+    def apply_path_changes(self, changed_paths, removed_paths, rescan_paths):
+        """
+        Wendet einzelne Dateisystem-Änderungen (z.B. aus dem inotify-Watcher) auf die Hauptsammlung an.
+        Blockierend, daher aus dem Event-Loop nur über einen Executor aufrufen.
+
+        Args:
+            changed_paths (list): Neue oder geänderte Pfade
+            removed_paths (list): Gelöschte Pfade (bei Ordnern inklusive aller Einträge darunter)
+            rescan_paths (list): Teilbäume, die vollständig neu abgeglichen werden sollen
+
+        Returns:
+            bool: False, wenn kein gültiger Schnappschuss existiert und ein vollständiges Update nötig ist
+        """
+        client = ModelRegistry.client(self.full_db_path)
+        generation, collection_name = CollectionGenerations.current(client)
+        if generation is None:
+            return False
+
+        collection = ModelRegistry.collection(self.full_db_path, collection_name, self.embedding_function)
+
+        snapshot = MappingSnapshot(self.snapshot_path)
+        try:
+            if not snapshot.is_valid() or snapshot.generation() != generation:
+                return False
+
+            snapshot.begin_cycle()
+
+            # Gelöschte Pfade samt Teilbaum entfernen (der Schnappschuss enthält die speicherbare Form)
+            for path in removed_paths:
+                for ids in snapshot.ids_under(SystemMapping.display_name(path), self.batch_size):
+                    self._delete_entries(collection, snapshot, ids)
+
+            # Geänderte Pfade einzeln erfassen, nicht mehr vorhandene entfernen
+            os_entries = []
+            for path in changed_paths:
+                os_entry = SystemMapping.stat_entry(path)
+                if os_entry:
+                    os_entries.append(os_entry)
+                else:
+                    for ids in snapshot.ids_under(SystemMapping.display_name(path), self.batch_size):
+                        self._delete_entries(collection, snapshot, ids)
+
+            for os_chunk in self._chunked(os_entries, self.batch_size):
+                self._upsert_changed(collection, snapshot, self._os_entries(os_chunk))
+
+            # Teilbäume vollständig abgleichen
+            for root in rescan_paths:
+                self._sync_subtree(collection, snapshot, root)
+
+            return True
+        finally:
+            snapshot.close()
+
+    def _sync_subtree(self, collection, snapshot, root):
+        """
+        Gleicht einen einzelnen Teilbaum mit der Hauptsammlung ab (Teil eines laufenden Zyklus).
+
+        Args:
+            collection: Hauptsammlung
+            snapshot (MappingSnapshot): Schnappschuss mit bereits gestartetem Zyklus
+            root (str): Startverzeichnis des Teilbaums
+        """
+        # Den Ordner selbst und alle Einträge darunter erfassen
+        root_entry = SystemMapping.stat_entry(root)
+        if root_entry:
+            os_results = itertools.chain([root_entry], SystemMapping.walk_os(root))
+            for os_chunk in self._chunked(os_results, self.batch_size):
+                self._upsert_changed(collection, snapshot, self._os_entries(os_chunk))
+
+        # Nicht gesehene Einträge des Teilbaums löschen
+        for vanished_ids in snapshot.vanished(self.batch_size, prefix=SystemMapping.display_name(root)):
+            self._delete_entries(collection, snapshot, vanished_ids)
+
+    def _upsert_changed(self, collection, snapshot, entries):
+        """
+        Schreibt die gegenüber dem Schnappschuss neuen oder geänderten Einträge eines Batches per upsert.
+
+        Args:
+            collection: Zielsammlung
+            snapshot (MappingSnapshot): Schnappschuss mit gestartetem Zyklus
+            entries (tuple): IDs, Dokumente, Metadaten und Schnappschuss-Einträge eines Batches
+
+        Returns:
+            int: Anzahl in ChromaDB geschriebener Dokumente
+        """
+        ids, documents, metadatas, records = entries
+        changed = snapshot.diff(records)
+        if not changed:
+            return 0
+
+        # Nur geänderte Einträge neu einbetten
+        changed_ids = {record[0] for record in changed}
+        positions = [i for i, id_ in enumerate(ids) if id_ in changed_ids]
+        changed_entries = (
+            [ids[i] for i in positions],
+            [documents[i] for i in positions],
+            [metadatas[i] for i in positions],
+            [records[i] for i in positions],
+        )
+        written = self._write_entries(collection, changed_entries, replace=True)
+        snapshot.store(changed)
+        return written
+
+    def _write_entries(self, collection, entries, replace=False):
+        """
+        Schreibt einen Batch in eine Sammlung und in den Schlüsselwort-Index ihrer Generation.
+
+        Im Modus "deferred" werden Pfad-Dokumente nur eingebettet, wenn ihr Embedding bereits im Cache liegt.
+        Alle übrigen stehen sofort im Schlüsselwort-Index und werden dort als ausstehend markiert
+        (siehe backfill_embeddings). Tabellen-Dokumente werden immer sofort eingebettet.
+
+        Args:
+            collection: Zielsammlung
+            entries (tuple): IDs, Dokumente, Metadaten und Schnappschuss-Einträge eines Batches
+            replace (bool, optional): Vorhandene Einträge ersetzen (upsert) statt neu hinzufügen
+
+        Returns:
+            int: Anzahl in ChromaDB geschriebener Dokumente
+        """
+        ids, documents, metadatas, records = entries
+        deferred = (
+            {i for i, id_ in enumerate(ids) if id_.startswith("os:")}
+            if self.embedding_mode == "deferred" else set()
+        )
+        embeddings = self._embed(documents, deferred)
+
+        positions = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        pending_ids = [ids[i] for i, embedding in enumerate(embeddings) if embedding is None]
+        if positions:
+            (collection.upsert if replace else collection.add)(
+                documents=[documents[i] for i in positions],
+                embeddings=[embeddings[i] for i in positions],
+                metadatas=[metadatas[i] for i in positions],
+                ids=[ids[i] for i in positions],
+            )
+        if pending_ids:
+            self.backfill_pending = True
+            if replace:
+                # Veraltete Embeddings geänderter Einträge entfernen, bis sie neu eingebettet sind
+                collection.delete(ids=pending_ids)
+
+        self.keyword_index.upsert(CollectionGenerations.generation_of(collection.name), entries, pending_ids)
+        return len(positions)
+
+    def _delete_entries(self, collection, snapshot, ids):
+        """
+        Löscht Einträge aus der Sammlung, dem Schlüsselwort-Index ihrer Generation und dem Schnappschuss.
+
+        Args:
+            collection: Sammlung einer Generation
+            snapshot (MappingSnapshot): Schnappschuss
+            ids (list): IDs der zu löschenden Einträge
+        """
+        collection.delete(ids=ids)
+        self.keyword_index.delete(CollectionGenerations.generation_of(collection.name), ids)
+        snapshot.remove(ids)
+
+    def _rebuild(self, client, snapshot, os_results, psql_results):
+        """
+        Baut die Hauptsammlung vollständig neu auf.
+        Die Daten werden in eine neue Generation geschrieben, die erst nach dem vollständigen Befüllen über
+        den Alias veröffentlicht wird. Abfragen sehen bis dahin die bisherige Generation, es gibt kein
+        Zeitfenster ohne Hauptsammlung. Der Schnappschuss wird dabei neu befüllt, an die neue Generation
+        gebunden und erst nach dem Veröffentlichen als gültig markiert.
+
+        Args:
+            client: ChromaDB-Client
+            snapshot (MappingSnapshot): Schnappschuss, der neu befüllt wird
+            os_results: Generator der OS-Abbildung
+            psql_results (dict): Ergebnisse der PostgreSQL-Abbildung
+        """
+        # Neue Generation anlegen
+        generation = CollectionGenerations.next_generation(client)
+        generation_name = CollectionGenerations.collection_name(generation)
+        generation_collection = client.create_collection(
+            generation_name,
+            embedding_function=self.embedding_function
+        )
+        self.keyword_index.create_generation(generation)
+
+        # Schnappschuss zurücksetzen, er wird während des Neuaufbaus neu befüllt
+        snapshot.clear()
+        snapshot.begin_cycle()
+
+        try:
+            # PostgreSQL-Ergebnisse zur neuen Generation hinzufügen
+            entries = self._psql_entries(psql_results)
+            if entries[0]:
+                written = self._write_entries(generation_collection, entries)
+                snapshot.store(entries[3])
+                self.progress.advance(len(entries[0]), written)
+
+            # OS-Ergebnisse direkt aus dem Generator in Batches zur neuen Generation hinzufügen,
+            # damit die Abbildung nie vollständig im Speicher liegt
+            for os_chunk in self._chunked(os_results, self.batch_size):
+                self.progress.check_cancelled()
+                entries = self._os_entries(os_chunk)
+                written = self._write_entries(generation_collection, entries)
+                snapshot.store(entries[3])
+                self.progress.advance(len(entries[0]), written)
+
+            # Generation über den Alias veröffentlichen (ein einzelnes upsert), alte Generationen aufräumen
+            CollectionGenerations.publish(client, generation)
+            # Zwischengespeicherten Client und Sammlungen der abgelösten Generation verwerfen
+            ModelRegistry.invalidate(self.full_db_path)
+        except BaseException:
+            # Unvollständige Generation verwerfen, der Schnappschuss bleibt ungültig und erzwingt einen Neuaufbau
+            client.delete_collection(generation_name)
+            self.keyword_index.drop_generation(generation)
+            raise
+
+        # Index-Tabellen der gelöschten Generationen entfernen
+        self.keyword_index.drop_unused(CollectionGenerations.existing_generations(client))
+
+        snapshot.set_generation(generation)
+        self._store_fingerprints(snapshot, psql_results)
+        snapshot.set_valid(True)
+
+    def _embed(self, documents, deferred=()):
+        """
+        Liefert die Embeddings für einen Batch von Dokumenten. Bereits bekannte Dokumente kommen aus dem
+        Embedding-Cache, nur die übrigen werden vom Modell eingebettet und anschließend im Cache gespeichert.
+
+        Args:
+            documents (list): Dokumente eines Batches
+            deferred (set, optional): Positionen, die nur aus dem Cache bedient und sonst nicht eingebettet werden
+
+        Returns:
+            list: Embedding pro Dokument (None für zurückgestellte Dokumente ohne Cache-Treffer)
+        """
+        embeddings = self.embedding_cache.get_many(documents)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None and i not in deferred]
+
+        if missing:
+            computed = self.embedding_function([documents[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+            self.embedding_cache.put_many([documents[i] for i in missing], computed)
+
+        return embeddings
+
+    def _psql_entries(self, psql_results):
+        """
+        Erstellt IDs, Dokumente, Metadaten und Schnappschuss-Einträge für die PostgreSQL-Ergebnisse.
+        Pro Tabelle entsteht ein Dokument, die ID wird aus "postgres://<Datenbank>/<Schema>.<Tabelle>"
+        abgeleitet und Änderungen werden über einen Digest des Dokuments erkannt.
+
+        Args:
+            psql_results (dict): Datenbankname -> Dict mit "fingerprint" und "tables"
+                ("tables" ist None, wenn die Datenbank nicht abgebildet wurde)
+
+        Returns:
+            tuple: Listen mit IDs, Dokumenten, Metadaten und Schnappschuss-Einträgen
+        """
+        ids, documents, metadatas, records = [], [], [], []
+        for database, psql_result in psql_results.items():
+            for table in psql_result["tables"] or []:
+                path = f"{self._database_path(database)}/{table['schema']}.{table['table']}"
+                document = self._table_document(table)
+                id_ = self._document_id("sql", path)
+                ids.append(id_)
+                documents.append(document)
+                metadatas.append({
+                    "tool": "sql",
+                    "database": database,
+                    "table": f"{table['schema']}.{table['table']}"
+                })
+                records.append((id_, path, 0, 0, len(document), self._digest(document)))
+
+        return ids, documents, metadatas, records
+
+    def _store_fingerprints(self, snapshot, psql_results):
+        """
+        Übernimmt die Katalog-Fingerabdrücke der abgeglichenen Datenbanken in den Schnappschuss.
+        Nicht erreichbare Datenbanken haben keinen Fingerabdruck und werden beim nächsten Zyklus neu abgebildet.
+
+        Args:
+            snapshot (MappingSnapshot): Schnappschuss des aktuellen Abgleichs
+            psql_results (dict): Ergebnisse der PostgreSQL-Abbildung
+        """
+        snapshot.store_fingerprints({
+            database: psql_result["fingerprint"]
+            for database, psql_result in psql_results.items()
+            if psql_result["fingerprint"]
+        })
+
+    def _table_document(self, table):
+        """
+        Formatiert einen Tabellen-Eintrag der PostgreSQL-Abbildung als Dokument.
+        Die Zeilenschätzung wird auf zwei signifikante Stellen gerundet, damit nicht jede kleine
+        Änderung der Statistik ein neues Embedding auslöst.
+
+        Args:
+            table (dict): Tabellen-Eintrag aus PostgresCatalogMapper.map_database
+
+        Returns:
+            str: Dokument
+        """
+        columns = ", ".join(f"{column['name']} {column['type']}" for column in table["columns"])
+        row_estimate = table["row_estimate"]
+        rows = f"ca. {float(f'{row_estimate:.2g}'):.0f}" if row_estimate else "unbekannt"
+        return (
+            f"*Datenbank: {table['database']}, Tabelle: {table['schema']}.{table['table']}, "
+            f"Typ: {table['kind']}, Spalten: {columns or '-'}, Zeilen: {rows}*"
+        )
+
+    def _database_path(self, database):
+        """
+        Liefert den Pfad, unter dem die Tabellen einer Datenbank im Schnappschuss abgelegt werden.
+        """
+        return f"postgres://{database}"
+
+    def _os_entries(self, os_chunk):
+        """
+        Erstellt IDs, Dokumente, Metadaten und Schnappschuss-Einträge für einen Batch der OS-Abbildung.
+        Die ID wird aus dem Pfad abgeleitet und bleibt damit über Updates hinweg stabil. Sie wird aus den
+        Originalbytes berechnet, gespeichert werden Pfad und Name in der Form von SystemMapping.display_name.
+
+        Args:
+            os_chunk (list): Liste von (Pfad, Metadaten) aus SystemMapping.walk_os
+
+        Returns:
+            tuple: Listen mit IDs, Dokumenten, Metadaten und Schnappschuss-Einträgen
+        """
+        ids, documents, metadatas, records = [], [], [], []
+        for path, meta in os_chunk:
+            id_ = self._document_id("os", path)
+            ids.append(id_)
+            path = SystemMapping.display_name(path)
+            item = SystemMapping.display_name(meta["item"])
+            # Formatiertes Dokument
+            documents.append(f"*Item: {item}, Item-Typ: {meta['filetype']}, Pfad: {path}*")
+            # Metadaten für OS-Ergebnisse
+            metadatas.append({
+                "tool": "bash",
+                "filetype": meta["filetype"],
+                "item": item
+            })
+            records.append((id_, path, meta.get("mtime", 0), meta.get("inode", 0), meta.get("size", 0), None))
+
+        return ids, documents, metadatas, records
+
+    def _document_id(self, kind, key):
+        """
+        Erzeugt eine stabile ID aus der Art des Eintrags und dem Pfad bzw. Datenbanknamen.
 
-            # Zeitmessung abschließen und Dauer ausgeben
-            # end_time = time.time()
-            # time_elapsed = end_time - start_time
-            # print(f"Zeit für die Aktualisierung von ChromaDB: {round(time_elapsed / 60, 2)} Minuten")
+        Args:
+            kind (str): Art des Eintrags ("os" oder "sql")
+            key (str): Pfad oder Datenbankname
+
+        Returns:
+            str: Stabile ID, z.B. "os:3f2a..."
+        """
+        return f"{kind}:{self._digest(key)}"
+
+    def _digest(self, text):
+        """
+        Berechnet einen SHA1-Hash eines Textes (auch für Pfade mit ungültigem UTF-8).
+        """
+        return hashlib.sha1(text.encode("utf-8", "surrogateescape")).hexdigest()
 
     async def auto_update_on(self):
         """
         Aktiviert die automatischen Updates und speichert die Einstellung.
         """
         self.auto_update = True
-        self.settings["chroma_auto_update"] = True
-        # Aktualisierte Einstellungen in die JSON-Datei schreiben
-        with open(terminal_path + "./settings/settings.json", 'w', encoding="utf-8") as file:
-            json.dump(self.settings, file, indent=2)
+        SettingsStore.update("chroma_settings", {"chroma_auto_update": True})
 
     async def auto_update_off(self):
         """
         Deaktiviert die automatischen Updates und speichert die Einstellung.
         """
         self.auto_update = False
-        self.settings["chroma_auto_update"] = False
-        # Aktualisierte Einstellungen in die JSON-Datei schreiben
-        with open(terminal_path + "./settings/settings.json", 'w', encoding="utf-8") as file:
-            json.dump(self.settings, file, indent=2)
+        SettingsStore.update("chroma_settings", {"chroma_auto_update": False})
 
     def _update_update_time(self):
         """
@@ -259,36 +882,33 @@ class AsyncChromaDBUpdater:
         now = datetime.datetime.now()  # Aktuelles Datum und Uhrzeit
         formatted_now = now.strftime("%d.%m.%Y %H:%M:%S")  # In lesbares Format formatieren
         self.chroma_latest_update = formatted_now
-        self.settings["chroma_settings"]["chroma_latest_update"] = self.chroma_latest_update
-        # Aktualisierte Einstellungen in die JSON-Datei schreiben
-        with open(terminal_path + "./settings/settings.json", "w", encoding="utf-8") as file:
-            json.dump(self.settings, file, indent=2)
+        SettingsStore.update("chroma_settings", {"chroma_latest_update": self.chroma_latest_update})
 
     def _chunked(self, iterable, size):
         """
-        Hilfsfunktion zum Aufteilen einer Liste in Teile der angegebenen Größe.
+        Hilfsfunktion zum Aufteilen einer Liste oder eines Generators in Teile der angegebenen Größe.
         Wird verwendet, um große Datenmengen in verarbeitbare Batches aufzuteilen.
 
         Args:
-            iterable: Die aufzuteilende Liste
+            iterable: Die aufzuteilende Liste oder der Generator
             size: Die Größe jedes Teils
 
         Returns:
-            Generator, der Teile der angegebenen Größe zurückgibt
+            Generator, der Listen der angegebenen Größe zurückgibt
         """
-        for i in range(0, len(iterable), size):
-            yield iterable[i:i + size]
+        iterator = iter(iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
 
     def list_collections(self):
         """
         Listet alle Sammlungen in der ChromaDB auf, sowohl über den ChromaDB-Client als auch
         direkt aus der SQLite-Datenbank, um Konsistenz zu überprüfen.
         """
-        # Erstelle den ChromaDB-Client (nicht in __init__, damit der aktuelle Client geladen wird)
-        client = chromadb.PersistentClient(
-            path=self.full_db_path,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        client = ModelRegistry.client(self.full_db_path)
 
         # Sammlungen über ChromaDB-Client auflisten
         print("\n=== Sammlungen über ChromaDB-Client ===")
@@ -307,8 +927,8 @@ class AsyncChromaDBUpdater:
 
         print("\n=== Sammlungen über SQLite-Datenbank ===")
         try:
-            # SQLite-Verbindung herstellen
-            conn = sqlite3.connect(db_path)
+            # SQLite-Verbindung nur lesend herstellen
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
             cursor = conn.cursor()
             # Alle Sammlungen aus der Datenbank abfragen
             cursor.execute("SELECT name, id FROM collections;")
@@ -328,52 +948,45 @@ class AsyncChromaDBUpdater:
     def _clean_up(self):
         """
         Bereinigt den ChromaDB-Speicher:
-        - Behält maximal die x neuesten Ordner (basierend auf Änderungszeit).
-        - Löscht alle älteren Ordner.
-        - Führt VACUUM auf der chroma.sqlite3-Datenbank durch, um den Speicherplatz zu optimieren.
+        - Löscht Segment-Ordner, die zu keiner existierenden Sammlung mehr gehören (ChromaDB entfernt
+          sie beim Löschen einer Sammlung nicht). Ordner bestehender Sammlungen bleiben unabhängig von
+          ihrem Alter erhalten.
+        - Merkt die Speicherwartung der chroma.sqlite3-Datenbank für die nächste Leerlaufphase vor.
         """
-        if not os.path.exists(self.chromadb_path):
+        db_path = os.path.join(self.full_db_path, "chroma.sqlite3")
+        if not os.path.exists(db_path):
             return
 
-        # Alle Dateien und Ordner im ChromaDB-Verzeichnis auflisten
-        all_entries = os.listdir(self.full_db_path)
-
-        # Nur echte Ordner (keine Dateien) auswählen
-        all_folders = [
-            entry for entry in all_entries
-            if os.path.isdir(os.path.join(self.chromadb_path, entry))
+        # Ordner vor den Segmenten erfassen: ein währenddessen angelegtes Segment steht dann bereits in der
+        # Datenbank, bevor sein Ordner betrachtet wird
+        folders = [
+            entry for entry in os.listdir(self.full_db_path)
+            if os.path.isdir(os.path.join(self.full_db_path, entry))
         ]
 
-        # Vollständige Pfade zu den Ordnern erstellen
-        folder_paths = [os.path.join(self.full_db_path, folder) for folder in all_folders]
-
-        # Änderungszeit für alle Ordner erfassen
-        folder_paths_with_mtime = [
-            (path, os.path.getmtime(path)) for path in folder_paths
-        ]
-
-        # Sortieren nach Änderungszeit (neueste zuerst)
-        folder_paths_with_mtime.sort(key=lambda x: x[1], reverse=True)
-
-        # Die x neuesten Ordner behalten, den Rest löschen
-        folders_to_delete = folder_paths_with_mtime[self.chroma_settings.get("collection_archive_size", 10):]
-
-        # Alte Ordner löschen
-        for path, mtime in folders_to_delete:
+        try:
+            # SQLite-Verbindung nur lesend herstellen
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            try:
+                segment_ids = {row[0] for row in conn.execute("SELECT id FROM segments;")}
+            finally:
+                conn.close()
+        except Exception as e:
+            # Ohne bekannte Segmente wird nichts gelöscht
+            ic()
+            ic(f"Segmente konnten nicht gelesen werden: {e}")
+            folders = []
+
+        # Verwaiste Segment-Ordner löschen
+        for folder in folders:
+            if folder in segment_ids:
+                continue
+            path = os.path.join(self.full_db_path, folder)
             try:
                 shutil.rmtree(path)  # Rekursives Löschen des Ordners und seines Inhalts
             except Exception as e:
                 ic()
                 ic(f"Fehler beim Löschen von {path}: {e}")
 
-        # SQLite-Datenbank optimieren (Speicherplatz freigeben)
-        db_path = os.path.join(self.full_db_path, "chroma.sqlite3")
-        if os.path.exists(db_path):
-            try:
-                conn = sqlite3.connect(db_path)
-                conn.execute("VACUUM;")  # VACUUM-Befehl zur Optimierung
-                conn.close()
-                print("VACUUM auf chroma.sqlite3 erfolgreich abgeschlossen.")
-            except Exception as e:
-                ic()
-                ic(f"Fehler beim VACUUM der Datenbank: {e}")
+        # Speicherwartung von chroma.sqlite3 für die nächste Leerlaufphase vormerken (statt VACUUM)
+        self.maintenance_pending = True
@@ -0,0 +1,76 @@
+# Standardbibliotheken
+import asyncio
+import time
+
+# Externe Bibliotheken
+from icecream import ic
+
+
+class BackgroundLoader:
+    """
+    Lädt Komponenten beim Start nebenläufig im Hintergrund.
+
+    Jede Komponente wird als Task mit eigenem Ergebnis (Bereitschafts-Future) gestartet, blockierende
+    Konstruktoren laufen im Executor. Funktionen, die eine Komponente brauchen, warten mit wait() nur
+    auf diese eine, die Eingabeaufforderung erscheint sofort.
+    """
+
+    def __init__(self):
+        self.tasks = {}  # Name -> Task
+        self.labels = {}  # Name -> Bezeichnung für Meldungen
+        self.durations = {}  # Name -> Ladedauer in Sekunden
+
+    def start(self, name, label, factory):
+        """
+        Startet das Laden einer Komponente. Muss aus dem Event-Loop aufgerufen werden.
+
+        Args:
+            name (str): Name der Komponente
+            label (str): Bezeichnung für Meldungen, z.B. "Guard-Modell"
+            factory: Funktion ohne Argumente (läuft im Executor) oder Coroutine-Funktion
+        """
+        self.labels[name] = label
+        self.tasks[name] = asyncio.create_task(self._load(name, label, factory))
+
+    async def _load(self, name, label, factory):
+        """
+        Lädt eine Komponente und misst die Dauer.
+
+        Returns:
+            Die Komponente oder None, wenn das Laden fehlgeschlagen ist
+        """
+        start_time = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(factory):
+                return await factory()
+            return await asyncio.get_running_loop().run_in_executor(None, factory)
+        except Exception as e:
+            ic()
+            ic(f"{label} konnte nicht geladen werden: {e}")
+            return None
+        finally:
+            self.durations[name] = time.perf_counter() - start_time
+
+    async def wait(self, name, quiet=False):
+        """
+        Wartet auf eine Komponente. Ist sie noch nicht geladen, wird ein Hinweis angezeigt.
+
+        Args:
+            name (str): Name der Komponente
+            quiet (bool, optional): Keinen Hinweis anzeigen (z.B. für Hintergrundtasks)
+
+        Returns:
+            Die Komponente oder None, wenn das Laden fehlgeschlagen ist
+        """
+        task = self.tasks[name]
+        if not task.done() and not quiet:
+            print(f"Warte auf {self.labels[name]}...")
+        # Abbruch des Wartenden bricht das Laden nicht ab
+        return await asyncio.shield(task)
+
+    def close(self):
+        """
+        Bricht noch laufende Ladevorgänge ab (ein bereits laufender Konstruktor im Executor läuft zu Ende).
+        """
+        for task in self.tasks.values():
+            task.cancel()
@@ -0,0 +1,142 @@
+# Standardbibliotheken
+import os
+import sqlite3
+import time
+
+# Externe Bibliotheken
+from icecream import ic
+
+
+class ChromaStorageMaintenance:
+    """
+    Speicherwartung der SQLite-Datei von ChromaDB (chroma.sqlite3) statt eines vollständigen VACUUM nach
+    jedem Update.
+
+    - Die Datei wird in den WAL-Modus versetzt (bleibt in der Datei gespeichert), damit Leser während der
+      Wartung weiterarbeiten können. Eigene Verbindungen nutzen zusätzlich mmap und einen größeren Cache.
+    - Mit auto_vacuum=INCREMENTAL werden freie Seiten schrittweise über incremental_vacuum zurückgegeben,
+      jeder Schritt ist eine kurze eigene Transaktion und die Wartung ist zeitlich begrenzt.
+    - Gewartet wird nur, wenn der Anteil freier Seiten den Schwellwert überschreitet. Die einmalige
+      Umstellung auf auto_vacuum=INCREMENTAL erfordert ein VACUUM und erfolgt daher ebenfalls erst dann.
+    - Nach der Wartung wird das WAL passiv zurückgeschrieben (ohne Leser oder Schreiber zu blockieren).
+    """
+
+    # Werte von PRAGMA auto_vacuum
+    auto_vacuum_incremental = 2
+
+    def __init__(self, db_path, maintenance_settings=None):
+        """
+        Initialisiert die Wartung.
+
+        Args:
+            db_path (str): Pfad zu chroma.sqlite3
+            maintenance_settings (dict, optional): Einstellungen "storage_maintenance"
+        """
+        maintenance_settings = maintenance_settings or {}
+        self.db_path = db_path
+        self.free_page_ratio = maintenance_settings.get("free_page_ratio", 0.2)  # Schwellwert freier Seiten
+        self.step_pages = maintenance_settings.get("step_pages", 512)  # Seiten pro incremental_vacuum
+        self.max_seconds = maintenance_settings.get("max_seconds", 2.0)  # Zeitbudget pro Wartung
+        self.mmap_size = maintenance_settings.get("mmap_size", 268435456)  # 256 MB
+        self.cache_size_kib = maintenance_settings.get("cache_size_kib", 65536)  # 64 MB
+
+    def connect(self, read_only=False):
+        """
+        Öffnet eine Verbindung mit WAL, mmap und größerem Cache.
+
+        Args:
+            read_only (bool, optional): Nur lesend öffnen
+
+        Returns:
+            sqlite3.Connection: Verbindung oder None, wenn die Datei nicht existiert
+        """
+        if not os.path.exists(self.db_path):
+            return None
+
+        if read_only:
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=5)
+        else:
+            connection = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL;")
+            connection.execute("PRAGMA synchronous=NORMAL;")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)};")
+        connection.execute(f"PRAGMA cache_size={-int(self.cache_size_kib)};")
+        return connection
+
+    def stats(self):
+        """
+        Liefert Kennzahlen der Datei.
+
+        Returns:
+            dict: "page_count", "freelist_count", "free_ratio" und "auto_vacuum" oder None
+        """
+        connection = self.connect(read_only=True)
+        if connection is None:
+            return None
+        try:
+            return self._stats(connection)
+        finally:
+            connection.close()
+
+    def needs_maintenance(self):
+        """
+        Prüft, ob sich eine Wartung lohnt (Anteil freier Seiten über dem Schwellwert).
+        """
+        stats = self.stats()
+        return bool(stats) and stats["freelist_count"] > 0 and stats["free_ratio"] >= self.free_page_ratio
+
+    def run(self):
+        """
+        Führt eine zeitlich begrenzte Wartung aus. Blockierend, daher nur im Update-Thread aufrufen.
+
+        Returns:
+            bool: True, wenn danach noch freie Seiten über dem Schwellwert übrig sind
+        """
+        connection = self.connect()
+        if connection is None:
+            return False
+
+        try:
+            stats = self._stats(connection)
+            if stats["freelist_count"] == 0 or stats["free_ratio"] < self.free_page_ratio:
+                return False
+
+            if stats["auto_vacuum"] != self.auto_vacuum_incremental:
+                # Einmalige Umstellung: auto_vacuum wirkt erst nach einem vollständigen VACUUM
+                connection.execute(f"PRAGMA auto_vacuum={self.auto_vacuum_incremental};")
+                connection.execute("VACUUM;")
+                print("chroma.sqlite3 wurde auf inkrementelles VACUUM umgestellt.")
+            else:
+                # Freie Seiten schrittweise zurückgeben, bis das Zeitbudget aufgebraucht ist
+                deadline = time.monotonic() + self.max_seconds
+                while time.monotonic() < deadline:
+                    before = connection.execute("PRAGMA freelist_count;").fetchone()[0]
+                    if before == 0:
+                        break
+                    connection.execute(f"PRAGMA incremental_vacuum({int(self.step_pages)});").fetchall()
+
+            # WAL zurückschreiben, ohne Leser oder Schreiber zu blockieren
+            connection.execute("PRAGMA wal_checkpoint(PASSIVE);").fetchall()
+
+            stats = self._stats(connection)
+            return stats["freelist_count"] > 0 and stats["free_ratio"] >= self.free_page_ratio
+        except sqlite3.Error as e:
+            ic()
+            ic(f"Fehler bei der Wartung von chroma.sqlite3: {e}")
+            return False
+        finally:
+            connection.close()
+
+    def _stats(self, connection):
+        """
+        Liest Seitenanzahl, freie Seiten und auto_vacuum-Modus.
+        """
+        page_count = connection.execute("PRAGMA page_count;").fetchone()[0]
+        freelist_count = connection.execute("PRAGMA freelist_count;").fetchone()[0]
+        auto_vacuum = connection.execute("PRAGMA auto_vacuum;").fetchone()[0]
+        return {
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "free_ratio": freelist_count / page_count if page_count else 0.0,
+            "auto_vacuum": auto_vacuum,
+        }
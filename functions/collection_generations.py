@@ -0,0 +1,202 @@
+# Standardbibliotheken
+import datetime
+import re
+import threading
+from contextlib import contextmanager
+
+# Externe Bibliotheken
+from icecream import ic
+
+
+class CollectionGenerations:
+    """
+    Generationen der Hauptsammlung mit einem Alias als atomarem Zeiger.
+
+    Jeder Neuaufbau schreibt in eine neue Sammlung "Main_Collection_g<n>". Welche Generation aktuell ist,
+    steht in einem einzelnen Alias-Eintrag in der eigenen Sammlung "generation_alias", die nur diesen
+    Eintrag (mit einem eindimensionalen Dummy-Embedding) enthält. Das Veröffentlichen einer Generation
+    ist ein einzelnes upsert dieses Eintrags, Leser lösen den Alias einmal pro Abfrage auf. Es gibt damit
+    kein Zeitfenster ohne Hauptsammlung.
+
+    Abgelöste Generationen werden erst gelöscht, wenn keine laufende Abfrage in diesem Prozess sie
+    mehr verwendet (Referenzzählung über reader()).
+    """
+
+    alias_name = "Main_Collection"
+    alias_collection_name = "generation_alias"
+    # Frühere Ablage des Alias, wird nur noch gelesen
+    legacy_alias_collection_name = "collection_metadata"
+    generation_pattern = re.compile(r"^Main_Collection_g(\d+)$")
+
+    # Laufende Leser pro Sammlung (prozessweit)
+    readers = {}
+    readers_lock = threading.Lock()
+
+    @classmethod
+    def collection_name(cls, generation):
+        """
+        Liefert den Namen der Sammlung einer Generation.
+        """
+        return f"{cls.alias_name}_g{generation}"
+
+    @classmethod
+    def generation_of(cls, collection_name):
+        """
+        Liefert die Generationsnummer zum Namen einer Sammlung.
+
+        Returns:
+            int: Generationsnummer oder None (z.B. für "Main_Collection" aus älteren Versionen)
+        """
+        match = cls.generation_pattern.match(collection_name or "")
+        return int(match.group(1)) if match else None
+
+    @classmethod
+    def existing_generations(cls, client):
+        """
+        Liefert die Nummern aller Generationen, deren Sammlung noch existiert.
+
+        Returns:
+            list: Generationsnummern
+        """
+        return [
+            generation for generation in map(cls.generation_of, cls._collection_names(client))
+            if generation is not None
+        ]
+
+    @classmethod
+    def current(cls, client):
+        """
+        Liest den Alias.
+
+        Args:
+            client: ChromaDB-Client
+
+        Returns:
+            tuple: Nummer der aktuellen Generation und Name ihrer Sammlung oder (None, None)
+        """
+        for collection_name in (cls.alias_collection_name, cls.legacy_alias_collection_name):
+            try:
+                alias_collection = client.get_collection(collection_name)
+                alias = alias_collection.get(ids=[cls._alias_id()], include=["metadatas"])
+            except Exception:
+                continue  # Sammlung existiert (noch) nicht
+
+            if alias["ids"]:
+                metadata = alias["metadatas"][0]
+                return metadata["generation"], metadata["collection"]
+
+        # Noch keine Generation veröffentlicht
+        return None, None
+
+    @classmethod
+    def next_generation(cls, client):
+        """
+        Ermittelt die Nummer für eine neue Generation (größer als alle vorhandenen).
+
+        Returns:
+            int: Neue Generationsnummer
+        """
+        current_generation, _ = cls.current(client)
+        generations = [current_generation or 0]
+        for name in cls._collection_names(client):
+            match = cls.generation_pattern.match(name)
+            if match:
+                generations.append(int(match.group(1)))
+        return max(generations) + 1
+
+    @classmethod
+    def publish(cls, client, generation):
+        """
+        Macht eine vollständig befüllte Generation über ein einzelnes upsert des Alias zur aktuellen
+        und löscht danach alle nicht mehr verwendeten Generationen.
+
+        Args:
+            client: ChromaDB-Client
+            generation (int): Nummer der Generation
+        """
+        alias_collection = client.get_or_create_collection(cls.alias_collection_name, embedding_function=None)
+        alias_collection.upsert(
+            ids=[cls._alias_id()],
+            embeddings=[[0.0]],
+            documents=[cls.alias_name],
+            metadatas=[{
+                "generation": generation,
+                "collection": cls.collection_name(generation),
+                "published_at": datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
+            }]
+        )
+        cls.collect_garbage(client)
+
+    @classmethod
+    def collect_garbage(cls, client):
+        """
+        Löscht abgelöste Generationen, ältere Sammlungen ohne Generation ("Main_Collection", "temp_...")
+        und abgebrochene Neuaufbauten, sofern sie gerade von keiner Abfrage verwendet werden.
+
+        Args:
+            client: ChromaDB-Client
+        """
+        current_generation, current_name = cls.current(client)
+        if current_name is None:
+            return
+
+        for name in cls._collection_names(client):
+            match = cls.generation_pattern.match(name)
+            obsolete = (
+                name == cls.alias_name
+                or name.startswith("temp_")
+                or (match and int(match.group(1)) < current_generation)
+            )
+            if not obsolete or name == current_name:
+                continue
+
+            with cls.readers_lock:
+                if cls.readers.get(name):
+                    continue  # Wird beim nächsten Aufräumen gelöscht
+                try:
+                    client.delete_collection(name)
+                except Exception as e:
+                    ic()
+                    ic(f"Fehler beim Löschen der Generation {name}: {e}")
+
+    @classmethod
+    @contextmanager
+    def reader(cls, client):
+        """
+        Löst den Alias für eine Abfrage auf und hält die Generation bis zum Ende der Abfrage fest.
+        Ohne Alias wird eine vorhandene "Main_Collection" aus älteren Versionen verwendet.
+
+        Args:
+            client: ChromaDB-Client
+
+        Yields:
+            str: Name der zu verwendenden Sammlung oder None, wenn keine existiert
+        """
+        # Auflösen und Registrieren unter derselben Sperre wie das Löschen in collect_garbage, sonst
+        # könnte die aufgelöste Generation dazwischen gelöscht werden
+        with cls.readers_lock:
+            _, name = cls.current(client)
+            if name is None and cls.alias_name in cls._collection_names(client):
+                name = cls.alias_name
+            cls.readers[name] = cls.readers.get(name, 0) + 1
+        try:
+            yield name
+        finally:
+            with cls.readers_lock:
+                cls.readers[name] -= 1
+                if not cls.readers[name]:
+                    del cls.readers[name]
+
+    @classmethod
+    def _collection_names(cls, client):
+        """
+        Liefert die Namen aller Sammlungen.
+        """
+        return [collection.name for collection in client.list_collections()]
+
+    @classmethod
+    def _alias_id(cls):
+        """
+        Liefert die ID des Alias-Eintrags in generation_alias.
+        """
+        return f"alias:{cls.alias_name}"
@@ -0,0 +1,122 @@
+class ContextPacker:
+    """
+    Stellt den Suchkontext für den Prompt innerhalb eines Token-Budgets zusammen.
+
+    Die Treffer werden in der Reihenfolge ihrer Relevanz übernommen, solange der formatierte Kontext in
+    das Budget passt. Doppelte Einträge entfallen, Pfade werden als Baum ausgegeben, sodass gemeinsame
+    Präfixe nur einmal im Prompt stehen. Verzeichnisketten ohne eigenen Treffer werden zusammengefasst:
+
+        /home/anna/
+          Dokumente/
+            Bewerbung Müller.pdf
+            Projekte/
+          Downloads/rechnung.pdf
+    """
+
+    empty_context = "Keine relevanten Informationen gefunden."
+    paths_header = "Pfade (eingerückte Zeilen liegen im Ordner der Zeile darüber):"
+
+    def __init__(self, count_tokens):
+        """
+        Initialisiert den Packer.
+
+        Args:
+            count_tokens: Funktion, die die Tokens eines Texts für das aktive Modell zählt
+        """
+        self.count_tokens = count_tokens
+
+    def pack_entries(self, entries, budget):
+        """
+        Formatiert Suchergebnisse für den Prompt.
+
+        Args:
+            entries (list): Treffer aus AsyncChromaDBRetriever.fulltext_search, nach Relevanz sortiert
+            budget (int): Maximale Anzahl Tokens
+
+        Returns:
+            str: Kontext für den Prompt
+        """
+        paths = {}  # Pfad -> Verzeichnis ja/nein (Einfügereihenfolge = Relevanz)
+        documents = {}  # Dokumente ohne Pfad (z.B. Tabellen), als Dict zum Entfernen von Duplikaten
+        context = ""
+        for entry in entries:
+            path = entry.get("path")
+            if path:
+                path = path.rstrip("/") or "/"
+                if path in paths:
+                    continue
+                paths[path] = entry["metadata"].get("filetype") == "directory"
+                candidate = self._render(paths, documents)
+                if self.count_tokens(candidate) > budget:
+                    # Ein weniger relevanter, kürzerer Eintrag kann noch passen
+                    del paths[path]
+                    continue
+            else:
+                document = entry["document"].strip("*")
+                if document in documents:
+                    continue
+                documents[document] = None
+                candidate = self._render(paths, documents)
+                if self.count_tokens(candidate) > budget:
+                    del documents[document]
+                    continue
+            context = candidate
+
+        return context or self.empty_context
+
+    def pack_text(self, text, budget):
+        """
+        Kürzt einen zeilenweise aufgebauten Kontext (z.B. Schema-Kontext) auf das Budget.
+        Die Zeilen werden in ihrer Reihenfolge übernommen, die erste nicht mehr passende beendet den Kontext.
+
+        Args:
+            text (str): Kontext
+            budget (int): Maximale Anzahl Tokens
+
+        Returns:
+            str: Gekürzter Kontext
+        """
+        lines = []
+        used = 0
+        for line in text.splitlines():
+            cost = self.count_tokens(line + "\n")
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+    def _render(self, paths, documents):
+        """
+        Formatiert die ausgewählten Pfade als Baum, gefolgt von den Dokumenten ohne Pfad.
+        """
+        lines = []
+        if paths:
+            # Baum aus Pfadbestandteilen, der Schlüssel None markiert einen Treffer (Wert: Verzeichnis ja/nein)
+            tree = {}
+            for path, is_directory in paths.items():
+                node = tree
+                for part in path.strip("/").split("/"):
+                    if part:
+                        node = node.setdefault(part, {})
+                node[None] = is_directory
+            lines.append(self.paths_header)
+            self._render_node(tree, "/", 0, lines)
+        lines.extend(documents)
+        return "\n".join(lines)
+
+    def _render_node(self, node, prefix, depth, lines):
+        """
+        Fügt die Kinder eines Baumknotens eingerückt an lines an.
+        """
+        for name, child in node.items():
+            if name is None:
+                continue
+            label = prefix + name
+            # Verzeichnisketten ohne eigenen Treffer zu einer Zeile zusammenfassen
+            while None not in child and len(child) == 1:
+                (name, child), = child.items()
+                label += "/" + name
+            has_children = len(child) > (1 if None in child else 0)
+            lines.append("  " * depth + label + ("/" if has_children or child.get(None) else ""))
+            self._render_node(child, "", depth + 1, lines)
@@ -0,0 +1,283 @@
+# Standardbibliotheken
+import hashlib
+import os
+import sqlite3
+import threading
+
+# Externe Bibliotheken
+from icecream import ic
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistenter, inhaltsadressierter Cache für Embeddings.
+
+    Die Vektoren liegen in einer per Memory-Mapping eingebundenen float32-Matrix (ein Slot pro Eintrag),
+    ein SQLite-Index ordnet jedem Schlüssel sha1(Modellname + Dokument) seinen Slot zu. Der Cache ist auf
+    max_entries begrenzt, bei Überschreitung werden die am längsten nicht verwendeten Einträge verdrängt
+    und ihre Slots wiederverwendet. Treffer und Fehlzugriffe werden pro Sitzung gezählt.
+    """
+
+    # Anzahl Slots, um die die Matrix mindestens wächst
+    growth_slots = 4096
+
+    def __init__(self, cache_path, model_name, max_entries=500000):
+        """
+        Öffnet (bzw. erstellt) den Cache.
+
+        Args:
+            cache_path (str): Verzeichnis für Matrix und Index
+            model_name (str): Name des Embedding-Modells (Teil des Schlüssels)
+            max_entries (int, optional): Maximale Anzahl gespeicherter Embeddings
+        """
+        os.makedirs(cache_path, exist_ok=True)
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(cache_path, "vectors.f32")
+        self.lock = threading.Lock()
+
+        # Zähler der aktuellen Sitzung
+        self.hits = 0
+        self.misses = 0
+
+        self.connection = sqlite3.connect(os.path.join(cache_path, "index.sqlite3"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL;")
+        self.connection.execute("PRAGMA synchronous=NORMAL;")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, slot INTEGER, last_used INTEGER)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.commit()
+
+        self.dimension = int(self._get_meta("dimension", 0))
+        self.clock = int(self._get_meta("clock", 0))  # Logische Uhr für die LRU-Reihenfolge
+        self.vectors = None
+        if self.dimension:
+            self._open_vectors()
+
+    def get_many(self, documents):
+        """
+        Sucht die Embeddings mehrerer Dokumente.
+
+        Args:
+            documents (list): Dokumente
+
+        Returns:
+            list: Embedding (np.ndarray) pro Dokument oder None bei Fehlzugriff
+        """
+        keys = [self._key(document) for document in documents]
+        results = [None] * len(documents)
+
+        with self.lock:
+            if self.vectors is None:
+                self.misses += len(documents)
+                return results
+
+            slots = {}
+            for key_chunk in self._chunks(list(set(keys))):
+                placeholders = ",".join("?" * len(key_chunk))
+                cursor = self.connection.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", key_chunk
+                )
+                slots.update(cursor)
+
+            self.clock += 1
+            for i, key in enumerate(keys):
+                slot = slots.get(key)
+                if slot is not None:
+                    results[i] = np.array(self.vectors[slot])
+
+            # Zuletzt verwendete Einträge markieren
+            self.connection.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?", [(self.clock, key) for key in slots]
+            )
+            self._set_meta("clock", self.clock)
+            self.connection.commit()
+
+            found = sum(1 for result in results if result is not None)
+            self.hits += found
+            self.misses += len(documents) - found
+
+        return results
+
+    def put_many(self, documents, embeddings):
+        """
+        Speichert die Embeddings mehrerer Dokumente (verdrängt bei Bedarf die ältesten Einträge).
+
+        Args:
+            documents (list): Dokumente
+            embeddings (list): Embedding pro Dokument
+        """
+        if not documents or self.max_entries <= 0:
+            return
+
+        with self.lock:
+            if self.vectors is None or len(embeddings[0]) != self.dimension:
+                # Erster Eintrag oder Modell mit anderer Dimension: Cache neu anlegen
+                self._reset(len(embeddings[0]))
+
+            # Doppelte Dokumente nur einmal speichern, bereits vorhandene Schlüssel überspringen
+            new_entries = {}
+            for document, embedding in zip(documents, embeddings):
+                new_entries.setdefault(self._key(document), embedding)
+            for key_chunk in self._chunks(list(new_entries)):
+                placeholders = ",".join("?" * len(key_chunk))
+                for (key,) in self.connection.execute(
+                        f"SELECT key FROM entries WHERE key IN ({placeholders})", key_chunk):
+                    new_entries.pop(key, None)
+
+            # Höchstens max_entries der neuen Einträge übernehmen
+            new_entries = list(new_entries.items())[:self.max_entries]
+            if not new_entries:
+                return
+
+            slots = self._allocate_slots(len(new_entries))
+            self.clock += 1
+            for slot, (key, embedding) in zip(slots, new_entries):
+                self.vectors[slot] = np.asarray(embedding, dtype=np.float32)
+            self.vectors.flush()
+
+            self.connection.executemany(
+                "INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                [(key, slot, self.clock) for slot, (key, _) in zip(slots, new_entries)]
+            )
+            self._set_meta("clock", self.clock)
+            self.connection.commit()
+
+    def stats(self):
+        """
+        Liefert Kennzahlen des Caches.
+
+        Returns:
+            dict: "entries", "max_entries", "hits", "misses" und "hit_rate"
+        """
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        """
+        Schreibt die Matrix zurück und schließt den Index.
+        """
+        with self.lock:
+            if self.vectors is not None:
+                self.vectors.flush()
+                self.vectors = None
+            self.connection.close()
+
+    def _allocate_slots(self, count):
+        """
+        Reserviert Slots für neue Einträge: zuerst neue Slots am Ende der Matrix bis max_entries,
+        danach die Slots der am längsten nicht verwendeten Einträge. Das Verdrängen wird sofort
+        festgeschrieben, bevor die Slots überschrieben werden.
+
+        Returns:
+            list: Slot-Nummern
+        """
+        used = self.connection.execute("SELECT COUNT(*), COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()
+        entry_count, next_slot = used
+
+        # Verdrängte Slots werden wiederverwendet, daher sind die Slots 0 .. entry_count - 1 (nach einem
+        # Abbruch zwischen Verdrängen und Einfügen höchstens mit den Lücken eines Batches)
+        fresh = max(0, min(count, self.max_entries - entry_count))
+        slots = list(range(next_slot, next_slot + fresh))
+
+        evict = count - fresh
+        if evict:
+            evicted = self.connection.execute(
+                "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (evict,)
+            ).fetchall()
+            self.connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+            # Sonst würde ein Abbruch vor dem Commit in put_many das Löschen zurückrollen und die verdrängten
+            # Schlüssel zeigten auf Slots mit den Vektoren anderer Dokumente
+            self.connection.commit()
+            slots.extend(slot for _, slot in evicted)
+
+        if slots and max(slots) >= len(self.vectors):
+            self._grow(max(slots) + 1)
+
+        return slots
+
+    def _reset(self, dimension):
+        """
+        Verwirft alle Einträge und legt die Matrix für die angegebene Dimension neu an.
+        """
+        self.connection.execute("DELETE FROM entries")
+        self.dimension = dimension
+        self._set_meta("dimension", dimension)
+        self.connection.commit()
+
+        self.vectors = None
+        if os.path.exists(self.vectors_path):
+            os.remove(self.vectors_path)
+        self._open_vectors()
+
+    def _open_vectors(self):
+        """
+        Bindet die Matrix per Memory-Mapping ein (legt sie bei Bedarf an).
+        """
+        item_size = self.dimension * np.dtype(np.float32).itemsize
+        if not os.path.exists(self.vectors_path):
+            with open(self.vectors_path, "wb") as file:
+                file.truncate(self.growth_slots * item_size)
+
+        capacity = os.path.getsize(self.vectors_path) // item_size
+        if capacity == 0:
+            self._grow(self.growth_slots)
+            return
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _grow(self, required_slots):
+        """
+        Vergrößert die Matrix (mindestens um growth_slots bzw. auf das Doppelte, höchstens bis max_entries).
+        """
+        current = len(self.vectors) if self.vectors is not None else 0
+        capacity = min(max(required_slots, current * 2, current + self.growth_slots), max(self.max_entries, 1))
+        capacity = max(capacity, required_slots)
+
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        with open(self.vectors_path, "r+b") as file:
+            file.truncate(capacity * self.dimension * np.dtype(np.float32).itemsize)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _key(self, document):
+        """
+        Berechnet den Schlüssel aus Modellname und Dokument.
+        """
+        return hashlib.sha1(f"{self.model_name}\0{document}".encode("utf-8", "surrogateescape")).digest()
+
+    def _chunks(self, items, size=500):
+        """
+        Teilt eine Liste für SQL-Abfragen mit vielen Parametern auf.
+        """
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def _get_meta(self, key, default=None):
+        """
+        Liest einen Wert aus der Meta-Tabelle.
+        """
+        try:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            ic()
+            ic(e)
+            return default
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        """
+        Schreibt einen Wert in die Meta-Tabelle (ohne Commit).
+        """
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
@@ -0,0 +1,253 @@
+# Standardbibliotheken
+import json
+import re
+
+# Gültige Zeichen nach einem Backslash in JSON-Zeichenketten
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# Nicht-escapte Backslashes in Rohwerten (wie TerminAl.fix_json_escapes)
+INVALID_ESCAPE_PATTERN = re.compile(r'(?<!\\)\\(?!["\\/bfnrtu])')
+
+
+class IncrementalJsonParser:
+    """
+    Parser für ein JSON-Objekt, das stückweise aus einem Stream eintrifft.
+
+    Felder der obersten Ebene werden gemeldet, sobald ihr Wert abgeschlossen ist. Zeichenketten werden
+    zusätzlich schon während des Empfangs als Teilstücke gemeldet, damit z.B. Beschreibungen mitlaufend
+    angezeigt werden können. Text vor dem Objekt (z.B. Code-Fences) wird übersprungen, nicht-escapte
+    Backslashes gelten wie bei TerminAl.fix_json_escapes als normales Zeichen.
+
+    Ereignisse von feed():
+        ("delta", key, text): Teilstück einer Zeichenkette
+        ("field", key, value): Abgeschlossener Wert eines Felds
+    """
+
+    def __init__(self):
+        self.state = "start"
+        self.fields = {}  # Abgeschlossene Felder
+        self.key = None  # Aktuelles Feld
+        self.buffer = []  # Zeichen des aktuellen Schlüssels bzw. Rohwerts
+        self.escape = None  # Angefangene Escape-Sequenz in einer Zeichenkette (ohne Backslash)
+        self.high_surrogate = None  # Erste Hälfte eines \\u-Surrogatpaars
+        self.raw_depth = 0  # Verschachtelungstiefe eines Rohwerts (Zahl, Liste, Objekt, ...)
+        self.raw_in_string = False
+        self.raw_escape = False
+
+    @property
+    def done(self):
+        """
+        True, sobald das Objekt vollständig empfangen wurde.
+        """
+        return self.state == "done"
+
+    def feed(self, chunk):
+        """
+        Verarbeitet ein Teilstück des Streams.
+
+        Args:
+            chunk (str): Empfangener Text
+
+        Returns:
+            list: Ereignisse in der Reihenfolge ihres Auftretens
+
+        Raises:
+            ValueError: Wenn der Text kein gültiges JSON-Objekt ist
+        """
+        events = []
+        delta = []  # Teilstück der aktuellen Zeichenkette in diesem Chunk
+
+        for char in chunk:
+            state = self.state
+            if state == "value_string":
+                if self.escape is not None:
+                    self._string_escape(char, delta)
+                elif char == "\\":
+                    self.escape = ""
+                elif char == '"':
+                    if self.high_surrogate:
+                        self._append("", delta)
+                    self._flush(delta, events)
+                    self._close_value("".join(self.buffer), events)
+                else:
+                    self._append(char, delta)
+            elif state == "value_raw":
+                if self._raw_char(char):
+                    self._close_raw(events)
+                    # Das abschließende Komma bzw. die Klammer gehört zum Objekt
+                    self._after_value(char)
+                else:
+                    self.buffer.append(char)
+            elif state == "key":
+                if self.escape is not None:
+                    self.buffer.append(ESCAPES.get(char, "\\" + char))
+                    self.escape = None
+                elif char == "\\":
+                    self.escape = ""
+                elif char == '"':
+                    self.key = "".join(self.buffer)
+                    self.state = "colon"
+                else:
+                    self.buffer.append(char)
+            elif char.isspace():
+                continue
+            elif state == "start":
+                if char == "{":
+                    self.state = "key_start"
+            elif state == "key_start":
+                if char == '"':
+                    self.buffer = []
+                    self.state = "key"
+                elif char == "}":
+                    self.state = "done"
+                else:
+                    raise ValueError(f"Schlüssel erwartet, erhalten: {char!r}")
+            elif state == "colon":
+                if char != ":":
+                    raise ValueError(f"':' erwartet, erhalten: {char!r}")
+                self.state = "value_start"
+            elif state == "value_start":
+                self.buffer = []
+                if char == '"':
+                    self.state = "value_string"
+                    self.escape = None
+                    self.high_surrogate = None
+                else:
+                    self.state = "value_raw"
+                    self.raw_depth = 0
+                    self.raw_in_string = False
+                    self.raw_escape = False
+                    if self._raw_char(char):
+                        raise ValueError(f"Wert erwartet, erhalten: {char!r}")
+                    self.buffer.append(char)
+            elif state == "after_value":
+                self._after_value(char)
+            # Nach dem Objekt folgender Text (z.B. Code-Fences) wird ignoriert
+
+        self._flush(delta, events)
+        return events
+
+    def result(self):
+        """
+        Liefert die vollständig empfangenen Felder.
+
+        Returns:
+            dict: Feldname -> Wert
+        """
+        return dict(self.fields)
+
+    def _after_value(self, char):
+        """
+        Verarbeitet das Zeichen nach einem Wert (Komma oder schließende Klammer).
+        """
+        if char == ",":
+            self.state = "key_start"
+        elif char == "}":
+            self.state = "done"
+        else:
+            raise ValueError(f"',' oder '}}' erwartet, erhalten: {char!r}")
+
+    def _append(self, text, delta):
+        """
+        Hängt dekodierten Text an die aktuelle Zeichenkette an.
+        """
+        if self.high_surrogate:
+            # Unvollständiges Surrogatpaar: die erste Hälfte durch das Ersatzzeichen ersetzen
+            text = "\ufffd" + text
+            self.high_surrogate = None
+        self.buffer.append(text)
+        delta.append(text)
+
+    def _string_escape(self, char, delta):
+        """
+        Verarbeitet ein Zeichen einer Escape-Sequenz in einer Zeichenkette.
+        """
+        if self.escape == "":
+            if char == "u":
+                self.escape = "u"
+                return
+            self.escape = None
+            if char in ESCAPES:
+                self._append(ESCAPES[char], delta)
+            else:
+                # Nicht-escapter Backslash: als Zeichen übernehmen
+                self._append("\\" + char, delta)
+            return
+
+        self.escape += char
+        if len(self.escape) < 5:
+            return
+
+        try:
+            code = int(self.escape[1:], 16)
+        except ValueError:
+            raise ValueError(f"Ungültige Escape-Sequenz: \\{self.escape}")
+        self.escape = None
+
+        if 0xD800 <= code < 0xDC00:
+            if self.high_surrogate:
+                self._append("", delta)
+            self.high_surrogate = chr(code)
+        elif 0xDC00 <= code < 0xE000 and self.high_surrogate:
+            pair = self.high_surrogate + chr(code)
+            self.high_surrogate = None
+            self._append(pair.encode("utf-16", "surrogatepass").decode("utf-16"), delta)
+        else:
+            # Einzelne zweite Hälfte eines Surrogatpaars durch das Ersatzzeichen ersetzen
+            self._append("\ufffd" if 0xDC00 <= code < 0xE000 else chr(code), delta)
+
+    def _raw_char(self, char):
+        """
+        Verarbeitet ein Zeichen eines Rohwerts.
+
+        Returns:
+            bool: True, wenn das Zeichen den Wert beendet (Komma oder Klammer des Objekts)
+        """
+        if self.raw_in_string:
+            if self.raw_escape:
+                self.raw_escape = False
+            elif char == "\\":
+                self.raw_escape = True
+            elif char == '"':
+                self.raw_in_string = False
+            return False
+
+        if char == '"':
+            self.raw_in_string = True
+        elif char in "[{":
+            self.raw_depth += 1
+        elif char in "]}":
+            if self.raw_depth == 0:
+                return True
+            self.raw_depth -= 1
+        elif char == "," and self.raw_depth == 0:
+            return True
+        return False
+
+    def _close_raw(self, events):
+        """
+        Schließt einen Rohwert ab (Zahl, Liste, Objekt, true/false/null).
+        """
+        raw = INVALID_ESCAPE_PATTERN.sub(r"\\\\", "".join(self.buffer).strip())
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Ungültiger Wert für {self.key!r}: {e}")
+        self._close_value(value, events)
+
+    def _close_value(self, value, events):
+        """
+        Meldet einen abgeschlossenen Wert.
+        """
+        self.fields[self.key] = value
+        events.append(("field", self.key, value))
+        self.buffer = []
+        self.state = "after_value"
+
+    def _flush(self, delta, events):
+        """
+        Meldet das in diesem Chunk empfangene Teilstück der aktuellen Zeichenkette.
+        """
+        if delta:
+            events.append(("delta", self.key, "".join(delta)))
+            delta.clear()
@@ -0,0 +1,413 @@
+# Standardbibliotheken
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import threading
+import time
+
+# Externe Bibliotheken
+from icecream import ic
+
+# Interne Module
+from functions.system_mapping import SystemMapping
+
+# Konstanten aus <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Ereignisse, die für die Abbildung relevant sind
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+              | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+# Aufbau eines inotify-Ereignisses: wd, mask, cookie, len (danach folgt der Name)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class AsyncInotifyWatcher:
+    """
+    Überwacht die abgebildeten Verzeichnisse mit Linux inotify (über ctypes) und meldet Änderungen
+    gebündelt an einen Callback, statt die Abbildung in festen Intervallen neu aufzubauen.
+
+    Ereignisse werden pro Pfad zusammengefasst und erst gemeldet, wenn für debounce_seconds keine neuen
+    Ereignisse eingetroffen sind (spätestens nach max_delay_seconds). Die Anzahl der Watches ist begrenzt,
+    Teilbäume ohne Watch werden als overflow_roots gesammelt und müssen periodisch neu gescannt werden.
+
+    Watches werden immer im Executor registriert, da dafür ganze Verzeichnisbäume durchlaufen werden.
+    Neu angelegte Verzeichnisse werden dazu aus den Ereignissen in eine Warteschlange übernommen.
+    """
+
+    def __init__(self, roots, on_batch, max_watches=100000, debounce_seconds=2.0, max_delay_seconds=10.0):
+        """
+        Initialisiert den Watcher.
+
+        Args:
+            roots (list): Zu überwachende Startverzeichnisse
+            on_batch: Coroutine-Funktion, die mit (changed_paths, removed_paths, rescan_paths) aufgerufen wird
+            max_watches (int): Maximale Anzahl an Watches (wird zusätzlich durch max_user_watches begrenzt)
+            debounce_seconds (float): Ruhezeit, nach der ein Batch gemeldet wird
+            max_delay_seconds (float): Maximale Verzögerung eines Batches bei Dauerlast
+        """
+        self.roots = list(roots)
+        self.on_batch = on_batch
+        self.max_watches = min(max_watches, self._system_watch_limit())
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+        self.fd = None
+        self.libc = None
+        self.loop = None
+        self.watches = {}  # Watch-Deskriptor -> Pfad
+        self.watched_paths = {}  # Pfad -> Watch-Deskriptor
+        self.overflow_roots = set()  # Teilbäume ohne Watch, die periodisch gescannt werden müssen
+        # Schützt Deskriptor, Watches und overflow_roots (Registrierung läuft im Executor)
+        self.watch_lock = threading.Lock()
+        self.new_directories = []  # Neue Verzeichnisse, deren Watches noch registriert werden müssen
+        self.watch_task = None
+
+        # Zusammengefasste Änderungen: Pfad -> "changed" | "removed" | "rescan"
+        self.pending = {}
+        self.first_event_time = None
+        self.last_event_time = None
+        self.flush_handle = None
+        self.flush_task = None
+
+    @classmethod
+    def is_supported(cls):
+        """
+        Prüft, ob inotify auf diesem System verfügbar ist.
+
+        Returns:
+            bool: True, wenn libc die inotify-Funktionen bereitstellt
+        """
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            return hasattr(libc, "inotify_init1")
+        except OSError:
+            return False
+
+    async def start(self):
+        """
+        Erstellt die inotify-Instanz, registriert die Watches und bindet den Deskriptor an den Event-Loop.
+        Die Watches werden im Executor registriert, da dafür alle Verzeichnisse durchlaufen werden.
+        Ereignisse, die währenddessen eintreten, puffert der Kernel bis zum Start des Readers.
+        """
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+        self.loop = asyncio.get_running_loop()
+        for root in self.roots:
+            await self.loop.run_in_executor(None, self._watch_tree, root)
+
+        self.loop.add_reader(self.fd, self._on_readable)
+
+    def stop(self):
+        """
+        Beendet die Überwachung und gibt alle Watches frei.
+        """
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        if self.watch_task:
+            self.watch_task.cancel()
+            self.watch_task = None
+        self.new_directories = []
+
+        with self.watch_lock:
+            if self.fd is not None:
+                try:
+                    self.loop.remove_reader(self.fd)
+                except Exception as e:
+                    ic()
+                    ic(e)
+                # Beim Schließen des Deskriptors werden alle Watches automatisch entfernt
+                os.close(self.fd)
+                self.fd = None
+
+            self.watches.clear()
+            self.watched_paths.clear()
+
+    async def take_overflow_roots(self):
+        """
+        Liefert die Teilbäume ohne Watch für den periodischen Scan und versucht im Executor, sie erneut
+        zu überwachen, falls inzwischen wieder Watches frei sind.
+
+        Returns:
+            list: Pfade der Teilbäume, die neu gescannt werden müssen
+        """
+        with self.watch_lock:
+            overflow_roots = sorted(self.overflow_roots)
+            self.overflow_roots = set()
+        for root in overflow_roots:
+            await self.loop.run_in_executor(None, self._watch_tree, root)
+        return overflow_roots
+
+    def _queue_watch(self, directory):
+        """
+        Merkt ein neues Verzeichnis vor und startet bei Bedarf die Registrierung im Executor.
+        """
+        self.new_directories.append(directory)
+        if self.watch_task is None or self.watch_task.done():
+            self.watch_task = self.loop.create_task(self._watch_new_directories())
+
+    async def _watch_new_directories(self):
+        """
+        Registriert die Watches der vorgemerkten Verzeichnisse im Executor, bis die Warteschlange leer ist.
+        """
+        while self.new_directories:
+            directories, self.new_directories = self.new_directories, []
+            for directory in directories:
+                try:
+                    await self.loop.run_in_executor(None, self._watch_tree, directory)
+                except Exception as e:
+                    ic()
+                    ic(f"Fehler beim Überwachen von {directory}: {e}")
+
+    def _watch_tree(self, root):
+        """
+        Registriert Watches für ein Verzeichnis und alle Unterverzeichnisse (nur Verzeichnisse).
+        Ist das Budget erschöpft, werden alle noch offenen Teilbäume als overflow_roots vorgemerkt.
+
+        Args:
+            root (str): Startverzeichnis
+        """
+        exclusion_engine = SystemMapping.get_exclusion_engine()
+        pending_directories = [root]
+
+        while pending_directories:
+            directory = pending_directories.pop()
+
+            with self.watch_lock:
+                if self.fd is None:
+                    return  # Watcher wurde beendet
+                if not self._add_watch(directory):
+                    # Budget erschöpft: Verzeichnis und alle noch offenen Teilbäume periodisch scannen
+                    self._add_overflow_root(directory)
+                    for pending_directory in pending_directories:
+                        self._add_overflow_root(pending_directory)
+                    return
+
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if not entry.is_dir(follow_symlinks=False):
+                                continue
+                        except OSError:
+                            continue
+                        if not exclusion_engine.excludes(entry.path, entry.name, True):
+                            pending_directories.append(entry.path)
+            except OSError:
+                continue
+
+    def _add_watch(self, path):
+        """
+        Registriert einen Watch für ein Verzeichnis. Nur mit gehaltenem watch_lock aufrufen.
+
+        Returns:
+            bool: False, wenn das Watch-Budget erschöpft ist
+        """
+        if path in self.watched_paths:
+            return True
+
+        if len(self.watches) >= self.max_watches:
+            return False
+
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            # ENOSPC: max_user_watches des Systems erreicht
+            if error == errno.ENOSPC:
+                return False
+            # Verzeichnis ist verschwunden oder nicht lesbar - ignorieren
+            return True
+
+        # Derselbe Deskriptor kann nach einer Umbenennung für einen neuen Pfad zurückgegeben werden
+        old_path = self.watches.get(wd)
+        if old_path is not None:
+            self.watched_paths.pop(old_path, None)
+
+        self.watches[wd] = path
+        self.watched_paths[path] = wd
+        return True
+
+    def _remove_watches_under(self, path):
+        """
+        Entfernt alle Watches eines Verzeichnisses und seiner Unterverzeichnisse (z.B. nach Verschieben).
+        """
+        prefix = path.rstrip("/") + "/"
+        with self.watch_lock:
+            for watched_path in [p for p in self.watched_paths if p == path or p.startswith(prefix)]:
+                wd = self.watched_paths.pop(watched_path)
+                self.watches.pop(wd, None)
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _add_overflow_root(self, path):
+        """
+        Merkt einen Teilbaum für den periodischen Scan vor, sofern kein übergeordneter Pfad vorgemerkt ist.
+        Nur mit gehaltenem watch_lock aufrufen.
+        """
+        parent = path
+        while True:
+            if parent in self.overflow_roots:
+                return
+            next_parent = os.path.dirname(parent)
+            if next_parent == parent:
+                break
+            parent = next_parent
+        self.overflow_roots.add(path)
+
+    def _on_readable(self):
+        """
+        Liest alle verfügbaren Ereignisse vom inotify-Deskriptor und fasst sie zusammen.
+        """
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            ic()
+            ic(e)
+            return
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            self._handle_event(wd, mask, name)
+
+        self._schedule_flush()
+
+    def _handle_event(self, wd, mask, name):
+        """
+        Übersetzt ein einzelnes inotify-Ereignis in eine vorgemerkte Änderung.
+        """
+        # Ereignis-Warteschlange übergelaufen: Ereignisse verloren, alle Wurzeln neu scannen
+        if mask & IN_Q_OVERFLOW:
+            for root in self.roots:
+                self.pending[root] = "rescan"
+            return
+
+        with self.watch_lock:
+            directory = self.watches.get(wd)
+
+            # Watch wurde entfernt (Verzeichnis gelöscht oder Dateisystem ausgehängt)
+            if mask & IN_IGNORED:
+                if directory is not None:
+                    self.watches.pop(wd, None)
+                    self.watched_paths.pop(directory, None)
+                return
+
+        if directory is None or not name:
+            return
+
+        path = os.path.join(directory, name)
+        is_directory = bool(mask & IN_ISDIR)
+
+        if SystemMapping.get_exclusion_engine().excludes(path, name, is_directory):
+            return
+
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self.pending[path] = "removed"
+            if is_directory and mask & IN_MOVED_FROM:
+                self._remove_watches_under(path)
+        elif is_directory and mask & (IN_CREATE | IN_MOVED_TO):
+            # Neues Verzeichnis im Executor überwachen und Inhalte erfassen, die vor dem Watch entstanden
+            # sind (der Batch wird erst nach der Registrierung gemeldet, siehe _on_flush_timer)
+            self._queue_watch(path)
+            self.pending[path] = "rescan"
+        elif mask & (IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE):
+            self.pending[path] = "changed"
+        else:
+            return
+
+        # Änderungszeit des übergeordneten Verzeichnisses hat sich ebenfalls geändert
+        if self.pending.get(directory) is None:
+            self.pending[directory] = "changed"
+
+    def _schedule_flush(self):
+        """
+        Plant die Meldung des aktuellen Batches (Debouncing).
+        """
+        if not self.pending:
+            return
+
+        now = time.monotonic()
+        self.last_event_time = now
+        if self.first_event_time is None:
+            self.first_event_time = now
+
+        if self.flush_handle is None:
+            self.flush_handle = self.loop.call_later(self.debounce_seconds, self._on_flush_timer)
+
+    def _on_flush_timer(self):
+        """
+        Prüft, ob die Ruhezeit abgelaufen ist, und startet sonst einen neuen Timer.
+        """
+        self.flush_handle = None
+        now = time.monotonic()
+        quiet_for = now - self.last_event_time
+        waiting_for = now - self.first_event_time
+
+        # Vorherige Meldung oder Registrierung neuer Watches läuft noch oder es treffen noch Ereignisse ein
+        busy = (
+            (self.flush_task is not None and not self.flush_task.done())
+            or (self.watch_task is not None and not self.watch_task.done())
+        )
+        if busy or (quiet_for < self.debounce_seconds and waiting_for < self.max_delay_seconds):
+            delay = max(self.debounce_seconds - quiet_for, 0.1)
+            self.flush_handle = self.loop.call_later(delay, self._on_flush_timer)
+            return
+
+        pending, self.pending = self.pending, {}
+        self.first_event_time = None
+        self.flush_task = self.loop.create_task(self._flush(pending))
+
+    async def _flush(self, pending):
+        """
+        Meldet einen Batch zusammengefasster Änderungen an den Callback.
+
+        Args:
+            pending (dict): Pfad -> "changed" | "removed" | "rescan"
+        """
+        changed_paths = [path for path, action in pending.items() if action == "changed"]
+        removed_paths = [path for path, action in pending.items() if action == "removed"]
+        rescan_paths = [path for path, action in pending.items() if action == "rescan"]
+
+        try:
+            await self.on_batch(changed_paths, removed_paths, rescan_paths)
+        except Exception as e:
+            ic()
+            ic(f"Fehler beim Anwenden der Dateisystem-Ereignisse: {e}")
+
+    def _system_watch_limit(self):
+        """
+        Liest das systemweite Limit für Watches pro Benutzer und lässt Reserve für andere Programme.
+
+        Returns:
+            int: Nutzbare Anzahl an Watches
+        """
+        try:
+            with open("/proc/sys/fs/inotify/max_user_watches") as file:
+                return int(int(file.read().strip()) * 0.9)
+        except (OSError, ValueError):
+            return 8192
@@ -0,0 +1,535 @@
+# Standardbibliotheken
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+
+# Externe Bibliotheken
+from icecream import ic
+
+
+class KeywordIndex:
+    """
+    Schlüsselwort-Index über Elementnamen und Pfade für \\search und <Schlüsselwort>-Abfragen.
+
+    Pro Generation der Hauptsammlung gibt es eine FTS5-Tabelle "entries_g<n>" mit Trigramm-Tokenizer,
+    damit beliebige Teilzeichenketten (ab drei Zeichen) über den Index statt über einen Scan gefunden
+    werden, sowie eine Tabelle "names_g<n>" mit B-Baum-Index für exakte Elementnamen. Der Updater pflegt
+    beide parallel zu ChromaDB, Leser verwenden die Tabellen der Generation, die sie über den Alias
+    aufgelöst haben.
+
+    Im Embedding-Modus "deferred" stehen Einträge im Index, bevor sie eingebettet sind. Die Tabelle
+    "pending_g<n>" führt diese Einträge, bis der Updater sie nachträglich eingebettet hat. Von Abfragen
+    getroffene Einträge werden über request_embedding vorgezogen.
+
+    Die Rangfolge wird nur über eine begrenzte Kandidatenmenge pro Schlüsselwort berechnet (BM25-artig,
+    Treffer im Elementnamen stärker gewichtet als Treffer im Pfad). bm25() von FTS5 müsste dafür alle
+    Treffer einer Phrase zählen, was bei häufigen Trigrammen die Laufzeit der Abfrage bestimmt.
+    """
+
+    table_pattern = re.compile(r"^entries_g(\d+)$")
+
+    # BM25-Gewichte der Spalten item und path
+    item_weight = 10.0
+    path_weight = 1.0
+
+    # Kandidaten pro Schlüsselwort und Spalte, aus denen die besten Treffer ausgewählt werden
+    candidate_limit = 300
+
+    # BM25-Parameter für Termfrequenz-Sättigung und Längennormalisierung
+    k1 = 1.2
+    b = 0.75
+
+    # ID-Präfix der Einträge pro Werkzeug (siehe AsyncChromaDBUpdater._document_id)
+    tool_prefixes = {"bash": "os:", "sql": "sql:"}
+
+    # Von Abfragen getroffene, noch nicht eingebettete Einträge (prozessweit, vom Updater abgeholt)
+    requested_ids = set()
+    requested_lock = threading.Lock()
+
+    def __init__(self, index_path, read_only=False):
+        """
+        Öffnet (bzw. erstellt) den Index.
+
+        Args:
+            index_path (str): Pfad zur SQLite-Datei
+            read_only (bool, optional): Nur lesend öffnen (Retriever)
+        """
+        self.index_path = index_path
+        self.read_only = read_only
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pending_tables = set()  # Generationen mit angelegter pending-Tabelle
+        self._connect()
+
+    def content_version(self, generation):
+        """
+        Liefert den Änderungsstand der Einträge einer Generation. Er ändert sich nur, wenn Einträge
+        geschrieben oder entfernt werden, nicht beim nachträglichen Einbetten (mark_embedded), und dient
+        als Schlüssel für Caches.
+
+        Returns:
+            int: Änderungsstand oder None ohne Datenbank
+        """
+        if not self._connect():
+            return None
+        with self.lock:
+            try:
+                row = self.connection.execute(
+                    "SELECT version FROM versions WHERE generation = ?", (int(generation),)
+                ).fetchone()
+            except sqlite3.OperationalError:
+                # Index aus einer Version ohne Änderungsstand, noch nicht beschrieben
+                return 0
+        return row[0] if row else 0
+
+    def has_generation(self, generation):
+        """
+        Prüft, ob für eine Generation eine Index-Tabelle existiert.
+        """
+        return generation in self.generations()
+
+    def generations(self):
+        """
+        Liefert die Generationen, für die eine Index-Tabelle existiert.
+
+        Returns:
+            list: Generationsnummern
+        """
+        if not self._connect():
+            return []
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'entries_g%'"
+            ).fetchall()
+        return sorted(int(match.group(1)) for (name,) in rows if (match := self.table_pattern.match(name)))
+
+    def create_generation(self, generation):
+        """
+        Legt eine leere Index-Tabelle für eine neue Generation an (eine vorhandene wird ersetzt).
+        """
+        table = self._table(generation)
+        names = self._names_table(generation)
+        with self.lock:
+            self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self.connection.execute(f"DROP TABLE IF EXISTS {names}")
+            self.connection.execute(
+                f"CREATE VIRTUAL TABLE {table} USING fts5("
+                "item, path, id UNINDEXED, document UNINDEXED, metadata UNINDEXED, tokenize = 'trigram')"
+            )
+            self.connection.execute(f"CREATE TABLE {names} (rowid INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+            self.connection.execute(f"CREATE INDEX {names}_name ON {names} (name)")
+            self.connection.execute(f"DROP TABLE IF EXISTS {self._pending_table(generation)}")
+            self.pending_tables.discard(generation)
+            self._create_pending_table(generation)
+            self._bump_version(generation)
+            self.connection.commit()
+
+    def drop_generation(self, generation):
+        """
+        Löscht die Index-Tabellen einer Generation.
+        """
+        with self.lock:
+            self.connection.execute(f"DROP TABLE IF EXISTS {self._table(generation)}")
+            self.connection.execute(f"DROP TABLE IF EXISTS {self._names_table(generation)}")
+            self.connection.execute(f"DROP TABLE IF EXISTS {self._pending_table(generation)}")
+            self.connection.commit()
+            self.pending_tables.discard(generation)
+
+    def drop_unused(self, alive_generations):
+        """
+        Löscht die Index-Tabellen aller Generationen, deren Sammlung nicht mehr existiert.
+
+        Args:
+            alive_generations (iterable): Generationen mit vorhandener Sammlung in ChromaDB
+        """
+        alive_generations = set(alive_generations)
+        for generation in self.generations():
+            if generation not in alive_generations:
+                self.drop_generation(generation)
+
+    def upsert(self, generation, entries, pending_ids=()):
+        """
+        Schreibt die Einträge eines Batches in den Index einer Generation (ersetzt vorhandene Einträge).
+
+        Args:
+            generation (int): Generation
+            entries (tuple): IDs, Dokumente, Metadaten und Schnappschuss-Einträge (Pfad an Position 1)
+            pending_ids (list, optional): IDs der Einträge, die noch nicht eingebettet wurden
+        """
+        ids, documents, metadatas, records = entries
+        if not ids:
+            return
+
+        table = self._table(generation)
+        names = self._names_table(generation)
+        pending = self._pending_table(generation)
+        rows = [
+            (self._rowid(id_), metadata.get("item") or metadata.get("table") or "", record[1], id_, document,
+             json.dumps(metadata, ensure_ascii=False))
+            for id_, document, metadata, record in zip(ids, documents, metadatas, records)
+        ]
+        with self.lock:
+            self.connection.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(row[0],) for row in rows])
+            self.connection.executemany(
+                f"INSERT INTO {table} (rowid, item, path, id, document, metadata) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {names} (rowid, name) VALUES (?, ?)", [(row[0], row[1].lower()) for row in rows]
+            )
+            self._create_pending_table(generation)
+            self.connection.executemany(f"DELETE FROM {pending} WHERE rowid = ?", [(row[0],) for row in rows])
+            self.connection.executemany(
+                f"INSERT INTO {pending} (rowid) VALUES (?)", [(self._rowid(id_),) for id_ in pending_ids]
+            )
+            self._bump_version(generation)
+            self.connection.commit()
+
+    def delete(self, generation, ids):
+        """
+        Entfernt Einträge aus dem Index einer Generation.
+        """
+        rowids = [(self._rowid(id_),) for id_ in ids]
+        with self.lock:
+            self.connection.executemany(f"DELETE FROM {self._table(generation)} WHERE rowid = ?", rowids)
+            self.connection.executemany(f"DELETE FROM {self._names_table(generation)} WHERE rowid = ?", rowids)
+            self._create_pending_table(generation)
+            self.connection.executemany(f"DELETE FROM {self._pending_table(generation)} WHERE rowid = ?", rowids)
+            self._bump_version(generation)
+            self.connection.commit()
+
+    def pending(self, generation, limit, preferred_ids=()):
+        """
+        Liefert noch nicht eingebettete Einträge einer Generation, bevorzugte Einträge zuerst.
+
+        Args:
+            generation (int): Generation
+            limit (int): Maximale Anzahl Einträge
+            preferred_ids (iterable, optional): IDs, die vorgezogen werden (z.B. von Abfragen getroffen)
+
+        Returns:
+            tuple: Listen mit IDs, Dokumenten und Metadaten
+        """
+        table = self._table(generation)
+        pending = self._pending_table(generation)
+        preferred = [self._rowid(id_) for id_ in preferred_ids][:limit]
+
+        with self.lock:
+            self._create_pending_table(generation)
+            rows = []
+            if preferred:
+                rows = self.connection.execute(
+                    f"SELECT t.rowid, t.id, t.document, t.metadata FROM {pending} AS p "
+                    f"JOIN {table} AS t ON t.rowid = p.rowid WHERE p.rowid IN ({', '.join('?' * len(preferred))})",
+                    preferred
+                ).fetchall()
+            if len(rows) < limit:
+                seen = {row[0] for row in rows}
+                rows += [row for row in self.connection.execute(
+                    f"SELECT t.rowid, t.id, t.document, t.metadata FROM {pending} AS p "
+                    f"JOIN {table} AS t ON t.rowid = p.rowid LIMIT ?",
+                    (limit,)
+                ) if row[0] not in seen][:limit - len(rows)]
+
+        return [row[1] for row in rows], [row[2] for row in rows], [json.loads(row[3]) for row in rows]
+
+    def mark_embedded(self, generation, ids):
+        """
+        Entfernt Einträge aus der Liste der noch nicht eingebetteten Einträge einer Generation.
+        """
+        with self.lock:
+            self._create_pending_table(generation)
+            self.connection.executemany(
+                f"DELETE FROM {self._pending_table(generation)} WHERE rowid = ?", [(self._rowid(id_),) for id_ in ids]
+            )
+            self.connection.commit()
+
+    def pending_count(self, generation):
+        """
+        Liefert die Anzahl noch nicht eingebetteter Einträge einer Generation.
+        """
+        with self.lock:
+            self._create_pending_table(generation)
+            return self.connection.execute(f"SELECT count(*) FROM {self._pending_table(generation)}").fetchone()[0]
+
+    @classmethod
+    def request_embedding(cls, ids):
+        """
+        Merkt von einer Abfrage getroffene Einträge vor, damit der Updater sie bevorzugt einbettet.
+        Bereits eingebettete Einträge werden dabei vom Updater ignoriert.
+
+        Args:
+            ids (list): IDs der getroffenen Einträge
+        """
+        with cls.requested_lock:
+            cls.requested_ids.update(ids)
+
+    @classmethod
+    def take_requested(cls):
+        """
+        Liefert die vorgemerkten Einträge und leert die Vormerkung.
+
+        Returns:
+            set: IDs
+        """
+        with cls.requested_lock:
+            requested_ids, cls.requested_ids = cls.requested_ids, set()
+        return requested_ids
+
+    def search(self, generation, keywords, top_k=5, tool=None):
+        """
+        Sucht Einträge, deren Elementname oder Pfad eines der Schlüsselwörter enthält.
+
+        Die Suche erfolgt in Stufen, die jeweils nur begrenzt viele Zeilen lesen:
+        1. Exakte Elementnamen über den B-Baum-Index (stehen immer vorne).
+        2. Pro Schlüsselwort Trigramm-Treffer im Elementnamen, bei zu wenigen Treffern zusätzlich im Pfad.
+        3. Bewertung der Kandidaten und Laden der Dokumente für die besten top_k.
+        Schlüsselwörter mit weniger als drei Zeichen können nicht über Trigramme gesucht werden
+        und werden per LIKE auf den Elementnamen geprüft.
+
+        Args:
+            generation (int): Generation
+            keywords (list): Schlüsselwörter (Kleinbuchstaben)
+            top_k (int, optional): Maximale Anzahl Treffer
+            tool (str, optional): Nur Einträge dieses Werkzeugs ("bash" oder "sql")
+
+        Returns:
+            dict: "ids", "documents" und "metadatas" im Format einer ChromaDB-Abfrage
+        """
+        table = self._table(generation)
+        prefix = self.tool_prefixes.get(tool, "")
+        candidates = {}  # rowid -> (item, path, id)
+        matches = {}  # Schlüsselwort -> Anzahl Kandidaten (Schätzung der Dokumentfrequenz)
+
+        with self.lock:
+            exact = {rowid for (rowid,) in self.connection.execute(
+                f"SELECT rowid FROM {self._names_table(generation)} "
+                f"WHERE name IN ({', '.join('?' * len(keywords))}) LIMIT ?",
+                [*keywords, top_k]
+            )}
+
+            for keyword in keywords:
+                if len(keyword) >= 3:
+                    phrase = '"' + keyword.replace('"', '""') + '"'
+                    rows = self._candidates(table, f"item : {phrase}")
+                    if len(rows) < self.candidate_limit:
+                        rows += self._candidates(table, f"path : {phrase}")
+                else:
+                    # Die Namenstabelle ist deutlich kleiner als der Inhalt der FTS-Tabelle
+                    rows = self.connection.execute(
+                        f"SELECT t.rowid, t.item, t.path, t.id FROM {table} AS t JOIN ("
+                        f"SELECT rowid FROM {self._names_table(generation)} WHERE name LIKE ? LIMIT ?"
+                        f") AS n ON t.rowid = n.rowid",
+                        [f"%{keyword}%", self.candidate_limit]
+                    ).fetchall()
+                matches[keyword] = len(rows)
+                candidates.update((row[0], row[1:]) for row in rows if row[3].startswith(prefix))
+
+            for rowid in exact - candidates.keys():
+                row = self.connection.execute(
+                    f"SELECT item, path, id FROM {table} WHERE rowid = ?", (rowid,)
+                ).fetchone()
+                if row and row[2].startswith(prefix):
+                    candidates[rowid] = row
+
+            count = max(len(candidates), 1)
+            average_item = max(sum(len(candidate[0]) for candidate in candidates.values()) / count, 1.0)
+            average_path = max(sum(len(candidate[1]) for candidate in candidates.values()) / count, 1.0)
+            ranked = sorted(
+                candidates,
+                key=lambda rowid: (
+                    rowid in exact, self._score(candidates[rowid], matches, average_item, average_path)
+                ),
+                reverse=True
+            )[:top_k]
+
+            documents = {rowid: (id_, document, metadata) for rowid, id_, document, metadata in self.connection.execute(
+                f"SELECT rowid, id, document, metadata FROM {table} WHERE rowid IN ({', '.join('?' * len(ranked))})",
+                ranked
+            )} if ranked else {}
+
+        rows = [documents[rowid] for rowid in ranked if rowid in documents]
+        return {
+            "ids": [[row[0] for row in rows]],
+            "documents": [[row[1] for row in rows]],
+            "metadatas": [[json.loads(row[2]) for row in rows]],
+        }
+
+    def sample(self, generation, count, tool=None):
+        """
+        Liefert zufällig ausgewählte Einträge einer Generation (z.B. als Testanfragen für divers/evaluate_retrieval.py).
+
+        Args:
+            generation (int): Generation
+            count (int): Anzahl Einträge
+            tool (str, optional): Nur Einträge dieses Werkzeugs ("bash" oder "sql")
+
+        Returns:
+            list: Tupel aus ID, Elementname und Pfad
+        """
+        prefix = self.tool_prefixes.get(tool, "")
+        with self.lock:
+            return self.connection.execute(
+                f"SELECT id, item, path FROM {self._table(generation)} "
+                f"WHERE substr(id, 1, ?) = ? ORDER BY random() LIMIT ?",
+                (len(prefix), prefix, count)
+            ).fetchall()
+
+    def entries(self, generation, tool=None, batch_size=10000):
+        """
+        Liefert alle Einträge einer Generation batchweise (z.B. für den Präfixbaum der Vervollständigung).
+        Das Lock wird nur während des Lesens eines Batches gehalten.
+
+        Args:
+            generation (int): Generation
+            tool (str, optional): Nur Einträge dieses Werkzeugs ("bash" oder "sql")
+            batch_size (int, optional): Zeilen pro Batch
+
+        Yields:
+            tuple: Elementname, Pfad und Dateityp
+        """
+        prefix = self.tool_prefixes.get(tool, "")
+        with self.lock:
+            cursor = self.connection.execute(
+                f"SELECT item, path, json_extract(metadata, '$.filetype') FROM {self._table(generation)} "
+                f"WHERE substr(id, 1, ?) = ?",
+                (len(prefix), prefix)
+            )
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+
+    def _candidates(self, table, match):
+        """
+        Liefert höchstens candidate_limit Treffer eines MATCH-Ausdrucks (ohne Sortierung).
+
+        Returns:
+            list: Tupel aus rowid, Elementname, Pfad und ID
+        """
+        return self.connection.execute(
+            f"SELECT rowid, item, path, id FROM {table} WHERE {table} MATCH ? LIMIT ?", [match, self.candidate_limit]
+        ).fetchall()
+
+    def _score(self, candidate, matches, average_item, average_path):
+        """
+        Bewertet einen Kandidaten BM25-artig: Termfrequenz mit Sättigung und Längennormalisierung je Spalte,
+        gewichtet mit einer aus der Kandidatenmenge geschätzten inversen Dokumentfrequenz.
+
+        Args:
+            candidate (tuple): Elementname, Pfad und ID
+            matches (dict): Anzahl Kandidaten pro Schlüsselwort
+            average_item (float): Durchschnittliche Länge der Elementnamen aller Kandidaten
+            average_path (float): Durchschnittliche Länge der Pfade aller Kandidaten
+
+        Returns:
+            float: Bewertung (höher ist besser)
+        """
+        item, path = candidate[0].lower(), candidate[1].lower()
+        score = 0.0
+        for keyword, count in matches.items():
+            idf = math.log(1 + self.candidate_limit / max(count, 1))
+            score += idf * (
+                self.item_weight * self._saturate(item.count(keyword), len(item), average_item)
+                + self.path_weight * self._saturate(path.count(keyword), len(path), average_path)
+            )
+        return score
+
+    def _saturate(self, frequency, length, average_length):
+        """
+        Termfrequenz-Anteil der BM25-Formel.
+        """
+        if not frequency:
+            return 0.0
+        return frequency * (self.k1 + 1) / (frequency + self.k1 * (1 - self.b + self.b * length / average_length))
+
+    def close(self):
+        """
+        Schließt die Verbindung.
+        """
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def _connect(self):
+        """
+        Öffnet die Verbindung bei Bedarf. Lesend geöffnete Indizes existieren erst nach dem ersten Update.
+
+        Returns:
+            bool: True, wenn eine Verbindung besteht
+        """
+        if self.connection is not None:
+            return True
+        try:
+            if self.read_only:
+                if not os.path.exists(self.index_path):
+                    return False
+                self.connection = sqlite3.connect(
+                    f"file:{self.index_path}?mode=ro", uri=True, check_same_thread=False
+                )
+            else:
+                os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+                self.connection = sqlite3.connect(self.index_path, check_same_thread=False)
+                self.connection.execute("PRAGMA journal_mode=WAL;")
+                self.connection.execute("PRAGMA synchronous=NORMAL;")
+        except sqlite3.Error as e:
+            ic()
+            ic(f"Schlüsselwort-Index konnte nicht geöffnet werden: {e}")
+            return False
+        return True
+
+    def _table(self, generation):
+        """
+        Liefert den Tabellennamen einer Generation.
+        """
+        return f"entries_g{int(generation)}"
+
+    def _names_table(self, generation):
+        """
+        Liefert den Namen der Tabelle mit den exakten Elementnamen einer Generation.
+        """
+        return f"names_g{int(generation)}"
+
+    def _pending_table(self, generation):
+        """
+        Liefert den Namen der Tabelle mit den noch nicht eingebetteten Einträgen einer Generation.
+        """
+        return f"pending_g{int(generation)}"
+
+    def _create_pending_table(self, generation):
+        """
+        Legt die pending-Tabelle einer Generation bei Bedarf an (auch für Generationen, deren Index vor
+        Einführung des Modus "deferred" erstellt wurde). Aufruf nur mit gehaltenem Lock.
+        """
+        if generation in self.pending_tables:
+            return
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._pending_table(generation)} (rowid INTEGER PRIMARY KEY)"
+        )
+        self.pending_tables.add(generation)
+
+    def _bump_version(self, generation):
+        """
+        Erhöht den Änderungsstand einer Generation (siehe content_version). Aufruf nur mit gehaltenem Lock,
+        innerhalb der Transaktion der Änderung.
+        """
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS versions (generation INTEGER PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        self.connection.execute(
+            "INSERT INTO versions (generation, version) VALUES (?, 1) "
+            "ON CONFLICT (generation) DO UPDATE SET version = version + 1",
+            (int(generation),)
+        )
+
+    def _rowid(self, id_):
+        """
+        Leitet eine stabile rowid aus der ID eines Eintrags ab (60 Bit des SHA1-Hashes).
+        """
+        return int(hashlib.sha1(id_.encode("utf-8", "surrogateescape")).hexdigest()[:15], 16)
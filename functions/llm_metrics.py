@@ -0,0 +1,59 @@
+# Standardbibliotheken
+from collections import deque
+import threading
+
+
+class LlmMetrics:
+    """
+    Sammelt die Laufzeitkennzahlen der Antworten von Ollama.
+
+    Ollama meldet pro Antwort die Dauer der Prompt-Auswertung (Prefill) und der Generierung in
+    Nanosekunden. Bei wiederverwendetem Prompt-Cache zählt "prompt_eval_count" nur die neu ausgewerteten
+    Tokens, ein sinkender Wert über eine Sitzung zeigt also, wie viel des Prompts wiederverwendet wird.
+    """
+
+    def __init__(self, window=20):
+        """
+        Args:
+            window (int, optional): Anzahl der letzten Anfragen für die Mittelwerte
+        """
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def record(self, response):
+        """
+        Übernimmt die Kennzahlen einer abgeschlossenen Antwort (bzw. des letzten Stream-Teils).
+
+        Args:
+            response: Antwort von AsyncClient.chat
+        """
+        if not response.get("prompt_eval_duration") and not response.get("eval_duration"):
+            return
+        sample = {
+            "prompt_tokens": response.get("prompt_eval_count") or 0,
+            "prompt_ms": (response.get("prompt_eval_duration") or 0) / 1e6,
+            "eval_tokens": response.get("eval_count") or 0,
+            "eval_ms": (response.get("eval_duration") or 0) / 1e6,
+            "load_ms": (response.get("load_duration") or 0) / 1e6,
+        }
+        with self.lock:
+            self.samples.append(sample)
+            self.requests += 1
+
+    def report(self):
+        """
+        Liefert die letzte Anfrage und Mittelwerte über die letzten Anfragen.
+
+        Returns:
+            dict: "requests", "last" und "average" (jeweils prompt_tokens, prompt_ms, eval_tokens, eval_ms,
+                load_ms) oder None ohne Messwerte
+        """
+        with self.lock:
+            if not self.samples:
+                return None
+            samples = list(self.samples)
+            requests = self.requests
+
+        average = {key: sum(sample[key] for sample in samples) / len(samples) for key in samples[0]}
+        return {"requests": requests, "last": samples[-1], "average": average}
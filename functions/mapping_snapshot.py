@@ -0,0 +1,300 @@
+# Standardbibliotheken
+import os
+import sqlite3
+
+# Externe Bibliotheken
+from icecream import ic
+
+
+class MappingSnapshot:
+    """
+    Persistenter Schnappschuss der zuletzt in ChromaDB geschriebenen Einträge.
+    Speichert pro stabiler ID (Pfad, mtime, Inode, Größe, Digest) in einer SQLite-Datei,
+    damit ein Update nur geänderte Einträge neu einbetten und verschwundene Einträge löschen muss.
+
+    Der Abgleich arbeitet nach dem Mark-and-Sweep-Prinzip: Jeder Update-Zyklus erhält eine Nummer,
+    alle im Zyklus gesehenen Einträge werden damit markiert, nicht markierte Einträge sind verschwunden.
+    """
+
+    # Maximale Anzahl an Parametern pro SQL-Abfrage
+    query_chunk_size = 500
+
+    def __init__(self, snapshot_path):
+        """
+        Öffnet (bzw. erstellt) die Snapshot-Datenbank.
+
+        Args:
+            snapshot_path (str): Pfad zur SQLite-Datei des Schnappschusses
+        """
+        os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(snapshot_path)
+        self.connection.execute("PRAGMA journal_mode=WAL;")
+        self.connection.execute("PRAGMA synchronous=NORMAL;")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id TEXT PRIMARY KEY, path TEXT, mtime INTEGER, inode INTEGER, size INTEGER, digest TEXT, "
+            "seen INTEGER)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_path ON entries (path)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints (database TEXT PRIMARY KEY, fingerprint TEXT)"
+        )
+        self.connection.commit()
+        self.cycle = int(self._get_meta("cycle", 0))
+
+    def close(self):
+        """
+        Schließt die Verbindung zur Snapshot-Datenbank.
+        """
+        self.connection.close()
+
+    def is_valid(self):
+        """
+        Gibt an, ob der Schnappschuss dem Inhalt der Hauptsammlung entspricht.
+
+        Returns:
+            bool: True, wenn der letzte Abgleich vollständig abgeschlossen wurde
+        """
+        return self._get_meta("valid", "0") == "1"
+
+    def generation(self):
+        """
+        Liefert die Generation der Hauptsammlung, zu der der Schnappschuss gehört.
+
+        Returns:
+            int: Generationsnummer oder None
+        """
+        generation = self._get_meta("generation")
+        return int(generation) if generation is not None else None
+
+    def set_generation(self, generation):
+        """
+        Bindet den Schnappschuss an eine Generation der Hauptsammlung.
+
+        Args:
+            generation (int): Generationsnummer
+        """
+        self._set_meta("generation", generation)
+        self.connection.commit()
+
+    def count(self):
+        """
+        Liefert die Anzahl der Einträge im Schnappschuss (z.B. als Schätzung für den nächsten Abgleich).
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def set_valid(self, valid):
+        """
+        Markiert den Schnappschuss als gültig oder ungültig.
+
+        Args:
+            valid (bool): Neuer Gültigkeitsstatus
+        """
+        self._set_meta("valid", "1" if valid else "0")
+        self.connection.commit()
+
+    def clear(self):
+        """
+        Entfernt alle Einträge und markiert den Schnappschuss als ungültig (z.B. vor einem Neuaufbau).
+        """
+        self.connection.execute("DELETE FROM entries")
+        self.connection.execute("DELETE FROM fingerprints")
+        self._set_meta("valid", "0")
+        self.connection.commit()
+
+    def fingerprints(self):
+        """
+        Liefert die Katalog-Fingerabdrücke der Datenbanken aus dem letzten Abgleich.
+
+        Returns:
+            dict: Datenbankname -> Fingerabdruck
+        """
+        return dict(self.connection.execute("SELECT database, fingerprint FROM fingerprints"))
+
+    def store_fingerprints(self, fingerprints):
+        """
+        Ersetzt die gespeicherten Katalog-Fingerabdrücke (nicht mehr enthaltene Datenbanken werden entfernt).
+
+        Args:
+            fingerprints (dict): Datenbankname -> Fingerabdruck
+        """
+        self.connection.execute("DELETE FROM fingerprints")
+        self.connection.executemany("INSERT INTO fingerprints (database, fingerprint) VALUES (?, ?)",
+                                    fingerprints.items())
+        self.connection.commit()
+
+    def begin_cycle(self):
+        """
+        Startet einen neuen Abgleichszyklus.
+
+        Returns:
+            int: Nummer des neuen Zyklus
+        """
+        self.cycle += 1
+        self._set_meta("cycle", self.cycle)
+        self.connection.commit()
+        return self.cycle
+
+    def diff(self, records):
+        """
+        Vergleicht einen Batch mit dem Schnappschuss. Unveränderte Einträge werden als gesehen markiert,
+        neue oder geänderte Einträge werden zurückgegeben und müssen nach dem Schreiben in ChromaDB
+        mit store() übernommen werden.
+
+        Args:
+            records (list): Liste von Tupeln (id, path, mtime, inode, size, digest)
+
+        Returns:
+            list: Neue oder geänderte Einträge
+        """
+        known = {}
+        ids = [record[0] for record in records]
+        for id_chunk in self._chunks(ids):
+            placeholders = ",".join("?" * len(id_chunk))
+            cursor = self.connection.execute(
+                f"SELECT id, path, mtime, inode, size, digest FROM entries WHERE id IN ({placeholders})",
+                id_chunk
+            )
+            for row in cursor:
+                known[row[0]] = row
+
+        changed = []
+        unchanged_ids = []
+        for record in records:
+            if known.get(record[0]) == tuple(record):
+                unchanged_ids.append((self.cycle, record[0]))
+            else:
+                changed.append(record)
+
+        # Unveränderte Einträge für den aktuellen Zyklus markieren
+        self.connection.executemany("UPDATE entries SET seen = ? WHERE id = ?", unchanged_ids)
+        self.connection.commit()
+
+        return changed
+
+    def store(self, records):
+        """
+        Übernimmt in ChromaDB geschriebene Einträge in den Schnappschuss.
+
+        Args:
+            records (list): Liste von Tupeln (id, path, mtime, inode, size, digest)
+        """
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO entries (id, path, mtime, inode, size, digest, seen) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [tuple(record) + (self.cycle,) for record in records]
+        )
+        self.connection.commit()
+
+    def vanished(self, batch_size, prefix=None):
+        """
+        Liefert die IDs aller Einträge, die im aktuellen Zyklus nicht gesehen wurden, in Batches.
+        Die IDs müssen nach dem Löschen in ChromaDB mit remove() entfernt werden.
+
+        Args:
+            batch_size (int): Anzahl IDs pro Batch
+            prefix (str, optional): Nur Einträge unterhalb dieses Pfads berücksichtigen
+                (für den Abgleich einzelner Teilbäume)
+
+        Yields:
+            list: IDs verschwundener Einträge
+        """
+        prefix_condition, prefix_params = self._prefix_condition(prefix)
+        while True:
+            cursor = self.connection.execute(
+                f"SELECT id FROM entries WHERE seen != ? AND {prefix_condition} LIMIT ?",
+                (self.cycle, *prefix_params, batch_size)
+            )
+            ids = [row[0] for row in cursor]
+            if not ids:
+                return
+            yield ids
+
+    def ids_under(self, prefix, batch_size):
+        """
+        Liefert die IDs eines Pfads und aller Einträge darunter in Batches (z.B. für gelöschte Ordner).
+        Die IDs müssen nach dem Löschen in ChromaDB mit remove() entfernt werden.
+
+        Args:
+            prefix (str): Pfad des Eintrags bzw. Teilbaums
+            batch_size (int): Anzahl IDs pro Batch
+
+        Yields:
+            list: IDs der Einträge
+        """
+        prefix_condition, prefix_params = self._prefix_condition(prefix)
+        while True:
+            cursor = self.connection.execute(
+                f"SELECT id FROM entries WHERE {prefix_condition} LIMIT ?",
+                (*prefix_params, batch_size)
+            )
+            ids = [row[0] for row in cursor]
+            if not ids:
+                return
+            yield ids
+
+    def keep_under(self, prefix):
+        """
+        Markiert einen Pfad und alle Einträge darunter als gesehen, ohne sie zu vergleichen
+        (z.B. für eine Datenbank, die im aktuellen Zyklus nicht erreichbar war).
+
+        Args:
+            prefix (str): Pfad des Eintrags bzw. Teilbaums
+        """
+        prefix_condition, prefix_params = self._prefix_condition(prefix)
+        self.connection.execute(
+            f"UPDATE entries SET seen = ? WHERE {prefix_condition}",
+            (self.cycle, *prefix_params)
+        )
+        self.connection.commit()
+
+    def remove(self, ids):
+        """
+        Entfernt Einträge aus dem Schnappschuss.
+
+        Args:
+            ids (list): Zu entfernende IDs
+        """
+        self.connection.executemany("DELETE FROM entries WHERE id = ?", [(id_,) for id_ in ids])
+        self.connection.commit()
+
+    def _get_meta(self, key, default=None):
+        """
+        Liest einen Wert aus der Meta-Tabelle.
+        """
+        try:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            ic()
+            ic(e)
+            return default
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        """
+        Schreibt einen Wert in die Meta-Tabelle (ohne Commit).
+        """
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _prefix_condition(self, prefix):
+        """
+        Erstellt eine SQL-Bedingung für einen Pfad und alle Pfade darunter.
+        Verwendet einen Bereichsvergleich statt LIKE, damit der Index auf path genutzt wird.
+
+        Returns:
+            tuple: SQL-Bedingung und Parameter
+        """
+        if prefix is None:
+            return "1", ()
+
+        prefix = prefix.rstrip("/")
+        # "0" folgt in der Sortierung direkt auf "/" und begrenzt damit den Teilbaum
+        return "(path = ? OR (path >= ? AND path < ?))", (prefix, prefix + "/", prefix + "0")
+
+    def _chunks(self, items):
+        """
+        Teilt eine Liste in Teile mit höchstens query_chunk_size Elementen.
+        """
+        for i in range(0, len(items), self.query_chunk_size):
+            yield items[i:i + self.query_chunk_size]
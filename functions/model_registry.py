@@ -0,0 +1,189 @@
+# Standardbibliotheken
+import os
+import threading
+
+# Externe Bibliotheken
+import chromadb
+from chromadb.config import Settings
+from chromadb.utils import embedding_functions
+from icecream import ic
+import torch
+
+# Interne Module
+from functions.onnx_embedding import OnnxEmbeddingFunction
+
+
+class ModelRegistry:
+    """
+    Prozessweite Registry für Embedding-Modelle und ChromaDB-Clients.
+
+    - Jedes Embedding-Modell wird pro Gerät und Backend ("torch" oder "onnx") nur einmal geladen (beim
+      ersten Anfordern) und an alle Komponenten als dieselbe Instanz ausgegeben. Eine Referenzzählung gibt das Modell wieder frei,
+      sobald es keine Komponente mehr verwendet.
+    - Pro Datenbankpfad gibt es einen langlebigen ChromaDB-Client samt zwischengespeicherter Sammlungen.
+      Beides wird nur beim Veröffentlichen einer neuen Generation verworfen (siehe invalidate).
+    """
+
+    embedding_models = {}  # (Modellname, Gerät, Backend) -> {"function": ..., "references": int}
+    failed_exports = set()  # (Modellname, Gerät, "onnx") ohne gültigen ONNX-Export, nicht erneut versuchen
+    loading_locks = {}  # (Modellname, Gerät, Backend) -> Sperre, solange das Modell geladen wird
+    clients = {}  # Absoluter Pfad -> ChromaDB-Client
+    collections = {}  # (Absoluter Pfad, Sammlungsname) -> Collection
+    lock = threading.Lock()  # Nur für die Verwaltung der Dicts, nie während ein Modell geladen wird
+
+    @classmethod
+    def acquire_embedding_function(cls, model_name, cache_folder, device, backend="torch", onnx_settings=None):
+        """
+        Liefert die gemeinsame Embedding-Funktion eines Modells (lädt das Modell beim ersten Aufruf).
+        Jeder Aufruf muss mit release_embedding_function wieder freigegeben werden.
+
+        Args:
+            model_name (str): Name des SentenceTransformer-Modells
+            cache_folder (str): Verzeichnis für heruntergeladene Modelle
+            device (str): "cuda" oder "cpu"
+            backend (str, optional): "torch", "onnx" (nur CPU) oder "auto" (ONNX ohne GPU)
+            onnx_settings (dict, optional): Einstellungen "onnx_embedding"
+
+        Returns:
+            EmbeddingFunction: Gemeinsame Instanz (SentenceTransformer bzw. ONNX Runtime)
+        """
+        onnx_key = (model_name, device, "onnx")
+        if device == "cpu" and backend in ("onnx", "auto") and onnx_key not in cls.failed_exports:
+            try:
+                return cls._acquire(
+                    onnx_key,
+                    lambda: OnnxEmbeddingFunction(model_name, cache_folder, onnx_settings)
+                )
+            except Exception as e:
+                # Ohne gültigen Export bleibt PyTorch als Backend
+                ic()
+                ic(f"ONNX-Backend nicht verfügbar, verwende PyTorch: {e}")
+                with cls.lock:
+                    cls.failed_exports.add(onnx_key)
+
+        return cls._acquire(
+            (model_name, device, "torch"),
+            lambda: embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name=model_name,
+                cache_folder=cache_folder,
+                device=device,
+            )
+        )
+
+    @classmethod
+    def _acquire(cls, key, factory):
+        """
+        Liefert das Modell eines Schlüssels und erhöht seine Referenzzählung. Fehlt es, wird es außerhalb der
+        globalen Sperre erstellt (Laden bzw. ONNX-Export), gleichzeitige Anforderungen desselben Modells
+        warten über eine Ladesperre pro Schlüssel darauf.
+
+        Args:
+            key (tuple): (Modellname, Gerät, Backend)
+            factory: Funktion ohne Argumente, die die Embedding-Funktion erstellt
+
+        Returns:
+            EmbeddingFunction: Gemeinsame Instanz
+
+        Raises:
+            Exception: Fehler beim Erstellen des Modells
+        """
+        with cls.lock:
+            loading_lock = cls.loading_locks.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            with cls.lock:
+                entry = cls.embedding_models.get(key)
+                if entry is not None:
+                    entry["references"] += 1
+                    return entry["function"]
+
+            function = factory()
+
+            with cls.lock:
+                entry = cls.embedding_models.setdefault(key, {"function": function, "references": 0})
+                entry["references"] += 1
+                return entry["function"]
+
+    @classmethod
+    def release_embedding_function(cls, embedding_function):
+        """
+        Gibt eine mit acquire_embedding_function angeforderte Embedding-Funktion frei. Wird sie von keiner
+        Komponente mehr verwendet, wird das Modell entladen (inklusive des VRAM).
+
+        Args:
+            embedding_function: Zuvor angeforderte Instanz
+        """
+        with cls.lock:
+            for key, entry in list(cls.embedding_models.items()):
+                if entry["function"] is not embedding_function:
+                    continue
+                entry["references"] -= 1
+                if entry["references"] > 0:
+                    return
+
+                del cls.embedding_models[key]
+                # ChromaDB hält geladene Modelle zusätzlich in einem klassenweiten Cache
+                getattr(type(embedding_function), "models", {}).pop(key[0], None)
+                if key[1] == "cuda" and torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                return
+
+    @classmethod
+    def client(cls, path):
+        """
+        Liefert den langlebigen ChromaDB-Client eines Datenbankpfads (beim ersten Aufruf erstellt).
+
+        Args:
+            path (str): Pfad zur ChromaDB
+
+        Returns:
+            chromadb.PersistentClient: Gemeinsamer Client
+        """
+        path = os.path.abspath(path)
+        with cls.lock:
+            client = cls.clients.get(path)
+            if client is None:
+                client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+                cls.clients[path] = client
+            return client
+
+    @classmethod
+    def collection(cls, path, name, embedding_function):
+        """
+        Liefert eine zwischengespeicherte Sammlung, damit sie nicht bei jeder Abfrage neu geöffnet wird.
+
+        Args:
+            path (str): Pfad zur ChromaDB
+            name (str): Name der Sammlung
+            embedding_function: Embedding-Funktion der Sammlung
+
+        Returns:
+            Collection: Sammlung
+
+        Raises:
+            Exception: Wenn die Sammlung nicht existiert
+        """
+        key = (os.path.abspath(path), name)
+        with cls.lock:
+            collection = cls.collections.get(key)
+        if collection is not None:
+            return collection
+
+        collection = cls.client(path).get_collection(name=name, embedding_function=embedding_function)
+        with cls.lock:
+            return cls.collections.setdefault(key, collection)
+
+    @classmethod
+    def invalidate(cls, path):
+        """
+        Verwirft Client und Sammlungen eines Datenbankpfads, nachdem eine neue Generation veröffentlicht
+        wurde. Der nächste Zugriff erstellt den Client neu und löst den Alias neu auf.
+
+        Args:
+            path (str): Pfad zur ChromaDB
+        """
+        path = os.path.abspath(path)
+        with cls.lock:
+            cls.clients.pop(path, None)
+            for key in [key for key in cls.collections if key[0] == path]:
+                del cls.collections[key]
@@ -1,5 +1,4 @@
 # Standardbibliotheken
-import json
 import os
 
 # Externe Bibliotheken
@@ -8,6 +7,9 @@ from icecream import ic
 from ollama import AsyncClient
 
 # Interne Module
+from functions.llm_metrics import LlmMetrics
+from functions.settings_store import SettingsStore
+from functions.token_counter import TokenCounter
 from settings.system_prompts import system_prompt
 
 # Lade Umgebungsvariablen aus der .env-Datei
@@ -25,18 +27,55 @@ class OllamaClient:
         """
         Initialisiere den Ollama-Client mit Konfiguration
         """
-        # Lade Einstellungen aus der Konfigurationsdatei
-        self.settings = json.load(open(terminal_path + "settings/settings.json"))
+        # Gemeinsame Einstellungen aller Komponenten
+        self.settings = SettingsStore.get()
         # Extrahiere Ollama-spezifische Einstellungen
-        self.ollama_settings = self.settings.get("ollama_settings", {})
+        self.ollama_settings = SettingsStore.get("ollama_settings")
         # Setze Host-URL mit Fallback auf localhost
         self.host = self.ollama_settings.get("ollama_url", "http://localhost:11434")
         # Setze Modellname mit Fallback auf Standardmodell
         self.model = self.ollama_settings.get("ollama_model", "llama3.1:8b-instruct-q5_K_M")
+        # Modell nach einer Anfrage geladen lassen, damit der Prompt-Cache erhalten bleibt
+        self.keep_alive = self.ollama_settings.get("keep_alive", "30m")
         # Erstelle einen asynchronen Client für die Kommunikation mit Ollama
         self.client = AsyncClient(host=self.host)
         # Setze den System-Prompt für Kontext
         self.system_prompt = system_prompt
+        # Tokenschätzung pro Modell, kalibriert aus den Antworten
+        self.token_counter = TokenCounter()
+        # Dauer von Prompt-Auswertung und Generierung der letzten Anfragen
+        self.metrics = LlmMetrics()
+        # Modellwechsel (\model) und geänderte URL sofort übernehmen
+        SettingsStore.subscribe(self._apply_settings)
+
+    def _apply_settings(self, changed_sections):
+        """
+        Übernimmt geänderte "ollama_settings" ohne Neustart.
+
+        Args:
+            changed_sections (set): Geänderte Abschnitte der Einstellungen
+        """
+        if "ollama_settings" not in changed_sections:
+            return
+
+        self.model = self.ollama_settings.get("ollama_model", "llama3.1:8b-instruct-q5_K_M")
+        self.keep_alive = self.ollama_settings.get("keep_alive", "30m")
+        host = self.ollama_settings.get("ollama_url", "http://localhost:11434")
+        if host != self.host:
+            self.host = host
+            self.client = AsyncClient(host=self.host)
+
+    def count_tokens(self, text):
+        """
+        Schätzt die Anzahl Tokens eines Texts für das aktive Modell.
+
+        Args:
+            text (str): Zu zählender Text
+
+        Returns:
+            int: Geschätzte Anzahl Tokens
+        """
+        return self.token_counter.count(self.model, text)
 
     async def query(self, prompt, system_context=None, temperature=0.1):
         """
@@ -50,30 +89,22 @@ class OllamaClient:
         Returns:
             str: Die Antwort des Modells
         """
-
-        # Setze Modellname mit Fallback auf Standardmodell
-        self.model = self.ollama_settings.get("ollama_model", "llama3.1:8b-instruct-q5_K_M")
         try:
-            # Bereite die Nachrichtenstruktur vor
-            messages = [{"role": "system", "content": self.system_prompt}]
-
-            # Füge Systemnachricht hinzu, falls vorhanden
-            if system_context:
-                messages.append({"role": "system", "content": f"{system_context}"})
-
-            # Füge Benutzernachricht hinzu
-            messages.append({"role": "user", "content": prompt})
+            messages = self._messages(prompt, system_context)
 
             # Erhalte Antwort vom Modell
             response = await self.client.chat(
                 model=self.model,
                 messages=messages,
                 stream=False,
-                options={"temperature": temperature}
+                options={"temperature": temperature},
+                keep_alive=self.keep_alive
             )
 
             # Extrahiere die Nachricht des Modells
             if response and "message" in response and "content" in response["message"]:
+                self._observe_tokens(messages, response)
+                self.metrics.record(response)
                 return response["message"]["content"]
             else:
                 return "Keine verwertbare Antwort erhalten."
@@ -83,3 +114,87 @@ class OllamaClient:
             ic()
             ic(e)
             return f"Fehler bei der Kommunikation mit Ollama: {str(e)}"
+
+    async def warm_up(self, system_context=None):
+        """
+        Lädt das Modell auf dem Ollama-Server und legt den statischen Anfang des Prompts (System-Prompt
+        und feste Anweisungen) im Prompt-Cache ab. Es wird nur ein Token generiert.
+
+        Args:
+            system_context (str, optional): Systemanweisungen wie bei späteren Anfragen
+
+        Returns:
+            bool: True, wenn das Modell geantwortet hat
+        """
+        try:
+            await self.client.chat(
+                model=self.model,
+                messages=self._messages("", system_context),
+                stream=False,
+                options={"num_predict": 1},
+                keep_alive=self.keep_alive
+            )
+            return True
+        except Exception as e:
+            ic()
+            ic(f"Aufwärmen des Modells fehlgeschlagen: {e}")
+            return False
+
+    async def stream(self, prompt, system_context=None, temperature=0.1):
+        """
+        Sende eine Anfrage an das Ollama-Modell und liefere die Antwort stückweise, sobald sie generiert wird.
+
+        Args:
+            prompt (str): Die Anfrage des Benutzers
+            system_context (str, optional): Systemanweisungen für das Modell
+            temperature (float, optional): Kreativitätsparameter (0.0-1.0)
+
+        Yields:
+            str: Teilstücke der Antwort des Modells
+        """
+        messages = self._messages(prompt, system_context)
+        try:
+            response = await self.client.chat(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                options={"temperature": temperature},
+                keep_alive=self.keep_alive
+            )
+            async for part in response:
+                content = part["message"]["content"] if "message" in part else None
+                if content:
+                    yield content
+                if part.get("done"):
+                    self._observe_tokens(messages, part)
+                    self.metrics.record(part)
+
+        except Exception as e:
+            # Stream abbrechen, der Aufrufer erkennt die unvollständige Antwort
+            ic()
+            ic(f"Fehler bei der Kommunikation mit Ollama: {e}")
+
+    def _messages(self, prompt, system_context=None):
+        """
+        Bereitet die Nachrichtenstruktur einer Anfrage vor.
+        """
+        messages = [{"role": "system", "content": self.system_prompt}]
+
+        # Füge Systemnachricht hinzu, falls vorhanden
+        if system_context:
+            messages.append({"role": "system", "content": f"{system_context}"})
+
+        # Füge Benutzernachricht hinzu
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _observe_tokens(self, messages, response):
+        """
+        Kalibriert die Tokenschätzung mit der vom Modell gemeldeten Anzahl ausgewerteter Tokens.
+        """
+        self.token_counter.observe(
+            self.model,
+            len(messages[-1]["content"]),
+            response.get("prompt_eval_count"),
+            prefix_chars=sum(len(message["content"]) for message in messages[:-1])
+        )
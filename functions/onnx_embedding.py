@@ -0,0 +1,247 @@
+# Standardbibliotheken
+import json
+import os
+
+# Externe Bibliotheken
+from chromadb.api.types import Documents, EmbeddingFunction
+import numpy as np
+import onnxruntime
+from tokenizers import Tokenizer
+
+# Beispieldokumente im Format der Hauptsammlung für die Paritätsprüfung beim Export
+PARITY_DOCUMENTS = [
+    "*Item: settings.json, Item-Typ: file, Pfad: /root/terminAl/settings/settings.json*",
+    "*Item: nginx, Item-Typ: directory, Pfad: /etc/nginx*",
+    "*Item: Bewerbung Müller.pdf, Item-Typ: file, Pfad: /home/anna/Dokumente/Bewerbung Müller.pdf*",
+    "*Item: libssl.so.3, Item-Typ: file, Pfad: /usr/lib/x86_64-linux-gnu/libssl.so.3*",
+    "*Datenbank: shop, Tabelle: public.orders, Typ: table, Spalten: id integer, customer_id integer, "
+    "total numeric(10,2), created_at timestamp without time zone, Zeilen: ca. 12000*",
+    "*Item: a, Item-Typ: file, Pfad: /a*",
+]
+
+
+class OnnxEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding-Funktion auf Basis von ONNX Runtime für Rechner ohne GPU.
+
+    Das lokal zwischengespeicherte SentenceTransformer-Modell wird einmalig als ONNX-Graph exportiert
+    (optional dynamisch nach int8 quantisiert) und gegen die PyTorch-Embeddings geprüft. Zur Laufzeit
+    werden weder PyTorch noch sentence-transformers benötigt:
+    - Die Anzahl Threads entspricht den für den Prozess verfügbaren Kernen.
+    - Die Dokumente werden nach Tokenlänge sortiert und in Batches nur bis zur längsten Sequenz des
+      Batches aufgefüllt, statt jeden Batch auf die maximale Länge zu bringen.
+    - Pooling und Normalisierung entsprechen der Konfiguration des SentenceTransformer-Modells.
+
+    Gegenüber ChromaDB tritt die Funktion als "sentence_transformer" auf: Sie liefert Embeddings desselben
+    Modells, bestehende Sammlungen bleiben damit ohne Neuaufbau verwendbar.
+    """
+
+    def __init__(self, model_name, cache_folder, onnx_settings=None):
+        """
+        Lädt den exportierten Graphen (exportiert ihn beim ersten Aufruf).
+
+        Args:
+            model_name (str): Name des SentenceTransformer-Modells
+            cache_folder (str): Verzeichnis für heruntergeladene Modelle (enthält auch den Export)
+            onnx_settings (dict, optional): Einstellungen "onnx_embedding"
+
+        Raises:
+            Exception: Wenn Export, Paritätsprüfung oder Laden fehlschlagen
+        """
+        onnx_settings = onnx_settings or {}
+        self.model_name = model_name
+        self.quantize = onnx_settings.get("quantize_int8", True)
+        self.batch_size = onnx_settings.get("batch_size", 64)
+        self.parity_threshold = onnx_settings.get("parity_threshold", 0.99)
+        # Schlüssel für den Embedding-Cache, damit quantisierte und PyTorch-Embeddings nicht gemischt werden
+        self.cache_key = f"{model_name}#onnx-{'int8' if self.quantize else 'fp32'}"
+
+        self.export_dir = os.path.join(cache_folder, "onnx", model_name.replace("/", "--"))
+        model_file = "model.int8.onnx" if self.quantize else "model.onnx"
+        if not os.path.exists(os.path.join(self.export_dir, model_file)):
+            self.export(model_name, cache_folder, self.export_dir, self.quantize, self.parity_threshold)
+
+        with open(os.path.join(self.export_dir, "embedding_config.json"), encoding="utf-8") as file:
+            self.config = json.load(file)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.export_dir, "tokenizer.json"))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+
+        # Threads an die verfügbaren Kerne binden (z.B. in Containern mit CPU-Limit)
+        threads = onnx_settings.get("threads") or self.available_cores()
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(self.export_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def __call__(self, input: Documents):
+        """
+        Berechnet die Embeddings der Dokumente.
+
+        Args:
+            input (list): Dokumente
+
+        Returns:
+            list: Embedding (np.ndarray, float32) pro Dokument in der Reihenfolge der Eingabe
+        """
+        documents = list(input)
+        encodings = self.tokenizer.encode_batch(documents)
+        embeddings = [None] * len(documents)
+
+        # Nach Länge sortieren, damit jeder Batch nur wenig Auffüllung enthält
+        order = sorted(range(len(documents)), key=lambda i: len(encodings[i].ids))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            length = max(len(encodings[i].ids) for i in batch)
+
+            input_ids = np.full((len(batch), length), self.config["pad_token_id"], dtype=np.int64)
+            attention_mask = np.zeros((len(batch), length), dtype=np.int64)
+            for row, i in enumerate(batch):
+                ids = encodings[i].ids
+                input_ids[row, :len(ids)] = ids
+                attention_mask[row, :len(ids)] = 1
+
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            hidden_states = self.session.run(None, feeds)[0]
+
+            for row, embedding in zip(batch, self._pool(hidden_states, attention_mask)):
+                embeddings[row] = embedding
+
+        return embeddings
+
+    def _pool(self, hidden_states, attention_mask):
+        """
+        Fasst die Token-Embeddings wie das Pooling-Modul des SentenceTransformer-Modells zusammen.
+        """
+        if self.config["pooling"] == "cls":
+            pooled = hidden_states[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if self.config["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    @staticmethod
+    def name():
+        return "sentence_transformer"
+
+    def default_space(self):
+        return "cosine"
+
+    def supported_spaces(self):
+        return ["cosine", "l2", "ip"]
+
+    def get_config(self):
+        # Entspricht der Konfiguration der SentenceTransformerEmbeddingFunction desselben Modells
+        return {"model_name": self.model_name, "device": "cpu", "normalize_embeddings": False, "kwargs": {}}
+
+    @staticmethod
+    def build_from_config(config):
+        from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+        return SentenceTransformerEmbeddingFunction.build_from_config(config)
+
+    @classmethod
+    def available_cores(cls):
+        """
+        Liefert die Anzahl Kerne, auf denen der Prozess laufen darf.
+        """
+        try:
+            return len(os.sched_getaffinity(0))
+        except AttributeError:
+            return os.cpu_count() or 1
+
+    @classmethod
+    def export(cls, model_name, cache_folder, export_dir, quantize=True, parity_threshold=0.99):
+        """
+        Exportiert das SentenceTransformer-Modell als ONNX-Graph samt Tokenizer und Pooling-Konfiguration,
+        quantisiert ihn optional und prüft die Embeddings gegen PyTorch. Benötigt einmalig PyTorch und
+        sentence-transformers.
+
+        Args:
+            model_name (str): Name des SentenceTransformer-Modells
+            cache_folder (str): Verzeichnis für heruntergeladene Modelle
+            export_dir (str): Zielverzeichnis des Exports
+            quantize (bool, optional): Zusätzlich eine dynamisch nach int8 quantisierte Variante erstellen
+            parity_threshold (float, optional): Minimale Kosinus-Ähnlichkeit zu den PyTorch-Embeddings
+
+        Raises:
+            ValueError: Bei nicht unterstütztem Pooling oder nicht bestandener Paritätsprüfung
+        """
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+
+        model = SentenceTransformer(model_name, cache_folder=cache_folder, device="cpu")
+        transformer = model[0]
+        pooling = next(module for module in model if isinstance(module, Pooling))
+        pooling_mode = pooling.get_pooling_mode_str()
+        if pooling_mode not in ("mean", "cls"):
+            raise ValueError(f"Pooling '{pooling_mode}' wird vom ONNX-Backend nicht unterstützt.")
+
+        os.makedirs(export_dir, exist_ok=True)
+        model_path = os.path.join(export_dir, "model.onnx")
+
+        # Graph mit dynamischer Batch- und Sequenzlänge exportieren
+        sample = transformer.tokenizer(["terminAl"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer.auto_model.eval(),
+                ({name: sample[name] for name in input_names},),
+                model_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+
+        transformer.tokenizer.save_pretrained(export_dir)
+        with open(os.path.join(export_dir, "embedding_config.json"), "w", encoding="utf-8") as file:
+            json.dump({
+                "pooling": pooling_mode,
+                "normalize": any(isinstance(module, Normalize) for module in model),
+                "max_seq_length": model.max_seq_length,
+                "pad_token_id": transformer.tokenizer.pad_token_id or 0,
+            }, file, indent=2)
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(model_path, os.path.join(export_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+
+        # Parität gegen PyTorch prüfen, bevor der Export verwendet wird
+        reference = model.encode(PARITY_DOCUMENTS, convert_to_numpy=True)
+        candidate = np.array(cls(model_name, cache_folder, {"quantize_int8": quantize, "threads": 1})(PARITY_DOCUMENTS))
+        min_similarity = float(cls.cosine_similarities(reference, candidate).min())
+        if min_similarity < parity_threshold:
+            for file_name in ("model.onnx", "model.int8.onnx"):
+                if os.path.exists(os.path.join(export_dir, file_name)):
+                    os.remove(os.path.join(export_dir, file_name))
+            raise ValueError(
+                f"ONNX-Export weicht von PyTorch ab (minimale Kosinus-Ähnlichkeit {min_similarity:.4f}"
+                f" < {parity_threshold})."
+            )
+        print(f"ONNX-Export von {model_name} erstellt (minimale Kosinus-Ähnlichkeit {min_similarity:.4f}).")
+
+    @classmethod
+    def cosine_similarities(cls, reference, candidate):
+        """
+        Berechnet die Kosinus-Ähnlichkeit zeilenweise zwischen zwei Embedding-Matrizen.
+
+        Returns:
+            np.ndarray: Ähnlichkeit pro Zeile
+        """
+        reference = np.asarray(reference, dtype=np.float32)
+        candidate = np.asarray(candidate, dtype=np.float32)
+        norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+        return (reference * candidate).sum(axis=1) / np.maximum(norms, 1e-12)
@@ -0,0 +1,234 @@
+# Standardbibliotheken
+import fnmatch
+import re
+
+
+class PathExclusionEngine:
+    """
+    Kompilierte Ausschlussregeln für die Dateisystemabbildung.
+
+    Unterstützt werden:
+    - Verankerte Pfadpräfixe (z.B. "/var/tmp"), die einen Pfad samt Teilbaum ausschließen
+    - Globs im Stil von .gitignore: Muster ohne "/" gelten für den Namen in jeder Tiefe, Muster mit "/"
+      sind relativ zum Startverzeichnis verankert, "**" steht für beliebig viele Verzeichnisse und ein
+      abschließendes "/" beschränkt das Muster auf Verzeichnisse (Negationen mit "!" werden nicht unterstützt)
+    - Eine maximale Tiefe und eine maximale Anzahl an Einträgen pro Verzeichnis
+
+    Alle Globs werden einmalig zu je einem regulären Ausdruck für Namen und Pfade kompiliert. Ausgeschlossene
+    Verzeichnisse werden nicht betreten, pro Regel wird gezählt, wie viele Einträge sie ausgeschlossen hat.
+    """
+
+    # Regelnamen für die Grenzwerte
+    max_depth_rule = "max_depth"
+    max_entries_rule = "max_entries_per_directory"
+
+    def __init__(self, root="/", prefixes=None, globs=None, max_depth=None, max_entries_per_directory=None):
+        """
+        Kompiliert die Ausschlussregeln.
+
+        Args:
+            root (str): Startverzeichnis der Abbildung (Bezug für verankerte Globs und die Tiefe)
+            prefixes (list, optional): Verankerte, absolute Pfadpräfixe
+            globs (list, optional): Globs im Stil von .gitignore
+            max_depth (int, optional): Maximale Tiefe unterhalb des Startverzeichnisses
+            max_entries_per_directory (int, optional): Maximale Anzahl Einträge pro Verzeichnis
+        """
+        self.root = root.rstrip("/") or "/"
+        self.root_depth = 0 if self.root == "/" else self.root.count("/")
+        self.prefixes = {prefix.rstrip("/") or "/" for prefix in (prefixes or [])}
+        self.max_depth = max_depth
+        self.max_entries_per_directory = max_entries_per_directory
+
+        # Trefferzähler pro Regel
+        self.hits = {}
+
+        # Globs nach Art aufteilen und zu je einem regulären Ausdruck zusammenfassen
+        self.rule_names = {}
+        name_patterns, directory_name_patterns, path_patterns, directory_path_patterns = [], [], [], []
+        for index, glob in enumerate(globs or []):
+            group = f"r{index}"
+            self.rule_names[group] = glob
+            directory_only = glob.endswith("/")
+            pattern = glob.rstrip("/")
+
+            if "/" in pattern:
+                # Verankertes Muster relativ zum Startverzeichnis
+                regex = f"(?P<{group}>{self._translate_path_glob(pattern.lstrip('/'))})"
+                (directory_path_patterns if directory_only else path_patterns).append(regex)
+            else:
+                regex = f"(?P<{group}>{fnmatch.translate(pattern)})"
+                (directory_name_patterns if directory_only else name_patterns).append(regex)
+
+        self.name_regex = self._compile(name_patterns)
+        self.directory_name_regex = self._compile(directory_name_patterns)
+        self.path_regex = self._compile(path_patterns)
+        self.directory_path_regex = self._compile(directory_path_patterns)
+
+    @classmethod
+    def from_settings(cls, os_mapping_settings, root="/", legacy_pattern=""):
+        """
+        Erstellt die Regeln aus dem Abschnitt "exclusions" der os_mapping-Einstellungen.
+        Fehlt dieser, wird das -I Muster des tree commands als Namens-Globs übernommen
+        (versteckte Einträge werden wie bei tree ohne -a ausgeschlossen).
+
+        Args:
+            os_mapping_settings (dict): Einstellungen "os_mapping"
+            root (str): Startverzeichnis der Abbildung
+            legacy_pattern (str): -I Muster des tree commands
+
+        Returns:
+            PathExclusionEngine: Kompilierte Regeln
+        """
+        exclusions = os_mapping_settings.get("exclusions")
+        if exclusions is None:
+            globs = [".*"] + [pattern for pattern in legacy_pattern.split("|") if pattern]
+            return cls(root=root, globs=globs)
+
+        return cls(
+            root=root,
+            prefixes=exclusions.get("prefixes", []),
+            globs=exclusions.get("globs", []),
+            max_depth=exclusions.get("max_depth"),
+            max_entries_per_directory=exclusions.get("max_entries_per_directory"),
+        )
+
+    def excludes(self, path, name, is_directory):
+        """
+        Prüft einen Eintrag während des Durchlaufs (übergeordnete Verzeichnisse wurden bereits geprüft).
+
+        Args:
+            path (str): Vollständiger Pfad
+            name (str): Name des Eintrags
+            is_directory (bool): True für Verzeichnisse
+
+        Returns:
+            bool: True, wenn der Eintrag (bei Verzeichnissen samt Teilbaum) ausgeschlossen ist
+        """
+        rule = self._matching_rule(path, name, is_directory)
+        if rule is None:
+            return False
+
+        self.hits[rule] = self.hits.get(rule, 0) + 1
+        return True
+
+    def excludes_path(self, path, is_directory):
+        """
+        Prüft einen einzelnen Pfad inklusive aller übergeordneten Verzeichnisse (z.B. für Dateisystem-Ereignisse).
+
+        Args:
+            path (str): Vollständiger Pfad
+            is_directory (bool): True für Verzeichnisse
+
+        Returns:
+            bool: True, wenn der Pfad oder eines seiner übergeordneten Verzeichnisse ausgeschlossen ist
+        """
+        path = path.rstrip("/") or "/"
+        if path == self.root:
+            return False
+
+        # Übergeordnete Verzeichnisse vom Startverzeichnis abwärts prüfen
+        if path.startswith(self.root.rstrip("/") + "/"):
+            relative_parts = path[len(self.root.rstrip("/")) + 1:].split("/")
+            current = self.root.rstrip("/")
+            for part in relative_parts[:-1]:
+                current = f"{current}/{part}"
+                if self._matching_rule(current, part, True) is not None:
+                    return True
+
+        return self._matching_rule(path, path.rsplit("/", 1)[-1], is_directory) is not None
+
+    def truncates(self, entry_count):
+        """
+        Prüft, ob in einem Verzeichnis bereits die maximale Anzahl an Einträgen erreicht ist.
+
+        Args:
+            entry_count (int): Anzahl bereits übernommener Einträge des Verzeichnisses
+
+        Returns:
+            bool: True, wenn die restlichen Einträge übersprungen werden sollen
+        """
+        if self.max_entries_per_directory is None or entry_count < self.max_entries_per_directory:
+            return False
+
+        self.hits[self.max_entries_rule] = self.hits.get(self.max_entries_rule, 0) + 1
+        return True
+
+    def merge_hits(self, hits):
+        """
+        Übernimmt Trefferzähler (z.B. aus den Prozessen des parallelen Durchlaufs).
+
+        Args:
+            hits (dict): Regel -> Anzahl Treffer
+        """
+        for rule, count in hits.items():
+            self.hits[rule] = self.hits.get(rule, 0) + count
+
+    def report(self):
+        """
+        Liefert die Regeln sortiert nach Anzahl der Treffer (meiste zuerst).
+
+        Returns:
+            list: Liste von (Regel, Treffer)
+        """
+        return sorted(self.hits.items(), key=lambda item: item[1], reverse=True)
+
+    def _matching_rule(self, path, name, is_directory):
+        """
+        Ermittelt die erste passende Regel für einen Eintrag.
+
+        Returns:
+            str: Name der Regel oder None
+        """
+        if path in self.prefixes:
+            return path
+
+        match = self.name_regex.match(name) if self.name_regex else None
+        if not match and is_directory and self.directory_name_regex:
+            match = self.directory_name_regex.match(name)
+
+        if not match and (self.path_regex or self.directory_path_regex):
+            relative_path = path[len(self.root):].lstrip("/")
+            if self.path_regex:
+                match = self.path_regex.match(relative_path)
+            if not match and is_directory and self.directory_path_regex:
+                match = self.directory_path_regex.match(relative_path)
+
+        if match:
+            return self.rule_names[match.lastgroup]
+
+        # Verzeichnisse unterhalb der maximalen Tiefe nicht betreten
+        if self.max_depth is not None and path.count("/") - self.root_depth > self.max_depth:
+            return self.max_depth_rule
+
+        return None
+
+    def _compile(self, patterns):
+        """
+        Fasst mehrere Teilausdrücke zu einem kompilierten Ausdruck zusammen.
+        """
+        return re.compile("|".join(patterns)) if patterns else None
+
+    def _translate_path_glob(self, pattern):
+        """
+        Übersetzt einen verankerten Glob mit "/" in einen regulären Ausdruck.
+        "**" steht für beliebig viele Verzeichnisse, "*" und "?" passen nicht auf "/".
+        """
+        regex = ""
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                regex += "(?:.*/)?"
+                i += 3
+            elif pattern.startswith("**", i):
+                regex += ".*"
+                i += 2
+            elif pattern[i] == "*":
+                regex += "[^/]*"
+                i += 1
+            elif pattern[i] == "?":
+                regex += "[^/]"
+                i += 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        return regex + r"\Z"
@@ -0,0 +1,125 @@
+# Standardbibliotheken
+from array import array
+from collections import OrderedDict
+
+
+class PathTable:
+    """
+    Kompakte, array-basierte Tabelle für die Dateisystemabbildung.
+
+    Statt pro Pfad einen vollständigen String und ein Dict zu speichern, hält die Tabelle pro Eintrag
+    nur den Index des übergeordneten Verzeichnisses, den Namen (in einem gemeinsamen Byte-Blob) und den
+    Dateityp als Byte-Code. Vollständige Pfade werden erst beim Zugriff über die Elternkette zusammengesetzt.
+    Einträge ohne Elternteil (parent_index = -1) speichern ihren vollständigen Pfad als Namen.
+    """
+
+    # Byte-Codes für die Dateitypen
+    filetype_codes = {"directory": 0, "file": 1}
+    filetype_names = ("directory", "file")
+
+    def __init__(self):
+        """
+        Initialisiert eine leere Tabelle.
+        """
+        self.parents = array("i")  # Index des übergeordneten Verzeichnisses (-1 = Wurzel)
+        self.name_offsets = array("Q", [0])  # Start jedes Namens im Blob (plus Endmarke)
+        self.names = bytearray()  # Alle Namen hintereinander (UTF-8)
+        self.filetypes = bytearray()  # Dateityp als Byte-Code
+        self.mtimes = array("q")  # Änderungszeit in Nanosekunden
+        self.inodes = array("Q")  # Inode-Nummer
+        self.sizes = array("q")  # Größe in Bytes
+
+    def add(self, parent_index, name, filetype, mtime=0, inode=0, size=0):
+        """
+        Fügt einen Eintrag hinzu.
+
+        Args:
+            parent_index (int): Index des übergeordneten Verzeichnisses oder -1
+            name (str): Name des Eintrags (bei parent_index = -1 der vollständige Pfad)
+            filetype (str): "directory" oder "file"
+            mtime (int, optional): Änderungszeit in Nanosekunden
+            inode (int, optional): Inode-Nummer
+            size (int, optional): Größe in Bytes
+
+        Returns:
+            int: Index des neuen Eintrags
+        """
+        self.parents.append(parent_index)
+        self.names += name.encode("utf-8", "surrogateescape")
+        self.name_offsets.append(len(self.names))
+        self.filetypes.append(self.filetype_codes[filetype])
+        self.mtimes.append(mtime)
+        self.inodes.append(inode)
+        self.sizes.append(size)
+        return len(self.parents) - 1
+
+    def __len__(self):
+        return len(self.parents)
+
+    def name(self, index):
+        """
+        Liefert den Namen eines Eintrags.
+        """
+        start, end = self.name_offsets[index], self.name_offsets[index + 1]
+        return self.names[start:end].decode("utf-8", "surrogateescape")
+
+    def path(self, index, parent_cache=None):
+        """
+        Setzt den vollständigen Pfad eines Eintrags über die Elternkette zusammen.
+
+        Args:
+            index (int): Index des Eintrags
+            parent_cache (OrderedDict, optional): Cache bereits bekannter Verzeichnispfade
+
+        Returns:
+            str: Vollständiger Pfad
+        """
+        parts = [self.name(index)]
+        parent_index = self.parents[index]
+
+        while parent_index != -1:
+            if parent_cache is not None and parent_index in parent_cache:
+                parent_cache.move_to_end(parent_index)
+                parts.append(parent_cache[parent_index])
+                break
+            parts.append(self.name(parent_index))
+            parent_index = self.parents[parent_index]
+
+        return "/".join(reversed(parts))
+
+    def entry(self, index, parent_cache=None):
+        """
+        Liefert einen Eintrag im Format von SystemMapping.walk_os.
+
+        Returns:
+            tuple: Pfad und Dict mit "filetype", "item", "mtime", "inode" und "size"
+        """
+        return self.path(index, parent_cache), {
+            "filetype": self.filetype_names[self.filetypes[index]],
+            "item": self.name(index) if self.parents[index] != -1 else self.name(index).rsplit("/", 1)[-1],
+            "mtime": self.mtimes[index],
+            "inode": self.inodes[index],
+            "size": self.sizes[index],
+        }
+
+    def __iter__(self):
+        """
+        Iteriert über alle Einträge im Format von SystemMapping.walk_os.
+        Zuletzt verwendete Verzeichnispfade werden in einem kleinen LRU-Cache gehalten,
+        damit Geschwister nicht jeweils die gesamte Elternkette neu zusammensetzen.
+        """
+        parent_cache = OrderedDict()
+        for index in range(len(self.parents)):
+            path, meta = self.entry(index, parent_cache)
+            if meta["filetype"] == "directory":
+                parent_cache[index] = path
+                if len(parent_cache) > 1024:
+                    parent_cache.popitem(last=False)
+            yield path, meta
+
+    def nbytes(self):
+        """
+        Liefert den Speicherbedarf der Tabelle in Bytes (ohne Python-Objekt-Overhead).
+        """
+        arrays = (self.parents, self.name_offsets, self.mtimes, self.inodes, self.sizes)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self.names) + len(self.filetypes)
@@ -0,0 +1,112 @@
+# Standardbibliotheken
+import bisect
+import os
+
+# Obergrenze für Präfixbereiche: sortiert hinter jeder Zeichenkette mit demselben Präfix
+PREFIX_END = "\U0010ffff"
+
+
+class PathTrie:
+    """
+    Unveränderlicher Präfixbaum über Elementnamen und Verzeichnispfade für die Tab-Vervollständigung.
+
+    Der Baum ist als sortierte Arrays abgelegt (komprimierter Trie): Alle Einträge unter einem Präfix bilden
+    einen zusammenhängenden Bereich, das Absteigen entspricht einer binären Suche. Damit wird pro Eintrag nur
+    eine Zeichenkette gespeichert statt eines Knotens pro Zeichen, und Abfragen brauchen auch bei Millionen
+    Pfaden nur O(log n + Anzahl Treffer). Eine neue Abbildung erzeugt einen neuen Baum, der bestehende
+    wird nie verändert und kann daher ohne Lock aus dem Eingabe-Thread gelesen werden.
+    """
+
+    def __init__(self, names=(), directories=()):
+        """
+        Erstellt den Baum.
+
+        Args:
+            names (iterable): Elementnamen (Dateien und Ordner)
+            directories (iterable): Absolute Verzeichnispfade
+        """
+        # Namen ohne Beachtung der Groß-/Kleinschreibung sortiert, Schlüssel und Originale parallel
+        self.names = sorted(set(names), key=lambda name: (name.lower(), name))
+        self.name_keys = [name.lower() for name in self.names]
+        self.directories = sorted(set(directories))
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Erstellt den Baum aus Einträgen der Abbildung. Übergeordnete Verzeichnisse werden aus den Pfaden
+        abgeleitet, damit auch nicht abgebildete Zwischenebenen vervollständigt werden.
+
+        Args:
+            entries (iterable): Tupel aus Elementname, Pfad und Dateityp
+
+        Returns:
+            PathTrie: Neuer Baum
+        """
+        names = set()
+        directories = set()
+        for item, path, filetype in entries:
+            names.add(item)
+            directory = (path.rstrip("/") or "/") if filetype == "directory" else os.path.dirname(path)
+            # Vorfahren nur hinzufügen, bis ein bekanntes Verzeichnis erreicht ist
+            while directory and directory not in directories:
+                directories.add(directory)
+                if directory == "/":
+                    break
+                directory = os.path.dirname(directory)
+        return cls(names, directories)
+
+    def __len__(self):
+        return len(self.names) + len(self.directories)
+
+    def complete_name(self, prefix, limit=50):
+        """
+        Liefert Elementnamen, die mit dem Präfix beginnen (ohne Beachtung der Groß-/Kleinschreibung).
+
+        Args:
+            prefix (str): Eingegebener Anfang des Namens
+            limit (int, optional): Maximale Anzahl Vorschläge
+
+        Returns:
+            list: Elementnamen in sortierter Reihenfolge
+        """
+        key = prefix.lower()
+        start = bisect.bisect_left(self.name_keys, key)
+        end = min(bisect.bisect_left(self.name_keys, key + PREFIX_END, start), start + limit)
+        return self.names[start:end]
+
+    def complete_path(self, prefix, limit=50):
+        """
+        Liefert die direkten Unterverzeichnisse, deren Pfad mit dem Präfix beginnt, z.B. "/usr/sh" ->
+        ["/usr/share/"]. Tiefer liegende Verzeichnisse werden als Bereich übersprungen.
+
+        Args:
+            prefix (str): Absoluter Pfad, gegebenenfalls mit angefangenem letzten Bestandteil
+            limit (int, optional): Maximale Anzahl Vorschläge
+
+        Returns:
+            list: Verzeichnispfade mit abschließendem "/"
+        """
+        parent = prefix[:prefix.rfind("/") + 1]
+        if not parent:
+            return []
+
+        results = []
+        seen = set()
+        index = bisect.bisect_left(self.directories, prefix)
+        while index < len(self.directories) and len(results) < limit:
+            directory = self.directories[index]
+            if not directory.startswith(prefix):
+                break
+
+            child = directory[len(parent):].split("/", 1)[0]
+            if not child:
+                # Das Verzeichnis des Präfixes selbst
+                index += 1
+            elif child in seen:
+                # Bereich der Nachfahren dieses Unterverzeichnisses überspringen
+                index = bisect.bisect_left(self.directories, parent + child + "/" + PREFIX_END, index)
+            else:
+                seen.add(child)
+                results.append(parent + child + "/")
+                index += 1
+        return results
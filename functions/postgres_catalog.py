@@ -0,0 +1,204 @@
+# Standardbibliotheken
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Externe Bibliotheken
+from icecream import ic
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import ConnectionPool
+
+# Katalogabfrage: Schemas, Tabellen, Spalten mit Typen und geschätzte Zeilenanzahl in einem Round-Trip
+CATALOG_QUERY = """
+SELECT n.nspname AS schema_name,
+       c.relname AS table_name,
+       c.relkind AS kind,
+       c.reltuples::bigint AS row_estimate,
+       COALESCE(
+           json_agg(
+               json_build_object('name', a.attname, 'type', format_type(a.atttypid, a.atttypmod))
+               ORDER BY a.attnum
+           ) FILTER (WHERE a.attnum IS NOT NULL),
+           '[]'::json
+       ) AS columns
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg_toast%%'
+  AND n.nspname NOT LIKE 'pg_temp%%'
+GROUP BY n.nspname, c.relname, c.relkind, c.reltuples
+ORDER BY n.nspname, c.relname
+"""
+
+# Fingerabdruck des Katalogs: ein Hash über OIDs, Namen, Spaltenlisten und die auf zwei signifikante Stellen
+# gerundete Zeilenschätzung (wie im Dokument). Liefert nur eine Zeile und ist damit deutlich günstiger als
+# die vollständige Katalogabfrage.
+FINGERPRINT_QUERY = """
+SELECT md5(COALESCE(string_agg(
+           concat_ws(':', c.oid, n.nspname, c.relname, c.relkind, attributes.signature,
+                     CASE WHEN c.reltuples > 0
+                          THEN round(c.reltuples::numeric, 1 - floor(log(c.reltuples::numeric))::int)
+                     END),
+           ',' ORDER BY c.oid), ''))
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN LATERAL (
+    SELECT string_agg(a.attname || ' ' || a.atttypid || ' ' || a.atttypmod, ',' ORDER BY a.attnum) AS signature
+    FROM pg_catalog.pg_attribute a
+    WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+) attributes ON true
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg_toast%%'
+  AND n.nspname NOT LIKE 'pg_temp%%'
+"""
+
+# Lesbare Bezeichnungen der Relationsarten
+RELATION_KINDS = {"r": "table", "p": "partitioned table", "v": "view", "m": "materialized view", "f": "foreign table"}
+
+
+class PostgresCatalogMapper:
+    """
+    Bildet PostgreSQL-Datenbanken über den Systemkatalog ab, statt pro Datenbank einen psql-Prozess
+    mit sudo zu starten. Pro Datenbank wird ein Verbindungspool offen gehalten, alle Datenbanken werden
+    parallel abgefragt und Fehler einzelner Datenbanken betreffen nur deren Ergebnis.
+
+    Über einen Fingerabdruck des Katalogs werden Datenbanken, deren Schema sich seit dem letzten
+    Abgleich nicht geändert hat, nicht erneut vollständig abgefragt.
+    """
+
+    # Verbindungspools pro Datenbank (bleiben über Update-Zyklen hinweg offen)
+    pools = {}
+    pools_lock = threading.Lock()
+
+    @classmethod
+    def map_databases(cls, postgres_settings, databases, known_fingerprints=None):
+        """
+        Bildet mehrere Datenbanken parallel ab.
+
+        Args:
+            postgres_settings (dict): Einstellungen "tools.postgres"
+            databases (list): Namen der abzubildenden Datenbanken
+            known_fingerprints (dict, optional): Datenbankname -> Fingerabdruck des letzten Abgleichs
+
+        Returns:
+            dict: Datenbankname -> Ergebnis von map_database
+        """
+        if not databases:
+            return {}
+
+        known_fingerprints = known_fingerprints or {}
+        max_workers = min(len(databases), postgres_settings.get("max_parallel_databases", 8))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda database: cls.map_database(postgres_settings, database, known_fingerprints.get(database)),
+                databases
+            )
+            return dict(zip(databases, results))
+
+    @classmethod
+    def map_database(cls, postgres_settings, database, known_fingerprint=None):
+        """
+        Liest Schemas, Tabellen, Spalten, Typen und Zeilenschätzungen einer Datenbank.
+        Stimmt der Fingerabdruck des Katalogs mit dem bekannten überein, entfällt die vollständige Abfrage.
+
+        Args:
+            postgres_settings (dict): Einstellungen "tools.postgres"
+            database (str): Name der Datenbank
+            known_fingerprint (str, optional): Fingerabdruck des letzten Abgleichs
+
+        Returns:
+            dict: "fingerprint" (None, wenn die Datenbank nicht erreichbar ist) und "tables" mit den
+                Tabellen-Einträgen ("database", "schema", "table", "kind", "row_estimate", "columns")
+                oder None, wenn die Datenbank unverändert bzw. nicht erreichbar ist
+        """
+        try:
+            pool = cls._get_pool(postgres_settings, database)
+            with pool.connection(timeout=postgres_settings.get("connect_timeout", 5)) as connection:
+                fingerprint = connection.execute(FINGERPRINT_QUERY).fetchone()[0]
+                if known_fingerprint and fingerprint == known_fingerprint:
+                    return {"fingerprint": fingerprint, "tables": None}
+                rows = connection.execute(CATALOG_QUERY).fetchall()
+        except Exception as e:
+            ic()
+            ic(f"Fehler beim Abbilden der Datenbank {database}: {e}")
+            # Pool verwerfen, damit er nicht im Hintergrund weiter Verbindungen aufzubauen versucht
+            cls._discard_pool(database)
+            return {"fingerprint": None, "tables": None}
+
+        tables = [
+            {
+                "database": database,
+                "schema": schema_name,
+                "table": table_name,
+                "kind": RELATION_KINDS.get(kind, kind),
+                # reltuples ist -1 bzw. 0, solange die Tabelle nie analysiert wurde
+                "row_estimate": row_estimate if row_estimate and row_estimate > 0 else None,
+                "columns": columns,
+            }
+            for schema_name, table_name, kind, row_estimate, columns in rows
+        ]
+        return {"fingerprint": fingerprint, "tables": tables}
+
+    @classmethod
+    def close_pools(cls):
+        """
+        Schließt alle offenen Verbindungspools.
+        """
+        with cls.pools_lock:
+            for pool in cls.pools.values():
+                try:
+                    pool.close()
+                except Exception as e:
+                    ic()
+                    ic(e)
+            cls.pools.clear()
+
+    @classmethod
+    def _discard_pool(cls, database):
+        """
+        Schließt den Verbindungspool einer Datenbank und entfernt ihn (wird beim nächsten Zugriff neu erstellt).
+        """
+        with cls.pools_lock:
+            pool = cls.pools.pop(database, None)
+        if pool is not None:
+            try:
+                pool.close(timeout=1)
+            except Exception as e:
+                ic()
+                ic(e)
+
+    @classmethod
+    def _get_pool(cls, postgres_settings, database):
+        """
+        Liefert den Verbindungspool einer Datenbank und erstellt ihn bei Bedarf.
+        Ohne Host wird über den lokalen Unix-Socket verbunden, Passwörter kommen aus der
+        Umgebung (PGPASSWORD) bzw. der .pgpass-Datei.
+        """
+        with cls.pools_lock:
+            pool = cls.pools.get(database)
+            if pool is None:
+                conninfo = make_conninfo(
+                    dbname=database,
+                    user=postgres_settings.get("username") or None,
+                    host=postgres_settings.get("host") or None,
+                    port=postgres_settings.get("port") or None,
+                    application_name="terminAl",
+                    connect_timeout=postgres_settings.get("connect_timeout", 5),
+                )
+                pool = ConnectionPool(
+                    conninfo,
+                    min_size=1,
+                    max_size=postgres_settings.get("pool_max_size", 2),
+                    kwargs={"autocommit": True},
+                    open=True,
+                    name=f"terminAl-{database}",
+                )
+                cls.pools[database] = pool
+            return pool
+
+
+# Verbindungspools beim Beenden der Anwendung schließen
+atexit.register(PostgresCatalogMapper.close_pools)
@@ -0,0 +1,53 @@
+# Standardbibliotheken
+import json
+
+
+class PromptBuilder:
+    """
+    Baut die Nachrichten einer Anfrage von statisch nach dynamisch geordnet auf.
+
+    Ollama verwendet den Prompt-Cache (KV-Cache) des Modells für den längsten gemeinsamen Anfang zweier
+    Anfragen weiter. Die festen Anweisungen stehen daher als eigene, bytegleiche Systemnachricht direkt
+    hinter dem System-Prompt. In der Benutzernachricht folgen die selten wechselnden
+    Umgebungsinformationen, danach der Kontext der Anfrage und zuletzt die Frage selbst.
+    """
+
+    instructions = (
+        "Nutze die folgenden Kontextinformationen, wenn sie bei der Beantwortung der Benutzerfrage hilfreich sind.\n"
+        "Falls Pfade oder Dateinamen angegeben sind, kannst du daraus Ordner ableiten (z.B. durch Entfernen von Dateinamen oder Kürzen auf relevante Teilpfade).\n"
+        "Vermeide generische Platzhalter wie `/home/user/...` oder `*.pdf`, aber passe Pfade **sinnvoll** an, wenn sie eindeutig auf einen Zielordner hinweisen.\n"
+        "Wenn ein Pfad Leerzeichen enthält, setze ihn in einfache Anführungszeichen (z.B. `'... Ordner mit Leerzeichen'`).\n"
+        "Nutze die Pfade oder Datenbankdetails aus dem Abschnitt KONTEXT, wenn vorhanden. Priorisiere den Kontext über Umgebungsinformationen, falls nötig."
+    )
+
+    # Umgebungsinformationen in fester Reihenfolge, das wechselnde Arbeitsverzeichnis zuletzt
+    environment_keys = ("shell", "root_directory", "user", "hostname", "current_working_directory")
+
+    def build(self, user_input, context, environment):
+        """
+        Erstellt die Benutzernachricht.
+
+        Args:
+            user_input (str): Bereinigte Eingabe des Benutzers
+            context (str): Such- bzw. Schema-Kontext (siehe ContextPacker)
+            environment (dict): Umgebungsinformationen aus environment_retriever
+
+        Returns:
+            str: Benutzernachricht, die festen Anweisungen kommen aus instructions
+        """
+        ordered_environment = {key: environment[key] for key in self.environment_keys if key in environment}
+        ordered_environment.update(
+            (key, value) for key, value in environment.items() if key not in ordered_environment
+        )
+
+        return (
+            "### BEGINN AKTUELLE UMGEBUNGSINFORMATIONEN\n"
+            f"{json.dumps(ordered_environment, ensure_ascii=False)}\n"
+            "### ENDE AKTUELLE UMGEBUNGSINFORMATIONEN\n\n"
+            "### BEGINN KONTEXT\n"
+            f"{context}\n"
+            "### ENDE KONTEXT\n\n"
+            "# BEGINN USERPROMPT\n"
+            f"{user_input}\n"
+            "# ENDE USERPROMPT\n"
+        )
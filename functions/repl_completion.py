@@ -0,0 +1,187 @@
+# Standardbibliotheken
+import asyncio
+import os
+import re
+import sqlite3
+import time
+
+# Externe Bibliotheken
+from icecream import ic
+
+# Interne Module
+from functions.collection_generations import CollectionGenerations
+from functions.keyword_index import KeywordIndex
+from functions.path_trie import PathTrie
+from functions.settings_store import SettingsStore
+
+# readline ist nicht auf allen Plattformen verfügbar (z.B. Windows)
+try:
+    import readline
+except ImportError:
+    readline = None
+
+
+class ReplCompleter:
+    """
+    Tab-Vervollständigung der Eingabezeile für Elementnamen innerhalb von <...> und Verzeichnisse nach
+    \\cmd cd.
+
+    Die Vorschläge kommen aus einem PathTrie der aktuellen Generation. Der Baum wird nach jedem Update im
+    Executor neu aufgebaut und danach durch eine einzelne Zuweisung ersetzt. Die Vervollständigung läuft im
+    Thread von input() und liest nur den jeweils aktuellen, unveränderlichen Baum, sie blockiert also weder
+    den Event-Loop noch wartet sie auf einen laufenden Neuaufbau.
+    """
+
+    cmd_cd_pattern = re.compile(r"^\\cmd\s+cd\s+(.*)$")
+
+    def __init__(self, chromadb_path, keyword_index_path):
+        """
+        Initialisiert die Vervollständigung mit einem leeren Baum.
+
+        Args:
+            chromadb_path (str): Pfad zur ChromaDB (zum Auflösen der aktuellen Generation)
+            keyword_index_path (str): Pfad zum Schlüsselwort-Index
+        """
+        self.chromadb_path = chromadb_path
+        self.keyword_index_path = keyword_index_path
+        self.settings = SettingsStore.get("completion_settings")
+
+        self.trie = PathTrie()
+        self.matches = []  # Vorschläge der laufenden Vervollständigung (readline fragt sie einzeln ab)
+        self.refresh_task = None
+        self.refresh_requested = False
+        self.last_refresh = 0.0
+
+    @classmethod
+    def is_supported(cls):
+        """
+        Prüft, ob readline verfügbar ist.
+        """
+        return readline is not None
+
+    def install(self):
+        """
+        Registriert die Vervollständigung bei readline (Tab).
+
+        Returns:
+            bool: False, wenn readline nicht verfügbar ist
+        """
+        if not self.is_supported():
+            return False
+        readline.set_completer(self.complete)
+        # Leerzeichen und "<" trennen das zu ersetzende Wort, der Kontext kommt aus der ganzen Zeile
+        readline.set_completer_delims(" \t\n<")
+        readline.parse_and_bind("tab: complete")
+        return True
+
+    def request_refresh(self):
+        """
+        Fordert einen Neuaufbau des Baums an (z.B. nach einem Update). Läuft bereits ein Neuaufbau, wird
+        danach genau ein weiterer durchgeführt. Muss aus dem Event-Loop aufgerufen werden.
+        """
+        if self.refresh_task and not self.refresh_task.done():
+            self.refresh_requested = True
+            return
+        self.refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        """
+        Baut den Baum im Executor neu auf, höchstens einmal pro "min_refresh_seconds", und ersetzt ihn.
+        """
+        min_interval = self.settings.get("min_refresh_seconds", 60)
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = self.last_refresh + min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            self.refresh_requested = False
+            trie = await loop.run_in_executor(None, self._build)
+            if trie is not None:
+                self.trie = trie  # Atomare Zuweisung, laufende Vervollständigungen lesen den alten Baum
+            self.last_refresh = time.monotonic()
+
+            if not self.refresh_requested:
+                return
+
+    def close(self):
+        """
+        Bricht einen ausstehenden Neuaufbau ab.
+        """
+        if self.refresh_task:
+            self.refresh_task.cancel()
+
+    def _build(self):
+        """
+        Erstellt den Baum aus dem Schlüsselwort-Index der veröffentlichten Generation (über eine eigene
+        Verbindung, damit Suchen währenddessen nicht warten).
+
+        Returns:
+            PathTrie oder None, wenn noch keine Abbildung existiert
+        """
+        # Erst hier importieren, damit der Start nicht auf chromadb wartet
+        from functions.model_registry import ModelRegistry
+
+        generation, _ = CollectionGenerations.current(ModelRegistry.client(self.chromadb_path))
+        if generation is None:
+            return None
+
+        keyword_index = KeywordIndex(self.keyword_index_path, read_only=True)
+        try:
+            if not keyword_index.has_generation(generation):
+                return None
+            return PathTrie.from_entries(keyword_index.entries(generation, tool="bash"))
+        except sqlite3.Error as e:
+            ic()
+            ic(f"Vervollständigung konnte nicht aktualisiert werden: {e}")
+            return None
+        finally:
+            keyword_index.close()
+
+    def complete(self, text, state):
+        """
+        Callback für readline: Liefert den Vorschlag Nummer state für das Wort text.
+        """
+        if state == 0:
+            line = readline.get_line_buffer()[:readline.get_endidx()]
+            self.matches = self.candidates(line, text)
+        return self.matches[state] if state < len(self.matches) else None
+
+    def candidates(self, line, text):
+        """
+        Ermittelt die Vorschläge für die Eingabezeile bis zur Cursorposition.
+
+        Args:
+            line (str): Eingabezeile bis zum Cursor
+            text (str): Zu ersetzendes Wort am Ende der Zeile
+
+        Returns:
+            list: Ersetzungen für text
+        """
+        trie = self.trie
+        limit = self.settings.get("max_results", 50)
+
+        # Innerhalb von <...>: Elementnamen, bei eindeutigem Treffer wird die Klammer geschlossen
+        start = line.rfind("<")
+        if start > line.rfind(">"):
+            fragment = line[start + 1:]
+            names = trie.complete_name(fragment, limit)
+            suffix = ">" if len(names) == 1 else ""
+            return [name[len(fragment) - len(text):] + suffix for name in names]
+
+        # Nach \cmd cd: Verzeichnisse, relative Pfade ausgehend vom aktuellen Arbeitsverzeichnis
+        match = self.cmd_cd_pattern.match(line)
+        if match:
+            fragment = match.group(1)
+            # Verzeichnisteil normalisieren (z.B. "../" oder "./"), der angefangene letzte Bestandteil bleibt
+            typed_directory = fragment[:fragment.rfind("/") + 1]
+            partial = fragment[len(typed_directory):]
+            directory = os.path.normpath(os.path.join(os.getcwd(), typed_directory or "."))
+            parent = directory.rstrip("/") + "/"
+            # Vorschläge wieder auf den eingegebenen Verzeichnisteil abbilden
+            return [
+                (typed_directory + path[len(parent):])[len(fragment) - len(text):]
+                for path in trie.complete_path(parent + partial, limit)
+            ]
+
+        return []
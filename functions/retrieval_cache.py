@@ -0,0 +1,92 @@
+# Standardbibliotheken
+from collections import OrderedDict
+import threading
+import time
+
+
+class RetrievalCache:
+    """
+    In-Process-Cache mit LRU-Verdrängung und Ablaufzeit (TTL) für Suchergebnisse und Anfrage-Embeddings.
+
+    Zu jedem Eintrag wird die Zeit gespeichert, die seine Berechnung gekostet hat. Bei einem Treffer wird
+    sie als eingesparte Zeit gezählt. Gespeicherte Werte werden unverändert zurückgegeben und dürfen vom
+    Aufrufer nicht verändert werden.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=300.0):
+        """
+        Initialisiert einen leeren Cache.
+
+        Args:
+            max_entries (int, optional): Maximale Anzahl Einträge (0 deaktiviert den Cache)
+            ttl_seconds (float, optional): Lebensdauer eines Eintrags in Sekunden
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # Schlüssel -> (Wert, Ablaufzeitpunkt, Kosten in Sekunden)
+        self.lock = threading.Lock()
+
+        # Zähler seit dem Start
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get_or_compute(self, key, compute):
+        """
+        Liefert den gespeicherten Wert eines Schlüssels oder berechnet und speichert ihn.
+        Die Berechnung läuft ohne gehaltenes Lock, gleichzeitige Fehlzugriffe berechnen den Wert daher
+        gegebenenfalls mehrfach.
+
+        Args:
+            key: Hashbarer Schlüssel
+            compute: Funktion ohne Argumente, die den Wert berechnet
+
+        Returns:
+            Gespeicherter oder neu berechneter Wert
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0]
+            self.misses += 1
+
+        start_time = time.perf_counter()
+        value = compute()
+        cost = time.perf_counter() - start_time
+
+        if self.max_entries > 0:
+            with self.lock:
+                self.entries[key] = (value, time.monotonic() + self.ttl_seconds, cost)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """
+        Verwirft alle Einträge (die Zähler bleiben erhalten).
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Liefert Kennzahlen des Caches.
+
+        Returns:
+            dict: "entries", "max_entries", "hits", "misses", "hit_rate" und "saved_ms"
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_ms": self.saved_seconds * 1000,
+            }
@@ -0,0 +1,210 @@
+# Standardbibliotheken
+import asyncio
+import re
+import time
+
+# Interne Module
+from functions.postgres_catalog import PostgresCatalogMapper
+
+# SQL-Befehle, die das Schema einer Datenbank verändern können (am Anfang oder nach ";", z.B. "BEGIN; ALTER ...")
+DDL_PATTERN = re.compile(
+    r"(?:^|;)\s*(CREATE|ALTER|DROP|TRUNCATE|COMMENT|GRANT|REVOKE)\b|\s-f\s", re.IGNORECASE
+)
+
+# SQL-Kommentare ("-- ..." bis Zeilenende und "/* ... */")
+SQL_COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+# Wörter für den Abgleich von Prompt und Schema (Bezeichner werden zusätzlich an "_" getrennt)
+WORD_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+class SchemaContextCache:
+    """
+    Zwischenspeicher für den Schema-Kontext der aktiven Datenbank im Prompt.
+
+    Pro Datenbank werden Tabellen, Spalten und Typen einmalig beim \\psql login über den
+    PostgresCatalogMapper geladen. Nach Ablauf der TTL wird nur der Katalog-Fingerabdruck geprüft
+    und das Schema bei einer Änderung neu geladen. Nach DDL-Befehlen aus terminAl wird der Eintrag
+    verworfen. In den Prompt kommen nur die zur Anfrage passenden Tabellen.
+    """
+
+    def __init__(self, postgres_settings):
+        """
+        Initialisiert den Zwischenspeicher.
+
+        Args:
+            postgres_settings (dict): Einstellungen "tools.postgres"
+        """
+        self.postgres_settings = postgres_settings
+        self.ttl = postgres_settings.get("schema_context_ttl", 300)  # Sekunden bis zur Prüfung des Fingerabdrucks
+        self.max_tables = postgres_settings.get("schema_context_max_tables", 8)  # Tabellen mit Spalten im Prompt
+
+        # Datenbankname -> Dict mit "fingerprint", "tables", "checked_at" und "table_words"
+        self.entries = {}
+
+    async def load(self, database):
+        """
+        Lädt das Schema einer Datenbank (z.B. beim \\psql login), ohne den Event-Loop zu blockieren.
+
+        Args:
+            database (str): Name der Datenbank
+
+        Returns:
+            bool: True, wenn das Schema geladen werden konnte
+        """
+        self.entries.pop(database, None)
+        return await self._refresh(database)
+
+    def invalidate(self, database=None):
+        """
+        Verwirft den Schema-Kontext einer Datenbank bzw. aller Datenbanken.
+
+        Args:
+            database (str, optional): Name der Datenbank. Standard: alle
+        """
+        if database is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(database, None)
+
+    def invalidate_on_ddl(self, database, command):
+        """
+        Verwirft den Schema-Kontext, wenn ein ausgeführter SQL-Befehl das Schema verändern kann.
+        Jede Anweisung eines Befehls mit mehreren Anweisungen wird geprüft, Kommentare davor werden
+        ignoriert. Dateiimports (-f) werden vorsichtshalber ebenfalls als Schemaänderung gewertet.
+
+        Args:
+            database (str): Name der Datenbank, auf der der Befehl ausgeführt wurde
+            command (str): Ausgeführter SQL-Befehl
+        """
+        if isinstance(command, list):
+            command = " ".join(command)
+        # Auch ohne Entfernen der Kommentare prüfen, falls "--" in einer Zeichenkette steht
+        uncommented = SQL_COMMENT_PATTERN.sub(" ", command)
+        if DDL_PATTERN.search(f" {command}") or DDL_PATTERN.search(f" {uncommented}"):
+            self.invalidate(database)
+
+    async def get_context(self, database, prompt):
+        """
+        Liefert den kompakten Schema-Kontext für einen Prompt.
+
+        Args:
+            database (str): Name der aktiven Datenbank
+            prompt (str): Benutzereingabe
+
+        Returns:
+            str: Tabellen mit Spalten und Typen (nur die relevanten) oder ein Hinweis ohne Schema
+        """
+        entry = self.entries.get(database)
+        if entry is None or time.monotonic() - entry["checked_at"] > self.ttl:
+            await self._refresh(database)
+            entry = self.entries.get(database)
+
+        if entry is None:
+            return f"Datenbank: {database} (Schema nicht verfügbar)"
+
+        return self._render(database, entry, prompt)
+
+    async def _refresh(self, database):
+        """
+        Lädt das Schema neu bzw. prüft bei bekanntem Schema nur den Fingerabdruck.
+        """
+        entry = self.entries.get(database)
+        known_fingerprint = entry["fingerprint"] if entry else None
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, PostgresCatalogMapper.map_database, self.postgres_settings, database, known_fingerprint
+        )
+
+        if result["fingerprint"] is None:
+            # Datenbank nicht erreichbar, beim nächsten Prompt erneut versuchen
+            self.entries.pop(database, None)
+            return False
+
+        if result["tables"] is None:
+            # Schema unverändert
+            entry["checked_at"] = time.monotonic()
+            return True
+
+        self.entries[database] = {
+            "fingerprint": result["fingerprint"],
+            "tables": result["tables"],
+            "checked_at": time.monotonic(),
+            "table_words": [self._table_words(table) for table in result["tables"]],
+        }
+        return True
+
+    def _render(self, database, entry, prompt):
+        """
+        Formatiert die relevanten Tabellen einer Datenbank für den Prompt.
+        Tabellen ohne Bezug zur Anfrage werden nur mit Namen aufgeführt.
+        """
+        tables = entry["tables"]
+        if len(tables) <= self.max_tables:
+            selected = list(range(len(tables)))
+        else:
+            prompt_words = self._words(prompt)
+            scores = [
+                (self._score(prompt_words, name_words, column_words), index)
+                for index, (name_words, column_words) in enumerate(entry["table_words"])
+            ]
+            selected = sorted(index for score, index in sorted(scores, reverse=True)[:self.max_tables] if score > 0)
+
+        lines = [f"Datenbank: {database}"]
+        for index in selected:
+            table = tables[index]
+            columns = ", ".join(f"{column['name']} {column['type']}" for column in table["columns"])
+            row_estimate = table["row_estimate"]
+            rows = f", ca. {float(f'{row_estimate:.2g}'):.0f} Zeilen" if row_estimate else ""
+            lines.append(f"{table['schema']}.{table['table']} ({table['kind']}{rows}): {columns or '-'}")
+
+        selected_set = set(selected)
+        others = [f"{tables[index]['schema']}.{tables[index]['table']}"
+                  for index in range(len(tables)) if index not in selected_set]
+        if others:
+            lines.append(f"Weitere Tabellen: {', '.join(others)}")
+        if not tables:
+            lines.append("Keine Tabellen vorhanden")
+
+        return "\n".join(lines)
+
+    def _score(self, prompt_words, name_words, column_words):
+        """
+        Bewertet eine Tabelle anhand der Überschneidung mit der Anfrage.
+        Treffer im Tabellennamen zählen doppelt, einfache Wortformen (z.B. "kunde"/"kunden") werden
+        über gemeinsame Präfixe ab vier Zeichen erkannt.
+        """
+        score = 0
+        for word in prompt_words:
+            if any(self._matches(word, name_word) for name_word in name_words):
+                score += 2
+            elif any(self._matches(word, column_word) for column_word in column_words):
+                score += 1
+        return score
+
+    def _matches(self, word, other):
+        """
+        Prüft, ob zwei Wörter gleich sind oder eines (ab vier Zeichen) Präfix des anderen ist.
+        """
+        if word == other:
+            return True
+        shorter, longer = sorted((word, other), key=len)
+        return len(shorter) >= 4 and longer.startswith(shorter)
+
+    def _table_words(self, table):
+        """
+        Zerlegt Schema-, Tabellen- und Spaltennamen einer Tabelle in Wörter.
+
+        Returns:
+            tuple: Wörter des Tabellennamens und Wörter der Spaltennamen
+        """
+        name_words = self._words(f"{table['schema']} {table['table']}") - {"public"}
+        column_words = self._words(" ".join(column["name"] for column in table["columns"]))
+        return name_words, column_words
+
+    def _words(self, text):
+        """
+        Liefert die kleingeschriebenen Wörter eines Textes als Set.
+        """
+        return {word.lower() for word in WORD_PATTERN.findall(text)}
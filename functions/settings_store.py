@@ -0,0 +1,213 @@
+# Standardbibliotheken
+import asyncio
+import json
+import os
+import tempfile
+import threading
+
+# Externe Bibliotheken
+from dotenv import load_dotenv
+from icecream import ic
+
+# Umgebungsvariablen laden
+load_dotenv("./.env")
+terminal_path = os.getenv("TERMINAL_PATH")
+
+
+class SettingsStore:
+    """
+    Zentrale Verwaltung der settings.json für alle Komponenten.
+
+    - Die Datei wird einmal geladen, alle Komponenten teilen dasselbe Dict. Beim Neuladen werden die
+      vorhandenen Dicts an Ort und Stelle aktualisiert, gehaltene Referenzen (z.B. auf "chroma_settings")
+      bleiben damit gültig.
+    - Änderungen werden über update() vorgenommen und atomar geschrieben (temporäre Datei und rename).
+      Vor dem Schreiben werden externe Änderungen übernommen, damit keine Schlüssel überschrieben werden.
+    - Komponenten registrieren sich mit subscribe() und werden mit den geänderten Abschnitten benachrichtigt.
+    - watch() prüft periodisch die Änderungszeit der Datei und lädt externe Änderungen nach.
+    """
+
+    settings_path = terminal_path + "settings/settings.json"
+    settings = None  # Gemeinsames Dict aller Komponenten
+    mtime = None  # Änderungszeit der zuletzt geladenen bzw. geschriebenen Datei
+    subscribers = []  # Callbacks, die mit der Menge der geänderten Abschnitte aufgerufen werden
+    lock = threading.RLock()
+
+    @classmethod
+    def get(cls, section=None):
+        """
+        Liefert die Einstellungen (beim ersten Aufruf aus der Datei geladen).
+
+        Args:
+            section (str, optional): Name eines Abschnitts, z.B. "chroma_settings"
+
+        Returns:
+            dict: Alle Einstellungen bzw. der Abschnitt (leeres Dict, wenn er fehlt)
+        """
+        with cls.lock:
+            if cls.settings is None:
+                cls.settings = cls._read() or {}
+            if section is None:
+                return cls.settings
+            return cls.settings.setdefault(section, {})
+
+    @classmethod
+    def update(cls, section, values):
+        """
+        Ändert Werte eines Abschnitts, schreibt die Datei atomar und benachrichtigt die Komponenten.
+
+        Args:
+            section (str): Name des Abschnitts, z.B. "ollama_settings"
+            values (dict): Zu setzende Schlüssel und Werte
+
+        Returns:
+            bool: True, wenn die Einstellungen gespeichert wurden
+        """
+        with cls.lock:
+            # Externe Änderungen zuerst übernehmen, damit sie nicht überschrieben werden
+            cls.check_for_changes()
+
+            settings_section = cls.get(section)
+            if all(key in settings_section and settings_section[key] == value for key, value in values.items()):
+                return True
+            settings_section.update(values)
+
+            if not cls._write():
+                return False
+        cls._notify({section})
+        return True
+
+    @classmethod
+    def subscribe(cls, callback):
+        """
+        Registriert einen Callback für Änderungen der Einstellungen.
+
+        Args:
+            callback: Funktion, die mit der Menge der geänderten Abschnitte (set) aufgerufen wird
+        """
+        with cls.lock:
+            if callback not in cls.subscribers:
+                cls.subscribers.append(callback)
+
+    @classmethod
+    def check_for_changes(cls):
+        """
+        Lädt die Datei neu, wenn sie seit dem letzten Laden extern geändert wurde.
+
+        Returns:
+            set: Geänderte Abschnitte (leer, wenn sich nichts geändert hat)
+        """
+        with cls.lock:
+            if cls.settings is None:
+                cls.get()
+                return set()
+            try:
+                mtime = os.stat(cls.settings_path).st_mtime_ns
+            except OSError:
+                return set()
+            if mtime == cls.mtime:
+                return set()
+
+            loaded = cls._read()
+            if loaded is None:
+                return set()  # Ungültige Datei, bisherige Einstellungen behalten
+
+            changed = {key for key in cls.settings.keys() | loaded.keys() if cls.settings.get(key) != loaded.get(key)}
+            cls._merge(cls.settings, loaded)
+
+        if changed:
+            print("Einstellungen wurden neu geladen.")
+            cls._notify(changed)
+        return changed
+
+    @classmethod
+    async def watch(cls, interval=2.0):
+        """
+        Überwacht die Datei im Hintergrund auf externe Änderungen (Task im Event-Loop).
+
+        Args:
+            interval (float, optional): Sekunden zwischen zwei Prüfungen
+        """
+        while True:
+            await asyncio.sleep(interval)
+            cls.check_for_changes()
+
+    @classmethod
+    def _read(cls):
+        """
+        Liest die Datei und merkt sich ihre Änderungszeit.
+
+        Returns:
+            dict: Eingelesene Einstellungen oder None bei einem Fehler
+        """
+        try:
+            mtime = os.stat(cls.settings_path).st_mtime_ns
+            with open(cls.settings_path, "r", encoding="utf-8") as file:
+                settings = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            ic()
+            ic(f"Einstellungen konnten nicht geladen werden: {e}")
+            # Fehlerhafte Datei nicht bei jeder Prüfung erneut melden
+            try:
+                cls.mtime = os.stat(cls.settings_path).st_mtime_ns
+            except OSError:
+                pass
+            return None
+        cls.mtime = mtime
+        return settings
+
+    @classmethod
+    def _write(cls):
+        """
+        Schreibt die Einstellungen atomar: erst in eine temporäre Datei im selben Verzeichnis, dann rename.
+
+        Returns:
+            bool: True bei Erfolg
+        """
+        directory = os.path.dirname(cls.settings_path)
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                    "w", encoding="utf-8", dir=directory, prefix=".settings.", suffix=".tmp", delete=False) as file:
+                temp_path = file.name
+                json.dump(cls.settings, file, indent=2, ensure_ascii=False)
+                file.write("\n")
+                file.flush()
+                os.fsync(file.fileno())
+            # Rechte der bisherigen Datei übernehmen
+            if os.path.exists(cls.settings_path):
+                os.chmod(temp_path, os.stat(cls.settings_path).st_mode & 0o777)
+            os.replace(temp_path, cls.settings_path)
+            cls.mtime = os.stat(cls.settings_path).st_mtime_ns
+            return True
+        except OSError as e:
+            ic()
+            ic(f"Einstellungen konnten nicht gespeichert werden: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+    @classmethod
+    def _merge(cls, target, source):
+        """
+        Übernimmt source in target, verschachtelte Dicts werden an Ort und Stelle aktualisiert.
+        """
+        for key in list(target.keys() - source.keys()):
+            del target[key]
+        for key, value in source.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                cls._merge(target[key], value)
+            else:
+                target[key] = value
+
+    @classmethod
+    def _notify(cls, changed):
+        """
+        Ruft alle registrierten Callbacks mit den geänderten Abschnitten auf.
+        """
+        for callback in list(cls.subscribers):
+            try:
+                callback(changed)
+            except Exception as e:
+                ic()
+                ic(f"Fehler beim Übernehmen geänderter Einstellungen: {e}")
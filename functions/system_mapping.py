@@ -1,12 +1,21 @@
 # Standardbibliotheken
 import json
+import multiprocessing
 import os
+import stat
 import subprocess
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 # Externe Bibliotheken
 from dotenv import load_dotenv
 from icecream import ic
 
+# Interne Module
+from functions.path_exclusion import PathExclusionEngine
+from functions.path_table import PathTable
+from functions.postgres_catalog import PostgresCatalogMapper
+from functions.settings_store import SettingsStore
+
 # Lade Umgebungsvariablen aus .env Datei
 ic()
 ic("Before SystemMapping")
@@ -15,107 +24,359 @@ terminal_path = os.getenv("TERMINAL_PATH")
 
 
 class SystemMapping:
-    # Lade Einstellungen aus der settings.json Datei
-    settings = json.load(open(terminal_path + "settings/settings.json"))
+    # Gemeinsame Einstellungen aller Komponenten (werden bei Änderungen an Ort und Stelle aktualisiert)
+    settings = SettingsStore.get()
+    # Kompilierte Ausschlussregeln (siehe get_exclusion_engine)
+    exclusion_engine = None
 
     @classmethod
-    def map_all(cls):
+    def map_all(cls, known_fingerprints=None):
         """
         Abbildung von Postgres-Datenbanken als auch Betriebssystem.
+        Die OS-Ergebnisse werden als Generator zurückgegeben, damit auch sehr große Dateisysteme
+        verarbeitet werden können, ohne die gesamte Abbildung im Speicher zu halten.
+
+        Args:
+            known_fingerprints (dict, optional): Katalog-Fingerabdrücke des letzten Abgleichs pro Datenbank
 
         Returns:
-            tuple: Ergebnisse der OS-Abbildung und Postgres-Abbildung
+            tuple: Generator (bzw. PathTable im Modus "tree") der OS-Abbildung und Dict der Postgres-Abbildung
         """
-        os_mapping_vars = cls.settings.get("os_mapping")
-        tree_file_path = terminal_path + os_mapping_vars.get("tree_file_path", "./database/system_tree.json")
-
-        psql_results = cls.map_postgres()
-        cls.map_os()
-        os_results = cls.process_os_mapping(tree_file_path)
+        psql_results = cls.map_postgres(known_fingerprints=known_fingerprints)
+
+        # Paralleler Durchlauf für große Dateisysteme, tree command als Fallback, sonst serieller Walker
+        crawl_mode = cls.settings.get("os_mapping", {}).get("crawl_mode", "serial")
+        if crawl_mode == "parallel":
+            os_results = cls.crawl_os_parallel()
+        elif crawl_mode == "tree":
+            os_results = cls.map_os()
+        else:
+            os_results = cls.walk_os()
 
         return os_results, psql_results
 
     @classmethod
-    def map_postgres(cls, active_database=None):
+    def map_postgres(cls, active_database=None, known_fingerprints=None):
         """
-        Abbildung von Postgres-Datenbanken und ihren Tabellen.
+        Abbildung von Postgres-Datenbanken über den Systemkatalog (Schemas, Tabellen, Spalten, Typen
+        und geschätzte Zeilenanzahl). Alle Datenbanken werden parallel über Verbindungspools abgefragt,
+        eine nicht erreichbare Datenbank bricht die Abbildung der übrigen nicht ab.
 
         Args:
             active_database (str, optional): Name der aktiven Datenbank.
                 Wenn angegeben, wird nur diese Datenbank abgebildet.
+            known_fingerprints (dict, optional): Katalog-Fingerabdrücke des letzten Abgleichs.
+                Datenbanken mit unverändertem Fingerabdruck werden nicht erneut abgebildet.
 
         Returns:
-            list: Liste von Tabellen mit Datenbanknamen und Tabellendaten
+            dict: Datenbankname -> Dict mit "fingerprint" und "tables" (siehe PostgresCatalogMapper.map_database).
+                "tables" ist None, wenn die Datenbank unverändert ist oder nicht abgebildet werden konnte
         """
-        postgres_settings = cls.settings.get("tools", "").get("postgres", "")
-        username = postgres_settings.get("username", "")
-        databases = postgres_settings.get("databases", [])  # Liste der Datenbanken
-        mapping_tables_command = postgres_settings.get("mapping_tables_command", [])  # Liste der Befehlsteile
+        postgres_settings = cls.settings.get("tools", {}).get("postgres", {})
+        databases = [active_database] if active_database else postgres_settings.get("databases", [])
 
-        table_results = []
+        if not databases:
+            return {}
 
-        mapping_tables_command[2] = username
+        try:
+            return PostgresCatalogMapper.map_databases(postgres_settings, databases, known_fingerprints)
+        except Exception as e:
+            ic()
+            ic(e)
+            return {database: {"fingerprint": None, "tables": None} for database in databases}
 
-        # Wenn keine aktive Datenbank angegeben ist, bilde alle Datenbanken ab
-        if databases and mapping_tables_command and username and not active_database:
-            for database in databases:
-                mapping_tables_command[5] = database
+    @classmethod
+    def walk_os(cls, root=None, exclusion_engine=None):
+        """
+        Durchläuft das Dateisystem mit os.scandir und liefert die Einträge als Generator.
+        Ersetzt den tree-Aufruf samt JSON-Datei, der Speicherbedarf bleibt unabhängig von der Größe
+        des Dateisystems konstant (nur der Stapel der noch offenen Verzeichnisse wird gehalten).
 
-                try:
-                    # Speichere das Ergebnis von subprocess.run()
-                    result = subprocess.run(
-                        mapping_tables_command,
-                        capture_output=True,
-                        text=True,
-                        check=True
-                    )
+        Ausgeschlossene Verzeichnisse werden über die PathExclusionEngine erkannt und nicht betreten.
+        Symbolische Links werden wie bei tree (ohne -l) übersprungen.
 
-                    # Füge sowohl Datenbankname als auch Befehlsausgabe zu table_results hinzu
-                    table_results.append({
-                        "database": database,
-                        "tables_table": result.stdout
-                    })
+        Args:
+            root (str, optional): Startverzeichnis. Standard: Verzeichnis aus dem tree command
+            exclusion_engine (PathExclusionEngine, optional): Ausschlussregeln. Standard: Regeln aus den
+                Einstellungen
 
-                except subprocess.CalledProcessError as e:
-                    ic()
-                    ic(f"stdout: {e.stdout}")
-                    ic(f"stderr: {e.stderr}")
-                    return []
-                except Exception as e:
-                    ic()
-                    ic(e)
-                    return []
+        Yields:
+            tuple: Pfad und Dict mit "filetype" und "item" (gleiche Struktur wie process_os_mapping)
+                sowie "mtime", "inode" und "size" für den inkrementellen Abgleich
+        """
+        root = root or cls._tree_options()[0]
+        exclusion_engine = exclusion_engine or cls.get_exclusion_engine()
 
-        # Wenn eine aktive Datenbank angegeben ist, bilde nur diese ab
-        elif mapping_tables_command and username and active_database:
-            mapping_tables_command[5] = active_database
+        # Stapel der noch zu durchlaufenden Verzeichnisse (Tiefensuche)
+        pending_directories = [root]
 
-            try:
-                # Speichere das Ergebnis von subprocess.run()
-                result = subprocess.run(
-                    mapping_tables_command,
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
+        while pending_directories:
+            directory = pending_directories.pop()
+            for record in cls.scan_directory(directory, exclusion_engine, pending_directories):
+                yield cls._record_to_entry(record)
 
-                # Füge sowohl Datenbankname als auch Befehlsausgabe zu table_results hinzu
-                table_results.append({
-                    "database": active_database,
-                    "tables_table": result.stdout
-                })
+    @classmethod
+    def crawl_os_parallel(cls, root=None, exclusion_engine=None, workers=None, batch_size=None):
+        """
+        Durchläuft das Dateisystem parallel in einem Prozesspool und liefert die Einträge als Generator
+        (gleiche Struktur wie walk_os).
 
-            except subprocess.CalledProcessError as e:
-                ic()
-                ic(f"stdout: {e.stdout}")
-                ic(f"stderr: {e.stderr}")
-                return []
-            except Exception as e:
-                ic()
-                ic(e)
-                return []
+        Die Arbeit wird zunächst nach den Verzeichnissen der obersten Ebene aufgeteilt. Jeder Auftrag
+        verarbeitet höchstens batch_size Einträge und gibt die noch offenen Unterverzeichnisse zurück.
+        Diese kommen in eine Warteschlange im Hauptprozess und werden verteilt, sobald Prozesse frei werden.
+        Gleichzeitig sind höchstens doppelt so viele Aufträge wie Prozesse unterwegs. Große Teilbäume
+        werden so automatisch weiter aufgeteilt, ohne dass ein einzelner Prozess den gesamten Durchlauf
+        aufhält.
+
+        Args:
+            root (str, optional): Startverzeichnis. Standard: Verzeichnis aus dem tree command
+            exclusion_engine (PathExclusionEngine, optional): Ausschlussregeln. Standard: Regeln aus den
+                Einstellungen (die Trefferzähler der Prozesse werden darin zusammengeführt)
+            workers (int, optional): Anzahl der Prozesse. Standard: crawl_workers bzw. Anzahl CPU-Kerne
+            batch_size (int, optional): Einträge pro Auftrag. Standard: crawl_batch_size
+
+        Yields:
+            tuple: Pfad und Dict mit "filetype", "item", "mtime", "inode" und "size"
+
+        Raises:
+            RuntimeError: Wenn ein Auftrag fehlschlägt (z.B. ein vom System beendeter Prozess)
+        """
+        os_mapping_vars = cls.settings.get("os_mapping", {})
+        root = root or cls._tree_options()[0]
+        exclusion_engine = exclusion_engine or cls.get_exclusion_engine()
+        workers = workers or os_mapping_vars.get("crawl_workers") or os.cpu_count() or 1
+        batch_size = batch_size or os_mapping_vars.get("crawl_batch_size", 20000)
+
+        # Oberste Ebene direkt durchlaufen, ihre Verzeichnisse bilden die ersten Aufträge
+        shards = []
+        for record in cls.scan_directory(root, exclusion_engine, shards):
+            yield cls._record_to_entry(record)
+
+        # Offene Verzeichnisse im Hauptprozess (als Stapel, damit die Warteschlange beim Abstieg klein bleibt)
+        pending_directories = shards[::-1]
+        max_in_flight = 2 * workers
+
+        # Prozesse über einen Forkserver starten: ein fork aus dem Update-Thread würde die Sperren der
+        # laufenden Threads (torch, ChromaDB, ONNX Runtime) in einem ungültigen Zustand übernehmen
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+        try:
+            futures = set()
+            while True:
+                # Freie Plätze mit gleich großen Anteilen der Warteschlange füllen
+                if pending_directories and len(futures) < max_in_flight:
+                    chunk_size = -(-len(pending_directories) // max_in_flight)
+                    while pending_directories and len(futures) < max_in_flight:
+                        directories = pending_directories[-chunk_size:]
+                        del pending_directories[-chunk_size:]
+                        futures.add(executor.submit(_crawl_shard, directories, exclusion_engine, batch_size))
+
+                if not futures:
+                    break
+
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        records, remaining_directories, hits = future.result()
+                    except Exception as e:
+                        # Ohne den Teilbaum wäre die Abbildung unvollständig und der Abgleich würde seine
+                        # Einträge als verschwunden löschen, daher den gesamten Durchlauf abbrechen
+                        raise RuntimeError(f"Fehler im Crawl-Prozess: {e}") from e
+
+                    # Trefferzähler der Ausschlussregeln aus dem Prozess übernehmen
+                    exclusion_engine.merge_hits(hits)
+
+                    # Offene Unterverzeichnisse zurück in die Warteschlange, sie werden an frei werdende
+                    # Prozesse verteilt
+                    pending_directories.extend(remaining_directories)
+
+                    for record in records:
+                        yield cls._record_to_entry(record)
+        finally:
+            # Bei vorzeitigem Abbruch des Generators offene Aufträge verwerfen
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @classmethod
+    def scan_directory(cls, directory, exclusion_engine, pending_directories):
+        """
+        Liest ein einzelnes Verzeichnis und liefert seine Einträge als kompakte Tupel.
+        Nicht ausgeschlossene Unterverzeichnisse werden an pending_directories angehängt.
+
+        Args:
+            directory (str): Zu lesendes Verzeichnis
+            exclusion_engine (PathExclusionEngine): Ausschlussregeln
+            pending_directories (list): Liste, an die Unterverzeichnisse angehängt werden
+
+        Yields:
+            tuple: (Pfad, Dateityp, Name, mtime, Inode, Größe)
+        """
+        entry_count = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # Restliche Einträge überspringen, wenn das Verzeichnis zu groß ist
+                    if exclusion_engine.truncates(entry_count):
+                        return
+
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            filetype = "directory"
+                        elif entry.is_file(follow_symlinks=False):
+                            filetype = "file"
+                        else:
+                            continue
+
+                        # Ausgeschlossene Einträge überspringen (Verzeichnisse samt Teilbaum)
+                        if exclusion_engine.excludes(entry.path, entry.name, filetype == "directory"):
+                            continue
+
+                        # Statusinformationen für den inkrementellen Abgleich
+                        stat_result = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        # Eintrag wurde während des Durchlaufs entfernt oder ist nicht lesbar
+                        continue
+
+                    if filetype == "directory":
+                        # Verzeichnis später durchlaufen
+                        pending_directories.append(entry.path)
+
+                    entry_count += 1
+                    yield (entry.path, filetype, entry.name, stat_result.st_mtime_ns, stat_result.st_ino,
+                           stat_result.st_size)
+
+        except OSError:
+            # Verzeichnis nicht lesbar (z.B. fehlende Berechtigung) oder bereits entfernt
+            return
+
+    @classmethod
+    def _record_to_entry(cls, record):
+        """
+        Wandelt ein kompaktes Tupel aus scan_directory in das Format (Pfad, Metadaten) um.
+        """
+        path, filetype, name, mtime, inode, size = record
+        return path, {"filetype": filetype, "item": name, "mtime": mtime, "inode": inode, "size": size}
+
+    @classmethod
+    def display_name(cls, name):
+        """
+        Liefert die speicherbare Form eines Datei- oder Pfadnamens. Nicht als UTF-8 dekodierbare Bytes
+        kommen von os.scandir als einzelne Surrogate, die SQLite und ChromaDB nicht speichern können.
+        Sie werden wie bei tree -J als Escape-Sequenz dargestellt (z.B. "\\xff").
+
+        Args:
+            name (str): Name bzw. Pfad aus dem Dateisystem
+
+        Returns:
+            str: Name ohne Surrogate
+        """
+        try:
+            name.encode("utf-8")
+            return name
+        except UnicodeEncodeError:
+            return name.encode("utf-8", "surrogateescape").decode("utf-8", "backslashreplace")
+
+    @classmethod
+    def get_exclusion_engine(cls):
+        """
+        Liefert die aus den Einstellungen kompilierten Ausschlussregeln (einmalig erstellt).
+        Die Trefferzähler sammeln sich über alle Durchläufe des Prozesses.
+
+        Returns:
+            PathExclusionEngine: Ausschlussregeln der Abbildung
+        """
+        if cls.exclusion_engine is None:
+            root, legacy_pattern = cls._tree_options()
+            cls.exclusion_engine = PathExclusionEngine.from_settings(
+                cls.settings.get("os_mapping", {}), root=root, legacy_pattern=legacy_pattern
+            )
+        return cls.exclusion_engine
+
+    @classmethod
+    def apply_settings(cls, changed_sections):
+        """
+        Verwirft die kompilierten Ausschlussregeln, wenn sich "os_mapping" geändert hat
+        (werden beim nächsten Zugriff neu erstellt).
+
+        Args:
+            changed_sections (set): Geänderte Abschnitte der Einstellungen
+        """
+        if "os_mapping" in changed_sections:
+            cls.exclusion_engine = None
+
+    @classmethod
+    def is_excluded(cls, path, is_directory=False):
+        """
+        Prüft, ob ein einzelner Pfad (inklusive übergeordneter Verzeichnisse) von der Abbildung
+        ausgeschlossen ist, z.B. für Dateisystem-Ereignisse.
+
+        Args:
+            path (str): Vollständiger Pfad
+            is_directory (bool, optional): True für Verzeichnisse
 
-        return table_results
+        Returns:
+            bool: True, wenn der Pfad ausgeschlossen ist
+        """
+        return cls.get_exclusion_engine().excludes_path(path, is_directory)
+
+    @classmethod
+    def stat_entry(cls, path):
+        """
+        Erstellt einen einzelnen Eintrag im Format von walk_os (z.B. für Dateisystem-Ereignisse).
+
+        Args:
+            path (str): Vollständiger Pfad
+
+        Returns:
+            tuple: Pfad und Metadaten oder None, wenn der Pfad fehlt, ausgeschlossen oder kein
+                reguläres Verzeichnis bzw. keine reguläre Datei ist
+        """
+        name = os.path.basename(path.rstrip("/")) or path
+
+        try:
+            stat_result = os.lstat(path)
+        except OSError:
+            return None
+
+        if stat.S_ISDIR(stat_result.st_mode):
+            filetype = "directory"
+        elif stat.S_ISREG(stat_result.st_mode):
+            filetype = "file"
+        else:
+            return None
+
+        if cls.is_excluded(path, filetype == "directory"):
+            return None
+
+        return path, {
+            "filetype": filetype,
+            "item": name,
+            "mtime": stat_result.st_mtime_ns,
+            "inode": stat_result.st_ino,
+            "size": stat_result.st_size,
+        }
+
+    @classmethod
+    def _tree_options(cls):
+        """
+        Liest Startverzeichnis und Ausschlussmuster (-I) aus dem konfigurierten tree command,
+        damit die Einstellungen für den Walker und den tree command identisch bleiben.
+
+        Returns:
+            tuple: Startverzeichnis und Ausschlussmuster
+        """
+        os_mapping_vars = cls.settings.get("os_mapping", {})
+        tree_command = os_mapping_vars.get("tree_command", [])
+
+        # Das erste Argument nach "tree" ist das Startverzeichnis
+        root = tree_command[1] if len(tree_command) > 1 else "/"
+
+        # Das Argument nach -I enthält das Ausschlussmuster
+        exclude_pattern = ""
+        if "-I" in tree_command:
+            pattern_index = tree_command.index("-I") + 1
+            if pattern_index < len(tree_command):
+                exclude_pattern = tree_command[pattern_index]
+
+        return root, exclude_pattern
 
     @classmethod
     def map_os(cls):
@@ -123,7 +384,7 @@ class SystemMapping:
         Abbildung vom Dateisystem mit Hilfe des tree commands und speichert die Ausgabe in einer JSON-Datei.
 
         Returns:
-            dict: Verarbeitete Dateisystemabbildung
+            PathTable: Verarbeitete Dateisystemabbildung
         """
         os_mapping_vars = cls.settings.get("os_mapping")
         tree_command = list(os_mapping_vars.get("tree_command", None))
@@ -131,7 +392,7 @@ class SystemMapping:
         delete_tree_command = list(os_mapping_vars.get("delete_tree_command", None))
 
         if any(var is None for var in [tree_command, tree_file_path, delete_tree_command]):
-            return {}
+            return PathTable()
 
         tree_command.append(tree_file_path)
         delete_tree_command.append(tree_file_path)
@@ -162,11 +423,11 @@ class SystemMapping:
                     ic()
                     ic(f"stdout: {e.stdout}")
                     ic(f"stderr: {e.stderr}")
-                    return {}
+                    return PathTable()
                 except Exception as e:
                     ic()
                     ic(f"error: {e}")
-                    return {}
+                    return PathTable()
 
             except subprocess.CalledProcessError as e:
                 # Wenn das Löschen fehlschlägt, versuche trotzdem Abbildung zu generieren
@@ -185,11 +446,11 @@ class SystemMapping:
                     ic()
                     ic(f"stdout: {e.stdout}")
                     ic(f"stderr: {e.stderr}")
-                    return {}
+                    return PathTable()
                 except Exception as e:
                     ic()
                     ic(f"error: {e}")
-                    return {}
+                    return PathTable()
 
             except Exception as e:
                 # Wenn während des Löschens eine andere Ausnahme auftritt, versuche trotzdem zu generieren
@@ -206,22 +467,22 @@ class SystemMapping:
                 except Exception as e:
                     ic()
                     ic(f"error: {e}")
-                    return {}
+                    return PathTable()
 
         else:
-            return {}
+            return PathTable()
 
     @classmethod
     def process_os_mapping(cls, tree_file_path=None):
         """
-        Verarbeitet die JSON-Ausgabe des tree commands und erstellt ein Verzeichnis-Wörterbuch.
+        Verarbeitet die JSON-Ausgabe des tree commands und erstellt eine kompakte Pfadtabelle.
 
         Args:
             tree_file_path (str, optional): Pfad zur JSON-Datei mit Baumstruktur.
                 Wenn nicht angegeben, wird der Pfad aus den Einstellungen verwendet.
 
         Returns:
-            dict: Wörterbuch mit Dateipfaden und zugehörigen Informationen
+            PathTable: Tabelle mit Dateipfaden und zugehörigen Informationen (iterierbar wie walk_os)
         """
         if tree_file_path is None:
             tree_file_path = terminal_path + cls.settings.get("tree_file_path", "./database/system_tree.json")
@@ -236,43 +497,70 @@ class SystemMapping:
             if not root_dirs:
                 ic()
                 ic(f"Fehler beim Laden des system_tree.json")
-                return {}
+                return PathTable()
 
-            directory_dict = {}
+            path_table = PathTable()
             empty_directories = 0
-            directories = []
+
+            # Warteschlange aus Verzeichnis und Index des übergeordneten Verzeichnisses in der Tabelle
+            pending_directories = [(directory, -1) for directory in root_dirs]
 
             # Iteriere durch die root directories und extrahiere Details
-            for directory in root_dirs:
+            for directory, parent_index in pending_directories:
                 if type(directory) == dict:
                     if directory["type"] == "directory":
-                        directories.append(directory["name"])
-                        # Füge alle Verzeichnisse zum directory_dict hinzu, unabhängig davon, ob sie Inhalte haben
-                        item_name = directory["name"].split("/")[-1]
-                        directory_dict[directory["name"]] = {"filetype": directory["type"], "item": item_name}
+                        # Füge alle Verzeichnisse zur Tabelle hinzu, unabhängig davon, ob sie Inhalte haben.
+                        # Verzeichnisse der obersten Ebene behalten den vollständigen Pfad als Namen.
+                        item_name = directory["name"] if parent_index == -1 else directory["name"].split("/")[-1]
+                        directory_index = path_table.add(parent_index, item_name, directory["type"])
 
                         # Verarbeite Inhalte, falls vorhanden
                         if directory.get("contents", False):
                             for item in directory["contents"]:
                                 if item["type"] == "file":
-                                    # Extrahiere den Dateinamen aus dem Pfad und füge die Datei zum Verzeichnis-Dict hinzu
+                                    # Extrahiere den Dateinamen aus dem Pfad und füge die Datei zur Tabelle hinzu
                                     item_name = item["name"].split("/")[-1]
-                                    directory_dict[item["name"]] = {"filetype": item["type"], "item": item_name}
+                                    path_table.add(directory_index, item_name, item["type"])
                                 elif item["type"] == "directory":
-                                    # Füge Unterverzeichnis zur root_dirs Liste hinzu, um es später zu verarbeiten
-                                    root_dirs.append(item)
+                                    # Füge Unterverzeichnis zur Warteschlange hinzu, um es später zu verarbeiten
+                                    pending_directories.append((item, directory_index))
                         else:
                             # Zähle leere Verzeichnisse
                             empty_directories += 1
 
-            # Entferne große Elemente
-            for path, content in directory_dict.items():
-                if len(content) > 2000:
-                    del directory_dict[path]
-
-            return directory_dict
+            return path_table
 
         except Exception as e:
             ic()
             ic(e)
-            return {}
+            return PathTable()
+
+
+def _crawl_shard(directories, exclusion_engine, budget):
+    """
+    Auftrag für einen Prozess des parallelen Durchlaufs (auf Modulebene, damit er übertragbar ist).
+    Durchläuft die Verzeichnisse, bis budget Einträge gesammelt wurden.
+
+    Args:
+        directories (list): Startverzeichnisse des Auftrags
+        exclusion_engine (PathExclusionEngine): Kopie der Ausschlussregeln
+        budget (int): Maximale Anzahl an Einträgen pro Auftrag
+
+    Returns:
+        tuple: Liste der Einträge (kompakte Tupel), Liste der noch offenen Verzeichnisse
+            und Trefferzähler der Ausschlussregeln dieses Auftrags
+    """
+    # Nur die Treffer dieses Auftrags zählen (die Kopie enthält die bisherigen Zähler)
+    exclusion_engine.hits = {}
+
+    records = []
+    pending_directories = list(directories)
+
+    while pending_directories and len(records) < budget:
+        directory = pending_directories.pop()
+        records.extend(SystemMapping.scan_directory(directory, exclusion_engine, pending_directories))
+
+    return records, pending_directories, exclusion_engine.hits
+
+
+SettingsStore.subscribe(SystemMapping.apply_settings)
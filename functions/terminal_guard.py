@@ -1,6 +1,5 @@
 # Standard Bibliotheken
 import asyncio
-import json
 import os
 
 # Externe Bibliotheken
@@ -8,6 +7,10 @@ from icecream import ic
 from transformers import pipeline
 from dotenv import load_dotenv
 from huggingface_hub import login
+
+# Interne Module
+from functions.settings_store import SettingsStore
+
 # Umgebungsvariablen aus .env Datei laden
 load_dotenv()
 # Hole den Pfad zur Terminal-Anwendung aus den Umgebungsvariablen
@@ -26,9 +29,8 @@ class TerminAlGuard:
         if token:
             login(token)
 
-        self.settings = json.load(
-            open(terminal_path + "settings/settings.json"))  # Lädt Einstellungen aus der JSON-Datei
-        self.guard_settings = self.settings.get("guard_settings", None)
+        self.settings = SettingsStore.get()  # Gemeinsame Einstellungen aller Komponenten
+        self.guard_settings = SettingsStore.get("guard_settings")
 
         self.classifier = pipeline(
             "text-classification",
@@ -44,6 +46,16 @@ class TerminAlGuard:
         Klassifiziert den `command`, vergleicht ihn mit Ollamas gemeldeter Risikoeinschätzung
         ("low"/"medium"/"high") und gibt eine Warnung aus, falls diese nicht übereinstimmen.
         """
+        predicted = await self.classify(command)
+        return self.compare(predicted, reported_risk)
+
+    async def classify(self, command: str):
+        """
+        Klassifiziert den `command` (z.B. schon während die Antwort des Modells noch generiert wird).
+
+        Returns:
+            str: Prognostizierte Risikoeinschätzung ("low"/"medium"/"high")
+        """
         loop = asyncio.get_event_loop()
 
         def _classify():
@@ -52,8 +64,12 @@ class TerminAlGuard:
             return out["label"].lower()
 
         # Führe die blockierende Pipeline im Standard-Executor aus
-        predicted = await loop.run_in_executor(None, _classify)
+        return await loop.run_in_executor(None, _classify)
 
+    def compare(self, predicted: str, reported_risk: str):
+        """
+        Gibt eine Warnung aus, falls die Prognose des Guards von Ollamas Risikoeinschätzung abweicht.
+        """
         if predicted != reported_risk.lower():
             print(
                 f"⚠️ Warnung: Guard prognostiziert “{predicted}”, "
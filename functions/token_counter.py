@@ -0,0 +1,71 @@
+# Standardbibliotheken
+import math
+import threading
+
+
+class TokenCounter:
+    """
+    Schätzt die Anzahl Tokens eines Texts für das jeweils aktive Ollama-Modell.
+
+    Die Ollama-API bietet keine Tokenisierung ohne Modellauswertung an. Gezählt wird daher über ein
+    Verhältnis Zeichen pro Token, das pro Modell aus den Antworten kalibriert wird: Ollama meldet mit
+    "prompt_eval_count" die vom Tokenizer des Modells tatsächlich ausgewerteten Tokens.
+    """
+
+    default_chars_per_token = 3.5  # Startwert für deutsche Texte mit Pfaden, bis Messwerte vorliegen
+    min_chars_per_token = 1.5
+    max_chars_per_token = 8.0
+    smoothing = 0.3  # Gewicht eines neuen Messwerts
+
+    def __init__(self):
+        self.ratios = {}  # Modellname -> Zeichen pro Token
+        self.lock = threading.Lock()
+
+    def ratio(self, model):
+        """
+        Liefert das aktuelle Verhältnis Zeichen pro Token eines Modells.
+        """
+        with self.lock:
+            return self.ratios.get(model, self.default_chars_per_token)
+
+    def count(self, model, text):
+        """
+        Schätzt die Anzahl Tokens eines Texts (aufgerundet).
+
+        Args:
+            model (str): Name des Ollama-Modells
+            text (str): Zu zählender Text
+
+        Returns:
+            int: Geschätzte Anzahl Tokens
+        """
+        if not text:
+            return 0
+        return math.ceil(len(text) / self.ratio(model))
+
+    def observe(self, model, text_chars, prompt_eval_count, prefix_chars=0):
+        """
+        Übernimmt einen Messwert aus einer Antwort von Ollama.
+        Ist der Präfix (System-Prompt) im Modell zwischengespeichert, zählt Ollama nur die neu
+        ausgewerteten Tokens. Übernommen wird daher die Deutung (mit oder ohne Präfix), die näher am
+        bisherigen Verhältnis liegt.
+
+        Args:
+            model (str): Name des Ollama-Modells
+            text_chars (int): Zeichen der Benutzernachricht
+            prompt_eval_count (int): Von Ollama gemeldete Anzahl ausgewerteter Tokens
+            prefix_chars (int, optional): Zeichen der vorangehenden Systemnachrichten
+        """
+        if not prompt_eval_count or not text_chars:
+            return
+
+        current = self.ratio(model)
+        candidates = [text_chars / prompt_eval_count, (text_chars + prefix_chars) / prompt_eval_count]
+        measured = min(candidates, key=lambda candidate: abs(math.log(candidate / current)))
+        measured = min(max(measured, self.min_chars_per_token), self.max_chars_per_token)
+
+        with self.lock:
+            if model in self.ratios:
+                self.ratios[model] += self.smoothing * (measured - self.ratios[model])
+            else:
+                self.ratios[model] = measured
@@ -0,0 +1,128 @@
+# Standardbibliotheken
+import threading
+import time
+
+
+class UpdateCancelled(Exception):
+    """
+    Wird im Update-Thread ausgelöst, wenn das laufende Update abgebrochen werden soll.
+    """
+
+
+class UpdateProgress:
+    """
+    Fortschritt eines ChromaDB-Updates, das in einem eigenen Thread läuft.
+
+    Der Update-Thread meldet Phase, verarbeitete Einträge und eingebettete Dokumente, der Event-Loop
+    liest den Stand für \\update status. Abbrüche erfolgen kooperativ: Der Update-Thread prüft
+    zwischen den Batches mit check_cancelled(), ob cancel() aufgerufen wurde.
+    """
+
+    def __init__(self):
+        """
+        Initialisiert einen leeren Fortschritt.
+        """
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.phase = "bereit"
+        self.started_at = None
+        self.finished_at = None
+        self.entries_expected = 0  # Erwartete Anzahl Einträge (aus dem letzten Abgleich)
+        self.entries_done = 0  # Abgeglichene Einträge
+        self.documents_embedded = 0  # Neu eingebettete Dokumente
+
+    def start(self, entries_expected=0):
+        """
+        Setzt den Fortschritt für ein neues Update zurück.
+
+        Args:
+            entries_expected (int, optional): Erwartete Anzahl Einträge für die Restzeit-Schätzung
+        """
+        with self.lock:
+            self.cancel_event.clear()
+            self.phase = "start"
+            self.started_at = time.monotonic()
+            self.finished_at = None
+            self.entries_expected = entries_expected
+            self.entries_done = 0
+            self.documents_embedded = 0
+
+    def set_phase(self, phase):
+        """
+        Setzt die aktuelle Phase (z.B. "postgres", "abgleich", "neuaufbau", "aufräumen").
+        """
+        with self.lock:
+            self.phase = phase
+
+    def finish(self, phase="fertig"):
+        """
+        Beendet das Update mit der angegebenen Endphase ("fertig", "abgebrochen" oder "fehler").
+        """
+        with self.lock:
+            self.phase = phase
+            self.finished_at = time.monotonic()
+
+    def advance(self, entries, documents=0):
+        """
+        Meldet einen abgeschlossenen Batch.
+
+        Args:
+            entries (int): Anzahl abgeglichener Einträge
+            documents (int, optional): Anzahl davon neu eingebetteter Dokumente
+        """
+        with self.lock:
+            self.entries_done += entries
+            self.documents_embedded += documents
+
+    def cancel(self):
+        """
+        Fordert den Abbruch des laufenden Updates an.
+        """
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """
+        Bricht das Update im Update-Thread ab, wenn cancel() aufgerufen wurde.
+
+        Raises:
+            UpdateCancelled: Abbruch wurde angefordert
+        """
+        if self.cancel_event.is_set():
+            raise UpdateCancelled()
+
+    def is_running(self):
+        """
+        Prüft, ob gerade ein Update läuft.
+        """
+        return self.started_at is not None and self.finished_at is None
+
+    def report(self):
+        """
+        Liefert den aktuellen Stand.
+
+        Returns:
+            dict: "phase", "elapsed", "entries_done", "entries_expected", "documents_embedded",
+                "documents_per_second" und "eta" (Restzeit in Sekunden oder None)
+        """
+        with self.lock:
+            if self.started_at is None:
+                return {"phase": self.phase, "elapsed": 0, "entries_done": 0, "entries_expected": 0,
+                        "documents_embedded": 0, "documents_per_second": 0.0, "eta": None}
+
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+            documents_per_second = self.documents_embedded / elapsed if elapsed > 0 else 0.0
+
+            # Restzeit über die Rate der abgeglichenen Einträge schätzen
+            eta = None
+            if self.finished_at is None and self.entries_done and self.entries_expected > self.entries_done:
+                eta = (self.entries_expected - self.entries_done) * elapsed / self.entries_done
+
+            return {
+                "phase": self.phase,
+                "elapsed": elapsed,
+                "entries_done": self.entries_done,
+                "entries_expected": self.entries_expected,
+                "documents_embedded": self.documents_embedded,
+                "documents_per_second": documents_per_second,
+                "eta": eta,
+            }
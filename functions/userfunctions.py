@@ -1,5 +1,4 @@
 # Standardbibliotheken
-import json
 import os
 import subprocess
 import sys
@@ -10,6 +9,7 @@ from icecream import ic
 
 # Interne Module
 from divers.ascii_art import terminAl_ascii
+from functions.settings_store import SettingsStore
 
 # Lade Umgebungsvariablen aus der .env-Datei
 load_dotenv("./.env")
@@ -46,6 +46,7 @@ class UserFunctions:
         print("                         an das KI-Modell weiter. Dies ist nützlich wenn")
         print("                         dem Modell der Pfad zu einer Datei zur Verfügung")
         print("                         gestellt werden soll.")
+        print("     Tab               - Vervollständigt Elementnamen in <> und Ordner nach \\cmd cd")
         print("  \\exit                - Beendet die Anwendung")
         print("  \\help                - Zeigt diese Hilfe an")
         print("  \\info                - Zeigt Informationen zur Anwendung")
@@ -71,12 +72,15 @@ class UserFunctions:
         print("     {ID}              - Setzt dieses LLM als default für Anfragen")
 
     @classmethod
-    def info(cls, device, name, memory):
+    def info(cls, device, name, memory, llm_metrics=None):
         """
         Zeigt allgemeine Informationen über die Anwendung und ihre Konfiguration an.
-        Liest die Einstellungen aus der settings.json-Datei.
+        Verwendet die gemeinsamen Einstellungen aus dem SettingsStore.
+
+        Args:
+            llm_metrics (dict, optional): Kennzahlen der letzten Anfragen (LlmMetrics.report)
         """
-        settings = json.load(open(terminal_path + "settings/settings.json"))
+        settings = SettingsStore.get()
         chroma_settings = settings.get("chroma_settings", {})
         ollama_settings = settings.get("ollama_settings", {})
         guard_settings = settings.get("guard_settings", {})
@@ -96,6 +100,14 @@ class UserFunctions:
             print(f"  Embedding Model: {chroma_settings.get('embedding_model', 'Nicht gesetzt')}")
             print(f"  Guard Model: {guard_settings.get('guard_model', 'Nicht gesetzt')}")
 
+            if llm_metrics:
+                # Prompt-Auswertung (Prefill) sinkt, wenn Ollama den Prompt-Cache wiederverwendet
+                print(f"\nOllama-Laufzeiten ({llm_metrics['requests']} Anfragen):")
+                for label, sample in (("Letzte Anfrage:", llm_metrics["last"]), ("Mittelwert:", llm_metrics["average"])):
+                    print(f"  {label:<28}Prompt {sample['prompt_tokens']:.0f} Tokens in {sample['prompt_ms']:.0f} ms,"
+                          f" Generierung {sample['eval_tokens']:.0f} Tokens in {sample['eval_ms']:.0f} ms,"
+                          f" Laden {sample['load_ms']:.0f} ms")
+
         else:
             print("Einstellungen wurden nicht geladen.")
 
@@ -202,7 +214,7 @@ class UserFunctions:
         Returns:
             None oder Liste mit Befehl für weitere Verarbeitung
         """
-        settings = json.load(open(terminal_path + "settings/settings.json"))
+        settings = SettingsStore.get()
         tool_settings = settings.get("tools", {})
 
         if not settings:
@@ -297,12 +309,7 @@ class UserFunctions:
             option: Entweder "list" zum Anzeigen aller verfügbaren Modelle
                     oder eine Modell-ID zum Setzen als Standardmodell
         """
-        settings_path = os.path.join(terminal_path, "settings", "settings.json")
-        # Lade aktuelle Settings
-        with open(settings_path, "r") as f:
-            settings = json.load(f)
-
-        ollama_settings = settings.get("ollama_settings", {})
+        ollama_settings = SettingsStore.get("ollama_settings")
         modelloptionen = ollama_settings.get("modelloptionen", {})
 
         if option == "list":
@@ -315,10 +322,10 @@ class UserFunctions:
             # Prüfen, ob die angegebene ID existiert
             if option in modelloptionen:
                 neues_modell = modelloptionen[option]
-                # Default ändern und zurückschreiben
-                settings["ollama_settings"]["ollama_model"] = neues_modell
-                with open(settings_path, "w") as f:
-                    json.dump(settings, f, indent=2)
-                print(f"Standardmodell wurde auf {neues_modell} gesetzt.")
+                # Default ändern und atomar zurückschreiben, der OllamaClient übernimmt das Modell sofort
+                if SettingsStore.update("ollama_settings", {"ollama_model": neues_modell}):
+                    print(f"Standardmodell wurde auf {neues_modell} gesetzt.")
+                else:
+                    print("Standardmodell konnte nicht gespeichert werden.")
             else:
                 print(f"Ungültige Modell-ID: {option}.")
@@ -10,13 +10,18 @@ import sys  # Für Systemfunktionen
 from dotenv import load_dotenv  # Laden von Umgebungsvariablen aus .env Dateien
 from icecream import ic  # Für verbesserte Debug-Ausgaben
 
-# Eigene Module
+# Eigene Module (Updater, Retriever und Guard werden erst im Hintergrund importiert, siehe load_components)
+from functions.background_loader import BackgroundLoader
+from functions.context_packer import ContextPacker
+from functions.incremental_json import IncrementalJsonParser
 from functions.ollama_client import OllamaClient
+from functions.prompt_builder import PromptBuilder
+from functions.repl_completion import ReplCompleter
 from functions.userfunctions import UserFunctions
-from functions.async_chromadb_updater import AsyncChromaDBUpdater
-from functions.async_chromadb_retriever import AsyncChromaDBRetriever
 from functions.async_environment_retriever import environment_retriever
-from functions.terminal_guard import TerminAlGuard
+from functions.schema_context import SchemaContextCache
+from functions.settings_store import SettingsStore
+from functions.system_mapping import SystemMapping
 
 # Umgebungsvariablen aus .env Datei laden
 load_dotenv("./.env")
@@ -33,15 +38,100 @@ class TerminAl:
         """
         Initialisiert die TerminAl-Instanz mit allen erforderlichen Komponenten.
         """
-        self.settings = json.load(
-            open(terminal_path + "settings/settings.json"))  # Lädt Einstellungen aus der JSON-Datei
+        self.settings = SettingsStore.get()  # Gemeinsame Einstellungen aller Komponenten
         self.env = os.getenv("ollama_key")  # API-Schlüssel für Ollama
-        self.chroma_updater = AsyncChromaDBUpdater()  # Komponente für ChromaDB-Updates
         self.ollama_client = OllamaClient()  # Client für die Kommunikation mit dem Ollama-Modell
-        self.chroma_retriever = AsyncChromaDBRetriever()  # Komponente für ChromaDB-Abfragen
+        # Modelle werden beim Start nebenläufig im Hintergrund geladen (siehe load_components)
+        self.loader = BackgroundLoader()
+        self.chroma_updater = None  # Komponente für ChromaDB-Updates
+        self.chroma_retriever = None  # Komponente für ChromaDB-Abfragen
+        self.guard = None  # Guard-Modell zur Prüfung der Risikoeinschätzung
+        # Tab-Vervollständigung für <Elementnamen> und \cmd cd aus der aktuellen Abbildung
+        self.completer = None
+        self.services_task = None  # Startet Update-Zyklus und Vervollständigung nach dem Laden
+        self.update_task = None  # Update-Zyklus im Hintergrund
         self.current_user_database = None  # Aktuelle Datenbankverbindung des Benutzers
+        # Schema-Kontext der aktiven Datenbank für den Prompt (wird beim \psql login geladen)
+        self.schema_context = SchemaContextCache(SettingsStore.get("tools").setdefault("postgres", {}))
+        # Such- bzw. Schema-Kontext im Prompt innerhalb des Token-Budgets ("context_settings.max_tokens")
+        self.context_settings = SettingsStore.get("context_settings")
+        self.context_packer = ContextPacker(self.ollama_client.count_tokens)
+        self.prompt_builder = PromptBuilder()  # Prompt-Aufbau für die Wiederverwendung des Prompt-Caches
         self.manual_update_task = None  # Task für manuelles Update initialisieren
-        self.guard = TerminAlGuard()
+
+    def load_components(self):
+        """
+        Startet das nebenläufige Laden von Updater, Retriever und Guard im Executor sowie das Aufwärmen
+        des Ollama-Modells. Die Module werden erst hier importiert, da sie torch bzw. transformers laden.
+        """
+        def load_updater():
+            from functions.async_chromadb_updater import AsyncChromaDBUpdater
+            self.chroma_updater = AsyncChromaDBUpdater()
+            return self.chroma_updater
+
+        def load_retriever():
+            from functions.async_chromadb_retriever import AsyncChromaDBRetriever
+            self.chroma_retriever = AsyncChromaDBRetriever()
+            return self.chroma_retriever
+
+        def load_guard():
+            from functions.terminal_guard import TerminAlGuard
+            self.guard = TerminAlGuard()
+            return self.guard
+
+        async def warm_up_ollama():
+            # Modell auf dem Server laden und den statischen Prompt-Anfang im Cache ablegen
+            return await self.ollama_client.warm_up(system_context=self.prompt_builder.instructions)
+
+        self.loader.start("updater", "ChromaDB-Updater", load_updater)
+        self.loader.start("retriever", "ChromaDB-Retriever", load_retriever)
+        self.loader.start("guard", "Guard-Modell", load_guard)
+        self.loader.start("ollama", "Ollama-Modell", warm_up_ollama)
+
+    async def start_services(self):
+        """
+        Startet den Update-Zyklus und die Tab-Vervollständigung, sobald Updater bzw. Retriever geladen sind.
+        """
+        updater = await self.loader.wait("updater", quiet=True)
+        if updater:
+            # ChromaDB-Update-Zyklus als Hintergrundtask starten
+            self.update_task = asyncio.create_task(updater.start_update_cycle())
+
+        retriever = await self.loader.wait("retriever", quiet=True)
+        if retriever:
+            # Vervollständigung beim Start und nach jedem Update im Hintergrund aufbauen
+            self.completer = ReplCompleter(retriever.chromadb_path, retriever.keyword_index.index_path)
+            if self.completer.install():
+                if updater:
+                    updater.subscribe(self.completer.request_refresh)
+                self.completer.request_refresh()
+
+    async def require(self, name):
+        """
+        Wartet auf eine im Hintergrund geladene Komponente.
+
+        Args:
+            name (str): Name der Komponente ("updater", "retriever" oder "guard")
+
+        Returns:
+            Die Komponente oder None (mit Meldung), wenn sie nicht geladen werden konnte
+        """
+        component = await self.loader.wait(name)
+        if component is None:
+            print(f"{self.loader.labels[name]} ist nicht verfügbar.")
+        return component
+
+    async def classify_command(self, command):
+        """
+        Wartet auf das Guard-Modell und klassifiziert den Befehl (ohne Meldung, läuft neben dem Stream).
+
+        Returns:
+            str: Prognostizierte Risikoeinschätzung
+        """
+        guard = await self.loader.wait("guard", quiet=True)
+        if guard is None:
+            raise RuntimeError("Guard-Modell ist nicht verfügbar")
+        return await guard.classify(command)
 
     async def check(self):
         """
@@ -58,16 +148,24 @@ class TerminAl:
 
         print("Willkommen bei terminAl!\nZeige Bedienungsanleitung mit: \\help")
 
-        # ChromaDB-Update-Zyklus als Hintergrundtask starten
-        update_task = asyncio.create_task(self.chroma_updater.start_update_cycle())
+        # Modelle im Hintergrund laden, die Eingabeaufforderung erscheint sofort
+        self.load_components()
+        # Update-Zyklus und Vervollständigung starten, sobald ihre Komponenten geladen sind
+        self.services_task = asyncio.create_task(self.start_services())
+        # Externe Änderungen an der settings.json erkennen und an alle Komponenten weitergeben
+        settings_task = asyncio.create_task(SettingsStore.watch())
 
         # Haupteingabeschleife ausführen
         try:
             while True:
                 user_input = await self.get_user_input()  # Benutzereingabe asynchron erhalten
+                if self.chroma_updater:
+                    self.chroma_updater.note_activity()  # Speicherwartung nicht während der Bedienung
 
                 # Verwenden der bestehenden UserFunctions-Klasse für die Standardbefehle
                 if user_input.startswith(r"\update"):
+                    if not await self.require("updater"):
+                        continue
                     action = user_input.split(" ")[1]  # Aktionsbefehl extrahieren
                     match action:
                         case "on":
@@ -92,6 +190,53 @@ class TerminAl:
                                                                                     "Keine Information verfügbar")
                             print(f"Auto Update Status:         {update_status}")
                             print(f"Letztes Update:             {latest_update}")
+
+                            # Fortschritt des laufenden bzw. letzten Updates
+                            progress = self.chroma_updater.progress.report()
+                            print(f"Update-Phase:               {progress['phase']}")
+                            if progress["entries_done"]:
+                                eta = f"{progress['eta'] / 60:.1f} Minuten" if progress["eta"] is not None else "-"
+                                print(f"Abgeglichene Einträge:      {progress['entries_done']}"
+                                      f" / ~{progress['entries_expected']}")
+                                print(f"Eingebettete Dokumente:     {progress['documents_embedded']}"
+                                      f" ({progress['documents_per_second']:.1f}/s)")
+                                print(f"Restzeit (geschätzt):       {eta}")
+
+                            # Noch nicht eingebettete Einträge (Embedding-Modus "deferred")
+                            pending_embeddings = self.chroma_updater.pending_embeddings()
+                            if pending_embeddings:
+                                print(f"Ausstehende Embeddings:     {pending_embeddings}")
+
+                            # Anteil freier Seiten in chroma.sqlite3 (Speicherwartung)
+                            storage_stats = self.chroma_updater.storage.stats()
+                            if storage_stats:
+                                print(f"Freie Seiten chroma.sqlite3: {storage_stats['freelist_count']}"
+                                      f" / {storage_stats['page_count']} ({storage_stats['free_ratio']:.0%})")
+
+                            # Trefferquote des Embedding-Caches
+                            cache_stats = self.chroma_updater.embedding_cache.stats()
+                            print(f"Embedding-Cache:            {cache_stats['entries']} / {cache_stats['max_entries']}"
+                                  f" Einträge, {cache_stats['hits']} Treffer, {cache_stats['misses']} Fehlzugriffe"
+                                  f" ({cache_stats['hit_rate']:.0%})")
+
+                            # Trefferquote und eingesparte Zeit der Caches für Suchergebnisse und Anfrage-Embeddings
+                            retriever_caches = (
+                                (("Suchergebnis-Cache:", self.chroma_retriever.result_cache),
+                                 ("Anfrage-Embedding-Cache:", self.chroma_retriever.query_embedding_cache))
+                                if self.chroma_retriever else ()
+                            )
+                            for label, cache in retriever_caches:
+                                cache_stats = cache.stats()
+                                print(f"{label:<28}{cache_stats['entries']} / {cache_stats['max_entries']}"
+                                      f" Einträge, {cache_stats['hits']} Treffer, {cache_stats['misses']} Fehlzugriffe"
+                                      f" ({cache_stats['hit_rate']:.0%}, {cache_stats['saved_ms']:.0f} ms eingespart)")
+
+                            # Ausschlussregeln mit den meisten Treffern (sparen am meisten Durchlaufzeit)
+                            exclusion_report = SystemMapping.get_exclusion_engine().report()
+                            if exclusion_report:
+                                print("Ausschlussregeln (Treffer):")
+                                for rule, hits in exclusion_report[:5]:
+                                    print(f"  {rule:<26}{hits}")
                         case _:
                             print(f"Unbekannter Befehl: {action}")
 
@@ -110,12 +255,15 @@ class TerminAl:
 
                 elif user_input.startswith(r"\info"):
                     # Systeminformationen anzeigen
+                    if not await self.require("updater"):
+                        continue
                     update_device = self.chroma_updater.device
                     update_device_name = self.chroma_updater.device_name
                     update_device_memory = self.chroma_updater.device_memory
                     UserFunctions.info(device=update_device,
                                        name=update_device_name,
-                                       memory=update_device_memory)
+                                       memory=update_device_memory,
+                                       llm_metrics=self.ollama_client.metrics.report())
 
                 elif user_input.startswith(r"\search"):
                     # Volltextsuche in ChromaDB durchführen
@@ -123,7 +271,8 @@ class TerminAl:
                     if len(user_input) < 2:
                         print("Keine Suchbegriffe angegeben")
                         continue
-                    await self.chroma_retriever.fulltext_search(user_input[1:], top_k=10)
+                    if await self.require("retriever"):
+                        await self.chroma_retriever.fulltext_search(user_input[1:], top_k=10)
 
                 elif user_input.startswith(r"\clear"):
                     # Terminal bereinigen
@@ -147,6 +296,9 @@ class TerminAl:
                                 self.current_user_database = None
                             case list() as db_conn:  # Match any list and capture it as db_conn
                                 self.current_user_database = db_conn
+                                # Schema einmalig laden, damit es nicht bei jedem Prompt abgefragt wird
+                                if not await self.schema_context.load(db_conn[5]):
+                                    print("Schema der Datenbank konnte nicht geladen werden.")
                             case _:
                                 ic()
                                 ic(f"Unerwartete Datenbankkonfiguration: {type(current_user_database)}")
@@ -155,7 +307,8 @@ class TerminAl:
 
                 elif user_input.startswith(r"\chromadb_collections"):
                     # ChromaDB-Sammlungen auflisten
-                    self.chroma_updater.list_collections()
+                    if await self.require("updater"):
+                        self.chroma_updater.list_collections()
 
                 elif user_input.startswith(r"\model"):
                     user_input_parts = user_input.split(" ")
@@ -167,90 +320,48 @@ class TerminAl:
                     print("Unbekannter Befehl. Zeige alle Befehle mit \\help")
 
                 else:
+                    if not await self.require("retriever"):
+                        continue
                     print("Prompt wird bearbeitet...")
                     # Schlüsselwörter aus der Benutzereingabe extrahieren
                     keywords = self.extract_keywords(user_input)
+                    # Spitzklammern entfernen, um Verwirrung des Modells zu vermeiden
+                    cleaned_user_input = self.clean_input(user_input)
 
                     # Kontext basierend auf dem Datenbankstatus abrufen
                     if not self.current_user_database:
                         # Wenn keine Datenbankverbindung besteht, nur Vektor- und Umgebungskontext holen
                         vector_context, environment_context = await asyncio.gather(
-                            self.chroma_retriever.fulltext_search(keywords, top_k=5),
+                            self.chroma_retriever.fulltext_search(keywords, top_k=5, query=cleaned_user_input),
                             environment_retriever()
                         )
                     elif self.current_user_database:
-                        # Wenn Datenbankverbindung besteht, zusätzlich PostgreSQL-Kontext holen
+                        # Wenn Datenbankverbindung besteht, zusätzlich den zwischengespeicherten Schema-Kontext holen
                         vector_context, environment_context, postgres_context = await asyncio.gather(
-                            self.chroma_retriever.fulltext_search(keywords, top_k=5),
+                            self.chroma_retriever.fulltext_search(keywords, top_k=5, query=cleaned_user_input),
                             environment_retriever(),
-                            UserFunctions.psql(user_input=["list", self.current_user_database[5]])
+                            self.schema_context.get_context(self.current_user_database[5], user_input)
                         )
 
-                    # Spitzklammern entfernen, um Verwirrung des Modells zu vermeiden
-                    cleaned_user_input = self.clean_input(user_input)
-
-                    # Prompterstellung für das Sprachmodell mit relevanten Kontextinformationen
-                    full_prompt = (
-                        "Nutze die folgenden Kontextinformationen, wenn sie bei der Beantwortung der Benutzerfrage hilfreich sind.\n"
-                        "Falls Pfade oder Dateinamen angegeben sind, kannst du daraus Ordner ableiten (z.B. durch Entfernen von Dateinamen oder Kürzen auf relevante Teilpfade).\n"
-                        "Vermeide generische Platzhalter wie `/home/user/...` oder `*.pdf`, aber passe Pfade **sinnvoll** an, wenn sie eindeutig auf einen Zielordner hinweisen.\n"
-                        "Wenn ein Pfad Leerzeichen enthält, setze ihn in einfache Anführungszeichen (z.B. `'... Ordner mit Leerzeichen'`).\n\n"
-                        "### BEGINN AKTUELLE UMGEBUNGSINFORMATIONEN\n"
-                        f"{json.dumps(environment_context, indent=2, ensure_ascii=False)}\n"
-                        "### ENDE AKTUELLE UMGEBUNGSINFORMATIONEN\n\n"
-                        "# BEGINN USERPROMPT\n"
-                        f"{cleaned_user_input}\n"
-                        "Nutze dazu die folgenden Pfade oder Datenbankdetails, wenn vorhanden. Priorisiere den Kontext über Umgebungsinformationen, falls nötig:"
-                        f"{postgres_context if self.current_user_database else vector_context}\n"
-                        "# ENDE USERPROMPT\n"
-                    )
-
-                    # Anfrage an das Ollama-Modell senden
-                    result = await self.ollama_client.query(prompt=full_prompt)
-
-
-                    # Versuchen, die Ergebniszeichenkette vor dem Parsen zu korrigieren
-                    try:
-                        safe_result = self.fix_json_escapes(result)
-                        parsed = json.loads(safe_result)
-                    except json.JSONDecodeError as e:
-                        ic() # JSON konnte nicht geparsed werden
-                        ic(f"Modell hat ungültiges JSON-Format zurückgegeben: {e}")
-                        ic("Antwort vom Modell:")
-                        ic(result)
-                        continue
+                    # Kontext auf das Token-Budget des aktiven Modells kürzen
+                    context_budget = self.context_settings.get("max_tokens", 512)
+                    if self.current_user_database:
+                        context = self.context_packer.pack_text(postgres_context, context_budget)
+                    else:
+                        context = self.context_packer.pack_entries(vector_context, context_budget)
 
-                    # Befehl aus der Modellantwort extrahieren
-                    command = parsed.get("command")
-                    risk_level = parsed.get("risk_level")
-                    detailed_description = parsed.get("detailed_description")
+                    # Prompterstellung: feste Anweisungen als Systemnachricht, danach von statisch nach dynamisch
+                    full_prompt = self.prompt_builder.build(cleaned_user_input, context, environment_context)
 
-                    # Beende Iteration wenn kein Befehl vorhanden ist
-                    if not command:
-                        ic()
-                        ic("Keinen Befehl vom Modell erhalten.")
+                    # Anfrage an das Ollama-Modell senden, Vorschlag prüfen und anzeigen
+                    if self.ollama_client.ollama_settings.get("stream", True):
+                        parsed = await self.stream_proposal(full_prompt)
+                    else:
+                        parsed = await self.query_proposal(full_prompt)
+                    if parsed is None:
                         continue
+                    command = parsed["command"]
 
-                    # Warnung wenn kein risk_level angegeben wurde
-                    if risk_level is None:
-                        ic()
-                        ic("Warnung: Modell hat kein risk_level zurückgeliefert.")
-                    else:
-                        # Erst den Guard prüfen
-                        try:
-                            await self.guard.check(command, risk_level)  # Zeigt Warnung bei Abweichung
-                        except Exception as e:
-                            ic()
-                            ic(f"Fehler bei der Überprüfung durch den Guard: {e}")
-                            continue
-
-                    # Danach Informationen für den Benutzer anzeigen
-                    print("\n--- Vorschlag vom Modell ---")
-                    print(f"🖥️  Befehl                : {command}")
-                    print(f"🛡️  Risikoeinschätzung    : {risk_level}")
-                    if detailed_description:
-                        print(f"ℹ️  Beschreibung      : {detailed_description}")
-                    print("----------------------------")
                     # Benutzerentscheidung für Befehlsausführung einholen
                     if command:
                         decision = input("Befehl genehmigen oder ablehnen (J/N): ").lower()
@@ -266,6 +377,9 @@ class TerminAl:
 
                             # SQL-Befehl mit aktiver Datenbankverbindung ausführen
                             await UserFunctions.cmd(command_list)
+
+                            # Schema-Kontext nach DDL-Befehlen neu laden
+                            self.schema_context.invalidate_on_ddl(self.current_user_database[5], command)
                         elif parsed["tool"] == "sql" and not self.current_user_database:
                             print("Bitte zuerst \\psql login <Datenbankname> ausführen.")
                         elif parsed["tool"] == "bash" and self.current_user_database:
@@ -284,8 +398,18 @@ class TerminAl:
         except KeyboardInterrupt:
             print("\nBeenden der Anwendung...")
         finally:
+            # Laufendes Update im Update-Thread abbrechen, damit das Beenden nicht auf den Neuaufbau wartet
+            if self.chroma_updater:
+                self.chroma_updater.cancel()
+
             # Alle laufenden Tasks beim Beenden abbrechen
-            update_task.cancel()
+            self.services_task.cancel()
+            self.loader.close()
+            if self.update_task:
+                self.update_task.cancel()
+            settings_task.cancel()
+            if self.completer:
+                self.completer.close()
 
             # Auch manuellen Update-Task abbrechen, falls er existiert und noch läuft
             if self.manual_update_task and not self.manual_update_task.done():
@@ -293,12 +417,19 @@ class TerminAl:
 
             # Warten, bis alle Tasks ordnungsgemäß abgebrochen wurden
             try:
-                await update_task
+                if self.update_task:
+                    await self.update_task
                 if self.manual_update_task:
                     await self.manual_update_task
             except asyncio.CancelledError:
                 pass
 
+            # Gemeinsames Embedding-Modell und Caches freigeben
+            if self.chroma_updater:
+                self.chroma_updater.close()
+            if self.chroma_retriever:
+                self.chroma_retriever.close()
+
     async def get_user_input(self):
         """
         Nicht-blockierende Benutzereingabe, die den Event-Loop nicht blockiert.
@@ -345,6 +476,153 @@ class TerminAl:
         """
         return re.sub(r"[<>]", "", user_input)
 
+    async def query_proposal(self, full_prompt):
+        """
+        Fragt das Modell ohne Streaming an, prüft den Befehl mit dem Guard und zeigt den Vorschlag an.
+
+        Args:
+            full_prompt (str): Vollständiger Prompt
+
+        Returns:
+            dict: Felder der Antwort oder None bei ungültiger Antwort bzw. ohne Befehl
+        """
+        result = await self.ollama_client.query(prompt=full_prompt, system_context=self.prompt_builder.instructions)
+
+        # Versuchen, die Ergebniszeichenkette vor dem Parsen zu korrigieren
+        try:
+            safe_result = self.fix_json_escapes(result)
+            parsed = json.loads(safe_result)
+        except json.JSONDecodeError as e:
+            ic() # JSON konnte nicht geparsed werden
+            ic(f"Modell hat ungültiges JSON-Format zurückgegeben: {e}")
+            ic("Antwort vom Modell:")
+            ic(result)
+            return None
+
+        # Befehl aus der Modellantwort extrahieren
+        command = parsed.get("command")
+        risk_level = parsed.get("risk_level")
+        detailed_description = parsed.get("detailed_description")
+
+        # Abbrechen, wenn kein Befehl vorhanden ist
+        if not command:
+            ic()
+            ic("Keinen Befehl vom Modell erhalten.")
+            return None
+
+        # Warnung wenn kein risk_level angegeben wurde
+        if risk_level is None:
+            ic()
+            ic("Warnung: Modell hat kein risk_level zurückgeliefert.")
+        else:
+            # Erst den Guard prüfen
+            try:
+                predicted = await self.classify_command(command)
+                self.guard.compare(predicted, risk_level)  # Zeigt Warnung bei Abweichung
+            except Exception as e:
+                ic()
+                ic(f"Fehler bei der Überprüfung durch den Guard: {e}")
+                return None
+
+        # Danach Informationen für den Benutzer anzeigen
+        print("\n--- Vorschlag vom Modell ---")
+        print(f"🖥️  Befehl                : {command}")
+        print(f"🛡️  Risikoeinschätzung    : {risk_level}")
+        if detailed_description:
+            print(f"ℹ️  Beschreibung      : {detailed_description}")
+        print("----------------------------")
+        return parsed
+
+    async def stream_proposal(self, full_prompt):
+        """
+        Fragt das Modell mit gestreamter Antwort an. Befehl und Risikoeinschätzung werden angezeigt, sobald
+        ihr Feld abgeschlossen ist, und der Guard prüft den Befehl bereits, während die Beschreibungen noch
+        generiert und mitlaufend angezeigt werden.
+
+        Args:
+            full_prompt (str): Vollständiger Prompt
+
+        Returns:
+            dict: Felder der Antwort oder None bei ungültiger Antwort bzw. ohne Befehl
+        """
+        parser = IncrementalJsonParser()
+        stream = self.ollama_client.stream(prompt=full_prompt, system_context=self.prompt_builder.instructions)
+        received = []  # Vollständige Antwort für die Fehlerausgabe
+        guard_task = None
+        header_shown = False
+        description_open = False
+
+        def show(line):
+            # Kopfzeile vor dem ersten angezeigten Feld
+            nonlocal header_shown
+            if not header_shown:
+                print("\n--- Vorschlag vom Modell ---")
+                header_shown = True
+            print(line, end="", flush=True)
+
+        try:
+            # Auch nach dem Objekt bis zum Ende lesen: erst der letzte Teil des Streams enthält Laufzeiten
+            # und Tokenzahlen (LlmMetrics, TokenCounter), folgenden Text wie Code-Fences ignoriert der Parser
+            async for chunk in stream:
+                received.append(chunk)
+                for event, key, value in parser.feed(chunk):
+                    if event == "field" and key == "command" and value:
+                        # Guard sofort starten, das Modell generiert währenddessen weiter
+                        guard_task = asyncio.create_task(self.classify_command(value))
+                        show(f"🖥️  Befehl                : {value}\n")
+                    elif event == "field" and key == "risk_level":
+                        show(f"🛡️  Risikoeinschätzung    : {value}\n")
+                    elif event == "delta" and key == "detailed_description":
+                        if not description_open:
+                            show("ℹ️  Beschreibung      : ")
+                            description_open = True
+                        show(value)
+                    elif event == "field" and key == "detailed_description" and description_open:
+                        show("\n")
+        except ValueError as e:
+            ic()  # JSON konnte nicht geparsed werden
+            ic(f"Modell hat ungültiges JSON-Format zurückgegeben: {e}")
+        finally:
+            await stream.aclose()
+
+        if description_open and "detailed_description" not in parser.fields:
+            # Abgebrochene Beschreibung abschließen
+            print()
+
+        parsed = parser.result()
+        command = parsed.get("command")
+        risk_level = parsed.get("risk_level")
+
+        if not parser.done or not command:
+            if guard_task:
+                guard_task.cancel()
+            if not parser.done:
+                ic()
+                ic("Unvollständige Antwort vom Modell:")
+                ic("".join(received))
+            else:
+                ic()
+                ic("Keinen Befehl vom Modell erhalten.")
+            return None
+
+        # Warnung wenn kein risk_level angegeben wurde
+        if risk_level is None:
+            guard_task.cancel()
+            ic()
+            ic("Warnung: Modell hat kein risk_level zurückgeliefert.")
+        else:
+            # Ergebnis des Guards auswerten (zeigt Warnung bei Abweichung)
+            try:
+                predicted = await guard_task
+                self.guard.compare(predicted, risk_level)
+            except Exception as e:
+                ic()
+                ic(f"Fehler bei der Überprüfung durch den Guard: {e}")
+                return None
+
+        print("----------------------------")
+        return parsed
+
     def fix_json_escapes(self, s):
         r"""
         Korrigiert fehlerhaft formatierte JSON-Escapes in der Zeichenkette.